@@ -1,6 +1,6 @@
 from flask import Flask
 from flask_cors import CORS
-from app.analysis_service import analysis_service
+from app.responses import FastJSONProvider
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,13 +8,15 @@ load_dotenv()
 def create_app():
     # Create the Flask app instance
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     
     # Enable CORS
     CORS(app, resources={
         r"/api/*": {
             "origins": ["http://localhost:5000", "http://localhost:3000","https://mood-vue.vercel.app/","https://mood-vue-gcr2.vercel.app/"],  # Frontend URLs
             "methods": ["GET", "POST", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "X-User-Id"],
+            "allow_headers": ["Content-Type", "Authorization", "X-User-Id", "If-None-Match", "If-Modified-Since"],
+            "expose_headers": ["ETag", "Last-Modified"],
             "supports_credentials": True
         }
     })
@@ -27,8 +29,11 @@ def create_app():
     from app.auth import auth_bp
     app.register_blueprint(auth_bp, url_prefix='/api')
 
-    # Start the background processing thread
-    # This ensures it starts only once when the app is created
+    # Imported here rather than at module level so that importing the app
+    # package (e.g. app.serverless) does not connect to Supabase or build
+    # the analysis service. Starts the spool shipper; the camera and
+    # analysis thread start when the first session or video viewer attaches
+    from app.analysis_service import analysis_service
     analysis_service.start_processing()
 
     return app
\ No newline at end of file
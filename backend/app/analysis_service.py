@@ -1,26 +1,45 @@
 import cv2
+import numpy as np
 import threading
 import time
 import atexit
 import asyncio
-from deepface import DeepFace
-import numpy as np
-from typing import Optional
-from uuid import UUID
+import os
+from datetime import datetime, timedelta, timezone
+from collections import Counter
+from typing import Dict, Optional, Tuple
+from uuid import UUID, uuid4
 
 from app.services.session_service import SessionService
-
-# Emotion to Stress Score Mapping
-STRESS_MAP = {
-    "happy": 15,
-    "neutral": 25,
-    "surprise": 40,
-    "sad": 70,
-    "fear": 80,
-    "angry": 95,
-    "disgust": 75
+from app.services.emotion_classifier import DETECTORS, EMOTION_LABELS, LEAN_DETECTORS, create_emotion_classifier
+from app.services.smoothing import EmotionSmoother, EmissionPolicy
+from app.services.face_tracker import FaceTracker
+from app.services.history_buffer import HistoryBuffer
+from app.services.reading_spool import DEFAULT_SPOOL_PATH, ReadingSpool, SpoolShipper
+from app.services.record_archive import DEFAULT_ARCHIVE_DIR, RecordArchive
+from app.services.capacity import CapacityModel
+from app.services.mjpeg_server import MJPEGServer
+from app.services.node_registry import cluster_from_env
+from app.services.profiler import SharedProfiler, allocations, is_request_thread, profiler
+from app.services.shared_state import ControlClient, ControlServer, SharedStateReader, SharedStateWriter
+from app.services.stress_scoring import ScoringModel, load_scoring_model, to_vectors
+
+IDLE_ANALYSIS = {
+    "emotion": "neutral",
+    "confidence": 0.0,
+    "stress_score": 0,
+    "face_detected": False,
+    "region": {'x': 0, 'y': 0, 'w': 0, 'h': 0},
+    "faces": []
 }
 
+# Seconds between attempts to open a missing camera while the pipeline is held
+CAMERA_RETRY_SECONDS = 2.0
+
+# Remote viewers hold the pipeline with a lease they renew while streaming,
+# so a worker that dies mid-stream cannot keep the camera open
+VIEWER_LEASE_SECONDS = 30.0
+
 class AnalysisService:
     def __init__(self):
         # --- State Variables ---
@@ -30,48 +49,248 @@ class AnalysisService:
             "confidence": 0.0,
             "stress_score": 20
         }
-        self.history_log = []
+        self.history = HistoryBuffer(int(os.getenv("HISTORY_CAPACITY", 14400)))
         self.last_frame = None
+        # Bumped for every captured frame; the JPEG is encoded once per frame
+        self.frame_seq = 0
+        self._jpeg_lock = threading.Lock()
+        self._jpeg: Tuple[int, Optional[bytes]] = (-1, None)
+        # Active sessions (session id -> user id); readings go to all of them
+        self.sessions: Dict[UUID, UUID] = {}
         self.current_session_id: Optional[UUID] = None
-        self.current_user_id: Optional[UUID] = None
+        # Face detector overrides requested by sessions (session id -> detector)
+        self.session_detectors: Dict[UUID, str] = {}
+        self.default_detector: Optional[str] = None
+        self.capacity = CapacityModel(
+            max_queue=int(os.getenv("SESSION_QUEUE_SIZE", 10)),
+            admit_threshold=float(os.getenv("CAPACITY_ADMIT_THRESHOLD", 0.85))
+        )
         self.session_service = SessionService()
-
-        # --- Camera Initialization ---
-        try:
-            self.camera = cv2.VideoCapture(0)
-            if not self.camera.isOpened():
-                raise IOError("Cannot open webcam")
-            print("Camera initialized successfully.")
-        except Exception as e:
-            print(f"Error initializing camera: {e}. Using placeholder.")
-            self.camera = None
+        self.classifier = None
+        self.processing_thread: Optional[threading.Thread] = None
+        self.camera = None
+
+        # --- Per-face tracking, temporal smoothing and emission ---
+        self.face_tracker = FaceTracker(
+            iou_threshold=float(os.getenv("FACE_TRACK_IOU", 0.3)),
+            max_missed=int(os.getenv("FACE_TRACK_MAX_MISSED", 3)),
+            state_factory=self._new_smoother
+        )
+        self.emission_policy = EmissionPolicy(
+            stress_delta=int(os.getenv("EMIT_STRESS_DELTA", 5)),
+            heartbeat=float(os.getenv("EMIT_HEARTBEAT_SECONDS", 30))
+        )
+        self.emit_seq = 0
+        # Stress values and override rules applied to each face's distribution
+        self.scoring_model = load_scoring_model()
+
+        # --- Durable reading spool ---
+        self.spool = ReadingSpool(
+            path=os.getenv("SPOOL_PATH", DEFAULT_SPOOL_PATH),
+            max_rows=int(os.getenv("SPOOL_MAX_ROWS", 500000))
+        )
+        self.spool_shipper = SpoolShipper(self.spool, self.session_service)
+        # Node registry membership when several analysis nodes share sessions
+        self.cluster = cluster_from_env()
+        self.archive = RecordArchive(os.getenv("ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR))
+
+        # --- Pipeline lifecycle ---
+        # Sessions and video viewers hold the capture pipeline; it starts with
+        # the first holder and stops pipeline_linger seconds after the last
+        # one leaves. Holders map to a lease expiry, or None for no expiry.
+        self.pipeline_lock = threading.Lock()
+        self.pipeline_holders: Dict[str, Optional[float]] = {}
+        self.pipeline_linger = float(os.getenv("PIPELINE_LINGER_SECONDS", 15))
+        self.camera_index = int(os.getenv("CAMERA_INDEX", 0))
+        self._idle_since: Optional[float] = None
+
+        # --- Event-driven video streaming ---
+        mjpeg_port = int(os.getenv("MJPEG_PORT", 5002))
+        self.mjpeg_server = MJPEGServer(
+            self.encoded_frame,
+            acquire=self.acquire_pipeline,
+            release=self.release_pipeline,
+            port=mjpeg_port,
+            max_fps=float(os.getenv("MJPEG_MAX_FPS", 15)),
+            max_viewers=int(os.getenv("MJPEG_MAX_VIEWERS", 200)),
+            max_viewers_per_session=int(os.getenv("MJPEG_MAX_VIEWERS_PER_SESSION", 5)),
+            idle_timeout=float(os.getenv("MJPEG_IDLE_TIMEOUT", 30))
+        ) if mjpeg_port else None
 
         # Register cleanup
         atexit.register(self.cleanup)
 
     def start_processing(self):
-        """Starts the background frame processing thread."""
-        processor_thread = threading.Thread(target=self._process_frames, daemon=True)
-        processor_thread.start()
-        print("Background processing thread started.")
+        """Starts the spool shipper; capture starts when a session or viewer attaches."""
+        self.spool_shipper.start()
+        print("Analysis pipeline idle until a session or viewer attaches.")
+        if self.mjpeg_server and not self.mjpeg_server.start():
+            print("MJPEG server unavailable; /api/video_feed streams from request threads.")
+        if self.cluster:
+            self.cluster.start(
+                status=self.capacity.status,
+                local_sessions=lambda: [str(session_id) for session_id in list(self.sessions)],
+                on_adopt=lambda session_id, user_id: self.adopt_session(UUID(session_id), UUID(user_id)),
+                on_drop=lambda session_id: self._detach_session(UUID(session_id))
+            )
+
+    def acquire_pipeline(self, holder: str, ttl: Optional[float] = None):
+        """Hold the capture pipeline open, starting it if it is not running.
+
+        With ttl the hold is a lease that lapses unless it is acquired again
+        within ttl seconds.
+        """
+        with self.pipeline_lock:
+            self.pipeline_holders[holder] = time.monotonic() + ttl if ttl else None
+            self._idle_since = None
+            if self.processing_thread is None:
+                self.processing_thread = threading.Thread(target=self._process_frames, name="analysis", daemon=True)
+                self.processing_thread.start()
+                print(f"Analysis pipeline started for {holder}.")
+
+    def release_pipeline(self, holder: str):
+        """Drop a hold; the pipeline stops once it has had none for the linger period."""
+        with self.pipeline_lock:
+            self.pipeline_holders.pop(holder, None)
+            if not self.pipeline_holders and self._idle_since is None:
+                self._idle_since = time.monotonic()
+
+    def _pipeline_idle(self) -> bool:
+        """Called by the processing thread; closes the camera and returns True once it should exit."""
+        with self.pipeline_lock:
+            now = time.monotonic()
+            for holder, expires in list(self.pipeline_holders.items()):
+                if expires is not None and expires < now:
+                    del self.pipeline_holders[holder]
+            if self.pipeline_holders:
+                return False
+            if self._idle_since is None:
+                self._idle_since = now
+            if now - self._idle_since < self.pipeline_linger:
+                return False
+
+            # Checked and cleared under the lock so a new holder starts a fresh thread
+            self.processing_thread = None
+            self._close_camera()
+            return True
+
+    def _open_camera(self) -> bool:
+        camera = cv2.VideoCapture(self.camera_index)
+        if not camera.isOpened():
+            camera.release()
+            return False
+        if self.classifier is None:
+            self._load_classifier()
+        self.camera = camera
+        print("Camera initialized successfully.")
+        return True
+
+    def _close_camera(self):
+        if self.camera is not None:
+            self.camera.release()
+            self.camera = None
+            print("Camera released.")
+        self.face_tracker.reset()
+        if self.classifier is not None and self.classifier.cache is not None:
+            self.classifier.cache.clear()
+        with self.data_lock:
+            self.last_frame = None
+            self.frame_seq += 1
+            self.last_analysis = dict(IDLE_ANALYSIS)
+
+    def pipeline_status(self) -> dict:
+        """Whether capture is running and who is holding it."""
+        with self.pipeline_lock:
+            kinds = Counter(holder.split(":", 1)[0] for holder in self.pipeline_holders)
+            return {
+                "running": self.processing_thread is not None,
+                "camera_open": self.camera is not None,
+                "detector": self.classifier.detector_backend if self.classifier else None,
+                "sessions": kinds["session"],
+                "viewers": kinds["viewer"],
+                "idle_seconds": round(time.monotonic() - self._idle_since, 1) if self._idle_since else None
+            }
+
+    @staticmethod
+    def _new_smoother() -> EmotionSmoother:
+        return EmotionSmoother(
+            alpha=float(os.getenv("SMOOTHING_ALPHA", 0.4)),
+            switch_margin=float(os.getenv("SMOOTHING_SWITCH_MARGIN", 10)),
+            min_dwell=int(os.getenv("SMOOTHING_MIN_DWELL", 2))
+        )
+
+    def _score_faces(self, result: list, tracks: list) -> list:
+        """Smooth and score every face's emotion distribution in one batch."""
+        distributions = [track.state.update(face['emotion']) for face, track in zip(result, tracks)]
+        candidates, stress = self.scoring_model.evaluate(to_vectors(distributions))
+
+        faces = []
+        for face, track, all_emotions, candidate, stress_score in zip(result, tracks, distributions, candidates, stress):
+            dominant_emotion = track.state.settle(EMOTION_LABELS[candidate])
+            face_region = face['region']
+            # Convert numpy values to Python native types
+            faces.append({
+                "face_id": int(track.face_id),
+                "emotion": str(dominant_emotion),
+                "confidence": float(round(all_emotions[dominant_emotion] / 100, 2)),
+                "stress_score": int(stress_score),
+                "all_emotions": {k: float(v) for k, v in all_emotions.items()},
+                "face_detected": bool(True),
+                "region": {
+                    'x': int(face_region['x']),
+                    'y': int(face_region['y']),
+                    'w': int(face_region['w']),
+                    'h': int(face_region['h'])
+                }
+            })
+        return faces
+
+    def _load_classifier(self):
+        """Load the configured emotion backend, falling back to DeepFace."""
+        try:
+            self.classifier = create_emotion_classifier()
+        except Exception as e:
+            print(f"Error loading emotion backend: {e}. Falling back to DeepFace.")
+            self.classifier = create_emotion_classifier(backend="deepface")
+        self.default_detector = self.classifier.detector_backend
+        print(f"Emotion backend: {self.classifier.name}, face detector: {self.default_detector}")
+        self._apply_detector()
+
+    def _apply_detector(self):
+        """Use the current session's detector override and inference cache scope."""
+        if self.classifier is None:
+            return
+        cache = self.classifier.cache
+        if cache is not None and cache.scope != self.current_session_id:
+            cache.begin(self.current_session_id)
+        detector = self.session_detectors.get(self.current_session_id) or self.default_detector
+        if detector != self.classifier.detector_backend:
+            try:
+                self.classifier.set_detector(detector)
+                print(f"Face detector switched to {detector}")
+            except Exception as e:
+                print(f"Error switching face detector to {detector}: {e}")
+
+    def supported_detectors(self) -> tuple:
+        if self.classifier is not None:
+            return self.classifier.supported_detectors
+        return DETECTORS if os.getenv("EMOTION_BACKEND", "deepface") == "deepface" else LEAN_DETECTORS
 
     def _process_frames(self):
-        """Private method to run in a background thread. Continuously captures and analyzes frames."""
+        """Private method to run in a background thread. Captures and analyzes frames while the pipeline is held."""
         frame_count = 0
-        while True:
-            if self.camera is None:
-                # Simulate data if no camera
-                time.sleep(1)
-                simulated_emotion = str(np.random.choice(list(STRESS_MAP.keys())))
-                simulated_score = int(STRESS_MAP[simulated_emotion])
-                analysis_result = {
-                    "emotion": simulated_emotion,
-                    "confidence": float(round(np.random.uniform(0.7, 0.99), 2)),
-                    "stress_score": simulated_score,
-                    "face_detected": True,
-                    "region": {'x': 0, 'y': 0, 'w': 0, 'h': 0}
-                }
-            else:
+        camera_warned = False
+        self.capacity.set_pipeline_running(True)
+        try:
+            while not self._pipeline_idle():
+                if self.camera is None:
+                    # No readings are produced until a camera can be opened
+                    if not self._open_camera():
+                        if not camera_warned:
+                            print(f"Error initializing camera {self.camera_index}; retrying every {CAMERA_RETRY_SECONDS}s.")
+                            camera_warned = True
+                        time.sleep(CAMERA_RETRY_SECONDS)
+                    continue
                 success, frame = self.camera.read()
                 if not success:
                     print("Failed to read frame.")
@@ -81,58 +300,31 @@ class AnalysisService:
                 # Store the latest frame
                 with self.data_lock:
                     self.last_frame = frame.copy()
+                    self.frame_seq += 1
 
-                # Analyze every 5th frame (from version 1)
-                if frame_count % 30 == 0:
+                # Analyze every Nth frame; the capacity model lowers the rate under load
+                if frame_count % self.capacity.settings["analyze_every"] == 0:
+                    started = time.perf_counter()
                     try:
-                        result = DeepFace.analyze(
-                            frame, 
-                            actions=['emotion'], 
-                            enforce_detection=False,
-                            silent=True,
-                            detector_backend='ssd'
-                        )
+                        result = self.classifier.analyze(frame)
 
                         if isinstance(result, list) and len(result) > 0:
-                            all_emotions = result[0]['emotion']
-                            dominant_emotion = result[0]['dominant_emotion']
-                            face_region = result[0]['region']
-
-                            # --- Neutral override logic (version 1) ---
-                            if dominant_emotion == 'neutral' and all_emotions['neutral'] < 80:
-                                secondary_emotions = {k: v for k, v in all_emotions.items() if k != 'neutral'}
-                                next_highest_emotion = max(secondary_emotions, key=secondary_emotions.get)
-                                if next_highest_emotion in ['sad', 'angry', 'fear', 'disgust'] and secondary_emotions[next_highest_emotion] > 20:
-                                    dominant_emotion = next_highest_emotion
-                            # --- END neutral override ---
-
-                            # --- Weighted stress score (version 2) ---
-                            weighted_stress_score = 0
-                            for emotion, percentage in all_emotions.items():
-                                stress_value = STRESS_MAP.get(emotion, 0)
-                                weighted_stress_score += (percentage / 100) * stress_value
-
-                            # Convert numpy values to Python native types
-                            analysis_result = {
-                                "emotion": str(dominant_emotion),
-                                "confidence": float(round(all_emotions[dominant_emotion] / 100, 2)),
-                                "stress_score": int(round(weighted_stress_score)),
-                                "all_emotions": {k: float(v) for k, v in all_emotions.items()},
-                                "face_detected": bool(True),
-                                "region": {
-                                    'x': int(face_region['x']),
-                                    'y': int(face_region['y']),
-                                    'w': int(face_region['w']),
-                                    'h': int(face_region['h'])
-                                }
-                            }
+                            # Every face was classified in one batch; keep ids stable across frames
+                            tracks = self.face_tracker.update([face['region'] for face in result])
+                            faces = self._score_faces(result, tracks)
+
+                            # The longest-tracked face drives the session reading
+                            primary = min(faces, key=lambda f: f["face_id"])
+                            analysis_result = {**primary, "faces": faces}
                         else:
+                            self.face_tracker.reset()
                             analysis_result = {
                                 "emotion": "neutral",
                                 "confidence": float(0.0),
                                 "stress_score": int(0),
                                 "face_detected": bool(False),
-                                "region": {'x': 0, 'y': 0, 'w': 0, 'h': 0}
+                                "region": {'x': 0, 'y': 0, 'w': 0, 'h': 0},
+                                "faces": []
                             }
 
                     except Exception as e:
@@ -144,93 +336,200 @@ class AnalysisService:
                             "face_detected": False,
                             "region": {'x':0,'y':0,'w':0,'h':0}
                         }
+                    self.capacity.record_work(time.perf_counter() - started)
 
-                    # Update global state and store in database
+                    # Update live state; only meaningful changes are stored
                     with self.data_lock:
+                        emit = self.emission_policy.should_emit(analysis_result)
+                        if emit:
+                            self.emit_seq += 1
+                        analysis_result["seq"] = self.emit_seq
                         self.last_analysis = analysis_result
-                        self.history_log.append(analysis_result)
-                        self.history_log = self.history_log[-100:]
-                        
-                        # Record emotion if we have an active session
-                        if self.current_session_id and self.current_user_id:
-                            try:
-                                # Store emotion data for async processing
-                                loop = asyncio.get_event_loop()
-                                if loop and loop.is_running():
-                                    future = asyncio.run_coroutine_threadsafe(
-                                        self.session_service.record_emotion(
-                                            self.current_session_id,
-                                            analysis_result
-                                        ),
-                                        loop
-                                    )
-                                    future.add_done_callback(lambda f: print(
-                                        f"Emotion recorded: {f.result() if not f.cancelled() else 'cancelled'}"
-                                    ))
-                                else:
-                                    print("Warning: Event loop not running, emotion not recorded")
-                            except Exception as e:
-                                print(f"Error recording emotion: {e}", flush=True)
+                        if emit:
+                            self.history.append(analysis_result)
+
+                            # The camera sees one user, so the reading only belongs to
+                            # the recording session; the shipper replays it to Supabase
+                            session_id = self.current_session_id
+                            if analysis_result["emotion"] != "error" and session_id in self.sessions:
+                                try:
+                                    self.spool.append(session_id, self.sessions[session_id], analysis_result)
+                                except Exception as e:
+                                    print(f"Error spooling emotion: {e}", flush=True)
 
                 frame_count += 1
                 time.sleep(0.01)
-
-    def generate_video_feed(self):
-        """Generator for the video feed."""
-        while True:
+        finally:
+            # Also reached if the loop crashes, so the next holder can start a new thread
+            with self.pipeline_lock:
+                # A holder may already have started the next thread, which is still running
+                if self.processing_thread in (None, threading.current_thread()):
+                    self.capacity.set_pipeline_running(False)
+                if self.processing_thread is threading.current_thread():
+                    self.processing_thread = None
+                    self._close_camera()
+
+        print("Analysis pipeline stopped.")
+
+    def render_frame(self) -> Optional[bytes]:
+        """Draw the analysis overlay on the latest frame and JPEG-encode it.
+
+        Returns None while there is no frame or video is shed under load.
+        """
+        settings = self.capacity.settings
+        if not settings["video"]:
+            return None
+        started = time.perf_counter()
+        with self.data_lock:
             if self.last_frame is None:
-                time.sleep(0.1)
-                continue
-
-            with self.data_lock:
-                frame = self.last_frame.copy()
-                analysis_data = self.last_analysis.copy()
-
-            emotion = analysis_data.get("emotion", "loading...")
-            stress = analysis_data.get("stress_score", 0)
-
-            # Draw bounding box if face detected
-            if analysis_data.get("face_detected", False):
-                try:
-                    region = analysis_data['region']
+                return None
+            frame = self.last_frame.copy()
+            analysis_data = self.last_analysis.copy()
+
+        emotion = analysis_data.get("emotion", "loading...")
+        stress = analysis_data.get("stress_score", 0)
+
+        # Draw a bounding box for every detected face
+        if analysis_data.get("face_detected", False):
+            try:
+                for face in analysis_data.get("faces") or [analysis_data]:
+                    region = face['region']
                     x, y, w, h = region['x'], region['y'], region['w'], region['h']
                     cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                except Exception as e:
-                    print(f"Error drawing rectangle: {e}")
+                    if "face_id" in face:
+                        cv2.putText(frame, f"#{face['face_id']} {face['emotion']} {face['stress_score']}",
+                                    (x, max(y - 8, 12)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv2.LINE_AA)
+            except Exception as e:
+                print(f"Error drawing rectangle: {e}")
+
+        # Draw info on the frame
+        cv2.putText(frame, f"Emotion: {emotion}", (10, 30), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
+        cv2.putText(frame, f"Stress: {stress}", (10, 60), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
+
+        if settings["video_scale"] != 1.0:
+            frame = cv2.resize(frame, None, fx=settings["video_scale"], fy=settings["video_scale"])
+        flag, encodedImage = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, settings["jpeg_quality"]])
+        self.capacity.record_work(time.perf_counter() - started)
+        if not flag:
+            return None
+        return encodedImage.tobytes()
+
+    def encoded_frame(self) -> Tuple[int, Optional[bytes]]:
+        """The latest frame with its overlay as (frame seq, JPEG), encoded once per captured frame."""
+        with self._jpeg_lock:
+            if self._jpeg[0] != self.frame_seq:
+                self._jpeg = (self.frame_seq, self.render_frame())
+            return self._jpeg
+
+    def video_stream_port(self) -> Optional[int]:
+        """Port of this node's MJPEG server, or None if video is served by request threads."""
+        return self.mjpeg_server.port if self.mjpeg_server and self.mjpeg_server.running else None
 
-            # Draw info on the frame
-            cv2.putText(frame, f"Emotion: {emotion}", (10, 30), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
-            cv2.putText(frame, f"Stress: {stress}", (10, 60), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
+    def generate_video_feed(self):
+        """Generator for the video feed; holds the pipeline until the client disconnects.
 
-            flag, encodedImage = cv2.imencode(".jpg", frame)
-            if not flag:
-                continue
+        Only used when the MJPEG server is disabled or could not start.
+        """
+        holder = f"viewer:{uuid4()}"
+        self.acquire_pipeline(holder)
+        last_seq = None
+        try:
+            while True:
+                seq, jpeg = self.encoded_frame()
+                if jpeg is None or seq == last_seq:
+                    time.sleep(0.05)
+                    continue
+                last_seq = seq
 
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + bytearray(encodedImage) + b'\r\n')
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            self.release_pipeline(holder)
 
     def get_analysis(self):
         """Safely get the last analysis result."""
         with self.data_lock:
             return self.last_analysis
 
-    def get_history(self):
-        """Safely get the history log."""
+    def get_history(self, last: Optional[int] = 100) -> list:
+        """Safely get a copy of the newest history entries."""
+        with self.data_lock:
+            return self.history.to_dicts(last)
+
+    def get_history_stats(self, seconds: float = 300) -> dict:
+        """Rolling statistics over the last `seconds` of history."""
+        with self.data_lock:
+            return self.history.window_stats(seconds)
+
+    def rescore_history(self, model: Optional[dict] = None, last: Optional[int] = None, limit: int = 100) -> dict:
+        """Re-score the stored history under a scoring model without changing it.
+
+        model is a scoring model config (see stress_scoring.DEFAULT_MODEL);
+        None uses the active one. Returns the newest `limit` rescored
+        readings and how the scores compare with the stored ones.
+        """
+        if limit < 1 or (last is not None and last < 1):
+            raise ValueError("last and limit must be positive")
+        scoring_model = ScoringModel.from_dict(model) if model else self.scoring_model
         with self.data_lock:
-            return self.history_log
+            current = self.history.snapshot(last).copy()
+            rescored = self.history.rescored(scoring_model, last)
+            readings = self.history.to_dicts(records=rescored[-limit:])
+
+        scored = (current["emotion"] >= 0) & current["face_detected"]
+        changed = current["emotion"][scored] != rescored["emotion"][scored]
+        stress_delta = rescored["stress"][scored].astype(int) - current["stress"][scored]
+        return {
+            "model": scoring_model.to_dict(),
+            "readings": int(len(current)),
+            "rescored": int(scored.sum()),
+            "emotion_changed": int(changed.sum()),
+            "mean_stress": {
+                "stored": float(current["stress"][scored].mean()) if scored.any() else None,
+                "rescored": float(rescored["stress"][scored].mean()) if scored.any() else None,
+            },
+            "max_abs_stress_delta": int(np.abs(stress_delta).max()) if scored.any() else None,
+            "history": readings
+        }
+
+    async def start_session(self, user_id: UUID, detector: Optional[str] = None) -> dict:
+        """Start a new analysis session for a user.
 
-    async def start_session(self, user_id: UUID) -> dict:
-        """Start a new analysis session for a user."""
+        detector overrides the node's face detector while this is the
+        current session. If the node has no capacity, returns the admission
+        decision ({"admission": "queued" | "rejected", ...}) instead of a
+        session.
+        """
+        if detector and detector not in self.supported_detectors():
+            raise ValueError(f"detector must be one of {', '.join(self.supported_detectors())}")
         try:
+            decision = self.capacity.admit(str(user_id))
+            if decision["admission"] != "admitted":
+                print(f"Session for user {user_id} not admitted: {decision}")
+                return decision
+
             print(f"Starting session for user {user_id}")
-            self.current_user_id = user_id
-            session = await self.session_service.create_session(user_id)
+            try:
+                session = await self.session_service.create_session(user_id)
+            except Exception:
+                self.capacity.release(str(user_id))
+                raise
             print(f"Created session: {session}")
             
             if session and session.get('id'):
                 self.current_session_id = UUID(session['id'])
+                with self.data_lock:
+                    self.sessions[self.current_session_id] = user_id
+                if detector:
+                    self.session_detectors[self.current_session_id] = detector
+                self._apply_detector()
+                self.acquire_pipeline(f"session:{self.current_session_id}")
+                if self.cluster:
+                    self.cluster.assign(session['id'], str(user_id))
+                # Make sure the session's first reading is stored
+                self.emission_policy.reset()
                 print(f"Set current_session_id to {self.current_session_id}")
             else:
                 print(f"Warning: Invalid session response: {session}")
@@ -240,15 +539,52 @@ class AnalysisService:
             print(f"Error in start_session: {e}")
             raise
 
-    async def end_session(self) -> dict:
-        """End the current analysis session."""
-        if self.current_session_id:
-            session = await self.session_service.end_session(self.current_session_id)
-            self.current_session_id = None
-            self.current_user_id = None
+    async def end_session(self, session_id: UUID, user_id: Optional[UUID] = None) -> dict:
+        """End a session on this node; None if it is not running here.
+
+        With user_id, raises PermissionError unless the session is that user's.
+        """
+        owner = self.sessions.get(session_id)
+        if owner is not None and user_id is not None and owner != user_id:
+            raise PermissionError("The session belongs to another user")
+        if owner is not None:
+            session = await self.session_service.end_session(session_id)
+            if self.cluster:
+                self.cluster.release(str(session_id))
+            self._detach_session(session_id)
             return session
         return None
 
+    def adopt_session(self, session_id: UUID, user_id: UUID):
+        """Take over a running session from a node that went down."""
+        print(f"Adopting session {session_id} for user {user_id}")
+        with self.data_lock:
+            self.sessions[session_id] = user_id
+        self.capacity.adopt(str(user_id))
+        self.acquire_pipeline(f"session:{session_id}")
+        self.current_session_id = self.current_session_id or session_id
+
+    def _detach_session(self, session_id: UUID):
+        """Stop recording a session on this node without ending it."""
+        with self.data_lock:
+            user_id = self.sessions.pop(session_id, None)
+        if user_id is None:
+            return
+        self.capacity.release(str(user_id))
+        self.release_pipeline(f"session:{session_id}")
+        self.session_detectors.pop(session_id, None)
+        if session_id == self.current_session_id:
+            self.current_session_id = next(reversed(self.sessions), None)
+        self._apply_detector()
+
+    def get_capacity(self) -> dict:
+        """Capacity, load-shedding, pipeline and video status of this node."""
+        return {
+            **self.capacity.status(),
+            "pipeline": self.pipeline_status(),
+            "video": self.mjpeg_server.stats() if self.mjpeg_server else None
+        }
+
     async def get_user_sessions(self, user_id: UUID, days: int = 7) -> list:
         """Get all sessions for a user within the specified time period."""
         return await self.session_service.get_user_sessions(user_id, days)
@@ -257,19 +593,242 @@ class AnalysisService:
         """Get statistics for a specific session."""
         return await self.session_service.get_session_stats(session_id)
 
-    async def get_session_emotions(self, session_id: UUID) -> list:
+    async def get_session(self, session_id: UUID) -> dict:
+        """Get a session row by its ID."""
+        return await self.session_service.get_session(session_id)
+
+    async def get_session_emotions(self, session_id: UUID, session: Optional[dict] = None) -> list:
         """Get all emotion records for a session."""
-        return await self.session_service.get_session_emotions(session_id)
+        return await self.session_service.get_session_emotions(session_id, session)
+
+    async def get_user_daily_summary(self, user_id: UUID, days: int = 7) -> dict:
+        """Summarise a user's last days from the daily rollup."""
+        return await self.session_service.get_user_daily_summary(user_id, days)
+
+    def get_archived_history(self, user_id: UUID, days: int = 90) -> dict:
+        """Daily summaries for a user read from the columnar archive."""
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        latest = self.archive.latest_recorded_at(user_id)
+        return {
+            "user_id": str(user_id),
+            "archived_until": latest.isoformat() if latest else None,
+            "days": self.archive.daily_summary(user_id, since=since)
+        }
+
+    def get_spool_stats(self) -> dict:
+        """Backlog of readings not yet shipped to Supabase."""
+        return self.spool.stats()
+
+    def get_inference_cache_stats(self) -> dict:
+        """Hit rate and audited accuracy delta of the inference cache, per session."""
+        if self.classifier is None:
+            # The model loads with the pipeline
+            return {"enabled": int(os.getenv("INFERENCE_CACHE_SIZE", 64)) > 0, "loaded": False}
+        if self.classifier.cache is None:
+            return {"enabled": False}
+        return self.classifier.cache.stats()
+
+    def start_profile(self, target: str = "analysis", seconds: float = 10, interval: float = 0.01) -> dict:
+        """Sample the analysis thread or the request threads for `seconds`."""
+        if target == "analysis":
+            thread_filter = lambda thread: thread is self.processing_thread
+        elif target == "requests":
+            thread_filter = is_request_thread
+        else:
+            raise ValueError("target must be analysis or requests")
+        return profiler.start(target, seconds, interval, thread_filter)
+
+    def get_profile(self, profile_id: str) -> Optional[dict]:
+        """A profile's status and, once done, its folded stacks."""
+        return profiler.get(profile_id)
+
+    def store_profile(self, profile: dict):
+        """Keep an HTTP worker's request profile so every worker can serve it."""
+        profiler.store(profile)
+
+    def memory_snapshot(self, action: str = "snapshot", top: int = 20) -> dict:
+        """Start or stop allocation tracking, or report the top allocation sites."""
+        if action == "start":
+            return allocations.start()
+        if action == "stop":
+            return allocations.stop()
+        if action == "status":
+            return allocations.status()
+        return allocations.snapshot(top)
+
+    def serve_shared_state(self, fps: float = 15.0):
+        """Run as the analysis process of the multi-worker deployment.
+
+        Publishes the latest analysis and a rendered JPEG frame to shared
+        memory fps times a second and answers HTTP workers' commands on the
+        control channel. Blocks forever.
+        """
+        writer = SharedStateWriter()
+        atexit.register(writer.close)
+
+        def publish():
+            while True:
+                started = time.monotonic()
+                # Once a second is enough while nothing is being captured
+                interval = 1.0 / fps if self.processing_thread is not None else 1.0
+                try:
+                    writer.publish(self.get_analysis(), self.encoded_frame()[1])
+                except Exception as e:
+                    print(f"Error publishing shared state: {e}")
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+        threading.Thread(target=publish, name="shared-state", daemon=True).start()
+        ControlServer({
+            "get_history": self.get_history,
+            "get_history_stats": self.get_history_stats,
+            "rescore_history": self.rescore_history,
+            "get_spool_stats": self.get_spool_stats,
+            "get_inference_cache_stats": self.get_inference_cache_stats,
+            "get_archived_history": lambda user_id, days: self.get_archived_history(UUID(user_id), days),
+            "start_session": lambda user_id, detector=None: asyncio.run(self.start_session(UUID(user_id), detector)),
+            "end_session": lambda session_id, user_id=None: asyncio.run(
+                self.end_session(UUID(session_id), UUID(user_id) if user_id else None)
+            ),
+            "get_capacity": self.get_capacity,
+            "acquire_pipeline": self.acquire_pipeline,
+            "release_pipeline": self.release_pipeline,
+            "start_profile": self.start_profile,
+            "get_profile": self.get_profile,
+            "store_profile": self.store_profile,
+            "memory_snapshot": self.memory_snapshot,
+        }).serve_forever()
 
     def cleanup(self):
-        """Release camera and end session on exit."""
-        if self.camera and self.camera.isOpened():
-            self.camera.release()
-            print("Camera released.")
-        
-        if self.current_session_id:
-            import asyncio
-            asyncio.create_task(self.end_session())
+        """Release camera, flush the spool and end session on exit."""
+        self.spool_shipper.stop()
+        self.spool.close()
+
+        for session_id in list(self.sessions):
+            try:
+                asyncio.run(self.end_session(session_id))
+            except Exception as e:
+                print(f"Error ending session {session_id} on exit: {e}")
+
+        if self.cluster:
+            self.cluster.stop()
+
+        with self.pipeline_lock:
+            self.pipeline_holders.clear()
+            self.processing_thread = None
+            self._close_camera()
+
+
+class RemoteAnalysisService:
+    """AnalysisService stand-in for HTTP workers in the multi-worker deployment.
+
+    The analysis process (run_analysis.py) owns the camera and the model.
+    Workers read its latest analysis and frame from shared memory, send
+    stateful commands over the control channel and query Supabase directly.
+    """
+
+    def __init__(self, fps: float = 15.0):
+        self.fps = fps
+        self.state = SharedStateReader()
+        self.control = ControlClient()
+        self.profiles = SharedProfiler(self.control)
+        self.session_service = SessionService()
+        # Read-only: the analysis process heartbeats and owns the sessions
+        self.cluster = cluster_from_env()
+
+    def start_processing(self):
+        print("HTTP worker reading analysis state from shared memory.")
+
+    def video_stream_port(self) -> Optional[int]:
+        # The analysis process runs the MJPEG server for the whole node
+        return int(os.getenv("MJPEG_PORT", 5002)) or None
+
+    def get_analysis(self):
+        _, analysis, _ = self.state.read()
+        return analysis or {"emotion": "neutral", "confidence": 0.0, "stress_score": 20}
+
+    def generate_video_feed(self):
+        """Stream the frames the analysis process already encoded.
+
+        Holds the analysis process's pipeline with a lease renewed while the
+        client stays connected.
+        """
+        holder = f"viewer:{uuid4()}"
+        renew_at = 0.0
+        last_seq = None
+        try:
+            while True:
+                if time.monotonic() >= renew_at:
+                    self.control.call("acquire_pipeline", holder=holder, ttl=VIEWER_LEASE_SECONDS)
+                    renew_at = time.monotonic() + VIEWER_LEASE_SECONDS / 3
+                seq, _, jpeg = self.state.read()
+                if seq == last_seq or not jpeg:
+                    time.sleep(1.0 / self.fps)
+                    continue
+                last_seq = seq
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            try:
+                self.control.call("release_pipeline", holder=holder)
+            except Exception as e:
+                print(f"Error releasing pipeline for {holder}: {e}")
+
+    def get_history(self, last: Optional[int] = 100) -> list:
+        return self.control.call("get_history", last=last)
+
+    def get_history_stats(self, seconds: float = 300) -> dict:
+        return self.control.call("get_history_stats", seconds=seconds)
+
+    def rescore_history(self, model: Optional[dict] = None, last: Optional[int] = None, limit: int = 100) -> dict:
+        return self.control.call("rescore_history", model=model, last=last, limit=limit)
+
+    def get_spool_stats(self) -> dict:
+        return self.control.call("get_spool_stats")
+
+    def get_inference_cache_stats(self) -> dict:
+        return self.control.call("get_inference_cache_stats")
+
+    def get_archived_history(self, user_id: UUID, days: int = 90) -> dict:
+        return self.control.call("get_archived_history", user_id=str(user_id), days=days)
+
+    async def start_session(self, user_id: UUID, detector: Optional[str] = None) -> dict:
+        return self.control.call("start_session", user_id=str(user_id), detector=detector)
+
+    async def end_session(self, session_id: UUID, user_id: Optional[UUID] = None) -> dict:
+        return self.control.call("end_session", session_id=str(session_id), user_id=str(user_id) if user_id else None)
+
+    def get_capacity(self) -> dict:
+        return self.control.call("get_capacity")
+
+    def start_profile(self, target: str = "analysis", seconds: float = 10, interval: float = 0.01) -> dict:
+        return self.profiles.start(target, seconds, interval)
+
+    def get_profile(self, profile_id: str) -> Optional[dict]:
+        return self.profiles.get(profile_id)
+
+    def memory_snapshot(self, action: str = "snapshot", top: int = 20) -> dict:
+        return self.control.call("memory_snapshot", action=action, top=top)
+
+    async def get_user_sessions(self, user_id: UUID, days: int = 7) -> list:
+        return await self.session_service.get_user_sessions(user_id, days)
+
+    async def get_session_stats(self, session_id: UUID) -> dict:
+        return await self.session_service.get_session_stats(session_id)
+
+    async def get_session(self, session_id: UUID) -> dict:
+        return await self.session_service.get_session(session_id)
+
+    async def get_session_emotions(self, session_id: UUID, session: Optional[dict] = None) -> list:
+        return await self.session_service.get_session_emotions(session_id, session)
+
+    async def get_user_daily_summary(self, user_id: UUID, days: int = 7) -> dict:
+        return await self.session_service.get_user_daily_summary(user_id, days)
+
 
-# Create a single instance to be shared across the app
-analysis_service = AnalysisService()
+# Create a single instance to be shared across the app. HTTP workers of the
+# multi-worker deployment (gunicorn.conf.py) only get a proxy to the
+# analysis process.
+if os.getenv("MOODVUE_ROLE") == "http":
+    analysis_service = RemoteAnalysisService()
+else:
+    analysis_service = AnalysisService()
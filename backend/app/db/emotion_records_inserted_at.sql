@@ -0,0 +1,27 @@
+-- When each reading reached the database. recorded_at is when it was
+-- captured, and readings the spool delivers after an outage arrive with a
+-- recorded_at hours in the past, so the archive export keys its watermark
+-- on inserted_at instead.
+--
+-- Existing rows take their recorded_at, which is what exporter watermarks
+-- written before this column existed were keyed on.
+
+BEGIN;
+
+ALTER TABLE public.emotion_records ADD COLUMN IF NOT EXISTS inserted_at timestamptz;
+
+-- Only inserted_at changes, so the session stats need no refresh
+ALTER TABLE public.emotion_records DISABLE TRIGGER update_session_stats_on_update;
+UPDATE public.emotion_records SET inserted_at = recorded_at WHERE inserted_at IS NULL;
+ALTER TABLE public.emotion_records ENABLE TRIGGER update_session_stats_on_update;
+
+ALTER TABLE public.emotion_records
+    ALTER COLUMN inserted_at SET DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN inserted_at SET NOT NULL;
+
+-- Archive export: the user's sessions joined to session_id = ? AND
+-- (inserted_at, id) > watermark ORDER BY inserted_at, id
+CREATE INDEX IF NOT EXISTS idx_emotion_records_session_inserted
+ON public.emotion_records(session_id, inserted_at, id);
+
+COMMIT;
@@ -0,0 +1,331 @@
+-- Rebuild emotion_records as a table range-partitioned by month on recorded_at,
+-- with a narrower row and a retention job that rolls old months up into
+-- hourly aggregates before dropping them.
+--
+-- Row layout: the two uuids and the timestamp first, then the 4-byte enum,
+-- the two smallints and the boolean, so nothing is padded. stress_score is
+-- 0-100 and confidence is a 0-100 percentage. created_at/updated_at are gone:
+-- readings are never updated and recorded_at already says when they arrived.
+--
+-- Not reversible; take a backup first.
+
+BEGIN;
+
+ALTER TABLE public.emotion_records RENAME TO emotion_records_unpartitioned;
+DROP TRIGGER IF EXISTS update_session_stats_trigger ON public.emotion_records_unpartitioned;
+DROP TRIGGER IF EXISTS update_emotion_records_updated_at ON public.emotion_records_unpartitioned;
+
+-- Objects that depend on the old table's row type. The view and helper
+-- functions from sessions_integration.sql are unused by the app; the
+-- sessions policy is recreated below.
+DROP POLICY IF EXISTS "Emotion records can trigger session updates" ON public.sessions;
+DROP FUNCTION IF EXISTS public.get_user_sessions(uuid, integer);
+DROP VIEW IF EXISTS public.session_stats;
+DROP FUNCTION IF EXISTS public.get_session_emotions(uuid);
+
+CREATE TABLE public.emotion_records (
+    id uuid NOT NULL DEFAULT gen_random_uuid(),
+    session_id uuid NOT NULL REFERENCES public.sessions(id) ON DELETE CASCADE,
+    recorded_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    emotion emotion_type NOT NULL,
+    stress_score smallint CHECK (stress_score BETWEEN 0 AND 100),
+    confidence smallint NOT NULL CHECK (confidence BETWEEN 0 AND 100),
+    face_detected boolean NOT NULL DEFAULT true,
+    -- A partitioned table's primary key must include the partition key
+    PRIMARY KEY (id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+
+-- Catches readings outside every monthly partition instead of failing the insert
+CREATE TABLE public.emotion_records_default PARTITION OF public.emotion_records DEFAULT;
+
+CREATE OR REPLACE FUNCTION public.create_emotion_record_partition(month_start date)
+RETURNS text AS $$
+DECLARE
+    start_at date := date_trunc('month', month_start)::date;
+    partition_name text := format('emotion_records_%s', to_char(start_at, 'YYYY_MM'));
+    from_at timestamptz := start_at::timestamp AT TIME ZONE 'UTC';
+    to_at timestamptz := (start_at + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass(format('public.%I', partition_name)) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM public.emotion_records_default
+        WHERE recorded_at >= from_at AND recorded_at < to_at
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.emotion_records FOR VALUES FROM (%L) TO (%L)',
+            partition_name, from_at, to_at
+        );
+        RETURN partition_name;
+    END IF;
+
+    -- The default partition already holds readings for this month, which
+    -- would make the new partition's bounds overlap it. Detach it, move the
+    -- month's rows across and attach it again, all in the caller's
+    -- transaction. The rows go straight into the partitions, so the
+    -- statement-level triggers on emotion_records do not count them twice.
+    ALTER TABLE public.emotion_records DETACH PARTITION public.emotion_records_default;
+    EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.emotion_records FOR VALUES FROM (%L) TO (%L)',
+        partition_name, from_at, to_at
+    );
+    EXECUTE format(
+        'WITH moved AS (
+            DELETE FROM public.emotion_records_default
+            WHERE recorded_at >= %L AND recorded_at < %L
+            RETURNING *
+        )
+        INSERT INTO public.%I SELECT * FROM moved',
+        from_at, to_at, partition_name
+    );
+    ALTER TABLE public.emotion_records ATTACH PARTITION public.emotion_records_default DEFAULT;
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- One partition per month of existing data, plus the next few months
+SELECT public.create_emotion_record_partition(month::date)
+FROM generate_series(
+    date_trunc('month', COALESCE((SELECT MIN(recorded_at) FROM public.emotion_records_unpartitioned), now()) AT TIME ZONE 'UTC'),
+    date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months',
+    interval '1 month'
+) AS month;
+
+-- Old rows stored confidence as a 0-1 fraction in numeric(5,2)
+INSERT INTO public.emotion_records (id, session_id, recorded_at, emotion, stress_score, confidence, face_detected)
+SELECT
+    id,
+    session_id,
+    recorded_at,
+    emotion,
+    ROUND(stress_score)::smallint,
+    ROUND(CASE WHEN confidence <= 1 THEN confidence * 100 ELSE confidence END)::smallint,
+    COALESCE(face_detected, true)
+FROM public.emotion_records_unpartitioned
+WHERE session_id IS NOT NULL;
+
+DROP TABLE public.emotion_records_unpartitioned;
+
+-- Indexes are declared on the parent and created on every partition.
+-- The composite index serves per-session history; BRIN on recorded_at costs
+-- a few pages per partition and serves time-range scans, since readings
+-- arrive in roughly recorded_at order.
+CREATE INDEX idx_emotion_records_session_recorded
+ON public.emotion_records(session_id, recorded_at, id)
+INCLUDE (emotion, stress_score, confidence, face_detected);
+
+CREATE INDEX idx_emotion_records_recorded_at_brin
+ON public.emotion_records USING brin (recorded_at) WITH (pages_per_range = 32);
+
+-- Session statistics, recomputed once per statement for the sessions it
+-- touched rather than once per row. Bounding recorded_at by the session's
+-- start lets the planner skip partitions the session cannot have rows in.
+CREATE OR REPLACE FUNCTION public.refresh_session_stats(session_ids uuid[])
+RETURNS void AS $$
+    UPDATE public.sessions s
+    SET
+        total_readings = stats.total_readings,
+        avg_stress_score = stats.avg_stress_score,
+        dominant_emotion = stats.dominant_emotion,
+        avg_confidence = stats.avg_confidence,
+        calm_readings = stats.calm_readings,
+        happy_readings = stats.happy_readings,
+        stressed_readings = stats.stressed_readings,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT
+            ss.id,
+            COUNT(er.id) as total_readings,
+            ROUND(AVG(er.stress_score)::numeric, 2) as avg_stress_score,
+            MODE() WITHIN GROUP (ORDER BY er.emotion) as dominant_emotion,
+            -- sessions keep reporting confidence as a 0-1 fraction
+            ROUND(AVG(er.confidence)::numeric / 100, 2) as avg_confidence,
+            COUNT(CASE WHEN er.emotion = 'calm' THEN 1 END) as calm_readings,
+            COUNT(CASE WHEN er.emotion = 'happy' THEN 1 END) as happy_readings,
+            COUNT(CASE WHEN er.emotion IN ('angry', 'fear', 'disgust', 'sad') THEN 1 END) as stressed_readings
+        FROM public.sessions ss
+        LEFT JOIN public.emotion_records er
+            ON er.session_id = ss.id
+            AND er.recorded_at >= ss.started_at - interval '1 day'
+        WHERE ss.id = ANY(session_ids)
+        GROUP BY ss.id
+    ) stats
+    WHERE s.id = stats.id;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.update_session_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    session_ids uuid[];
+BEGIN
+    -- Each branch only references the transition tables its trigger declares
+    IF TG_OP = 'INSERT' THEN
+        session_ids := ARRAY(SELECT DISTINCT session_id FROM new_records);
+    ELSIF TG_OP = 'DELETE' THEN
+        session_ids := ARRAY(SELECT DISTINCT session_id FROM old_records);
+    ELSE
+        session_ids := ARRAY(SELECT session_id FROM new_records UNION SELECT session_id FROM old_records);
+    END IF;
+    PERFORM public.refresh_session_stats(session_ids);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER update_session_stats_on_insert
+    AFTER INSERT ON public.emotion_records
+    REFERENCING NEW TABLE AS new_records
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.update_session_stats();
+
+CREATE TRIGGER update_session_stats_on_update
+    AFTER UPDATE ON public.emotion_records
+    REFERENCING NEW TABLE AS new_records OLD TABLE AS old_records
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.update_session_stats();
+
+CREATE TRIGGER update_session_stats_on_delete
+    AFTER DELETE ON public.emotion_records
+    REFERENCING OLD TABLE AS old_records
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.update_session_stats();
+
+-- Hourly aggregates of readings whose partitions have been retired
+CREATE TABLE IF NOT EXISTS public.emotion_record_rollups (
+    session_id uuid NOT NULL REFERENCES public.sessions(id) ON DELETE CASCADE,
+    bucket timestamptz NOT NULL,
+    emotion emotion_type NOT NULL,
+    readings integer NOT NULL,
+    faces_detected integer NOT NULL,
+    stress_sum integer NOT NULL,
+    confidence_sum integer NOT NULL,
+    PRIMARY KEY (session_id, bucket, emotion)
+);
+
+-- Keeps partitions created ahead of time and retires months older than
+-- retain_months: their readings are rolled up into emotion_record_rollups
+-- (unless rollup is false) and the partition is detached and dropped, which
+-- costs no per-row deletes and leaves no dead tuples behind.
+CREATE OR REPLACE FUNCTION public.maintain_emotion_records(
+    retain_months integer DEFAULT 12,
+    months_ahead integer DEFAULT 3,
+    rollup boolean DEFAULT true
+)
+RETURNS TABLE(action text, partition_name text, rollup_rows bigint) AS $$
+DECLARE
+    cutoff date := (date_trunc('month', now() AT TIME ZONE 'UTC') - make_interval(months => retain_months))::date;
+    part record;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        action := 'ensured';
+        partition_name := public.create_emotion_record_partition(
+            (date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => i))::date
+        );
+        rollup_rows := NULL;
+        RETURN NEXT;
+    END LOOP;
+
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.emotion_records'::regclass
+        AND c.relname ~ '^emotion_records_\d{4}_\d{2}$'
+        AND (to_date(right(c.relname, 7), 'YYYY_MM') + interval '1 month')::date <= cutoff
+        ORDER BY c.relname
+    LOOP
+        partition_name := part.relname;
+        rollup_rows := NULL;
+        IF rollup THEN
+            EXECUTE format($q$
+                INSERT INTO public.emotion_record_rollups AS r
+                    (session_id, bucket, emotion, readings, faces_detected, stress_sum, confidence_sum)
+                SELECT
+                    session_id,
+                    date_trunc('hour', recorded_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                    emotion,
+                    COUNT(*),
+                    COUNT(*) FILTER (WHERE face_detected),
+                    COALESCE(SUM(stress_score), 0),
+                    SUM(confidence)
+                FROM public.%I
+                GROUP BY 1, 2, 3
+                ON CONFLICT (session_id, bucket, emotion) DO UPDATE SET
+                    readings = r.readings + EXCLUDED.readings,
+                    faces_detected = r.faces_detected + EXCLUDED.faces_detected,
+                    stress_sum = r.stress_sum + EXCLUDED.stress_sum,
+                    confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum
+            $q$, part.relname);
+            GET DIAGNOSTICS rollup_rows = ROW_COUNT;
+        END IF;
+        EXECUTE format('ALTER TABLE public.emotion_records DETACH PARTITION public.%I', part.relname);
+        EXECUTE format('DROP TABLE public.%I', part.relname);
+        action := CASE WHEN rollup THEN 'rolled_up' ELSE 'dropped' END;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Maintenance runs with the service key only
+REVOKE ALL ON FUNCTION public.create_emotion_record_partition(date) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.maintain_emotion_records(integer, integer, boolean) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.refresh_session_stats(uuid[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.maintain_emotion_records(integer, integer, boolean) TO service_role;
+
+-- RLS on the parent applies to every partition
+ALTER TABLE public.emotion_records ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.emotion_record_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view emotion records for their sessions"
+    ON public.emotion_records
+    FOR SELECT
+    TO authenticated
+    USING (
+        EXISTS (
+            SELECT 1
+            FROM public.sessions s
+            WHERE s.id = session_id
+            AND s.user_id = auth.uid()::uuid
+        )
+    );
+
+CREATE POLICY "Users can insert emotion records for active sessions"
+    ON public.emotion_records
+    FOR INSERT
+    TO authenticated
+    WITH CHECK (
+        EXISTS (
+            SELECT 1
+            FROM public.sessions s
+            WHERE s.id = session_id
+            AND s.user_id = auth.uid()::uuid
+            AND s.ended_at IS NULL
+        )
+    );
+
+CREATE POLICY "Users can view rollups for their sessions"
+    ON public.emotion_record_rollups
+    FOR SELECT
+    TO authenticated
+    USING (
+        EXISTS (
+            SELECT 1
+            FROM public.sessions s
+            WHERE s.id = session_id
+            AND s.user_id = auth.uid()::uuid
+        )
+    );
+
+CREATE POLICY "Emotion records can trigger session updates"
+    ON public.sessions
+    FOR UPDATE
+    USING (EXISTS (
+        SELECT 1
+        FROM public.emotion_records er
+        WHERE er.session_id = id
+    ));
+
+COMMIT;
+
+ANALYZE public.emotion_records;
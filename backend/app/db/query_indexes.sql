@@ -0,0 +1,28 @@
+-- Indexes matched to the hot query paths. CONCURRENTLY avoids locking writes
+-- on live tables, so run this file outside a transaction block.
+
+-- get_user_sessions / session export: user_id = ? AND started_at >= ? ORDER BY started_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_user_started
+ON public.sessions(user_id, started_at DESC);
+
+-- get_active_session: user_id = ? AND ended_at IS NULL. Only open sessions are
+-- indexed, so this stays a handful of rows however much history piles up.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_user_active
+ON public.sessions(user_id)
+WHERE ended_at IS NULL;
+
+-- get_session_emotions, the archive export and the session stats trigger:
+-- session_id = ? ORDER BY recorded_at, id. Every column they read is in the
+-- index, so the history scan can be served by an index-only scan.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_emotion_records_session_recorded
+ON public.emotion_records(session_id, recorded_at, id)
+INCLUDE (emotion, stress_score, confidence, face_detected);
+
+-- Superseded by the composite indexes above; dropping them saves a write per insert
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_sessions_user_id;
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_emotion_records_session_id;
+-- No query filters on emotion alone
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_emotion_records_emotion;
+
+ANALYZE public.sessions;
+ANALYZE public.emotion_records;
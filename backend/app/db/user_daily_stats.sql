@@ -0,0 +1,185 @@
+-- Per-user daily rollup for the Insights views, kept current by triggers:
+-- each batch of inserted readings adds its counts, and ending a session adds
+-- its minutes. Days are UTC. Stress is kept as a sum and a sum of squares so
+-- averages and standard deviations over any range come from the day rows.
+-- Rows outlive the raw readings retired by maintain_emotion_records().
+
+CREATE TABLE IF NOT EXISTS public.user_daily_stats (
+    user_id uuid NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+    day date NOT NULL,
+    readings integer NOT NULL DEFAULT 0,
+    stress_readings integer NOT NULL DEFAULT 0,
+    stress_sum bigint NOT NULL DEFAULT 0,
+    stress_sq_sum bigint NOT NULL DEFAULT 0,
+    happy_readings integer NOT NULL DEFAULT 0,
+    sad_readings integer NOT NULL DEFAULT 0,
+    angry_readings integer NOT NULL DEFAULT 0,
+    fear_readings integer NOT NULL DEFAULT 0,
+    surprise_readings integer NOT NULL DEFAULT 0,
+    neutral_readings integer NOT NULL DEFAULT 0,
+    disgust_readings integer NOT NULL DEFAULT 0,
+    calm_readings integer NOT NULL DEFAULT 0,
+    sessions integer NOT NULL DEFAULT 0,
+    session_seconds integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+ALTER TABLE public.user_daily_stats ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own daily stats" ON public.user_daily_stats;
+CREATE POLICY "Users can view their own daily stats"
+    ON public.user_daily_stats
+    FOR SELECT
+    TO authenticated
+    USING (user_id = auth.uid()::uuid);
+
+-- SQL that adds per-(user, day) reading counts for the rows of source, a
+-- table name or parenthesised subquery with session_id, recorded_at, emotion
+-- and stress_score. The insert trigger runs it against its transition table
+-- and the backfill against emotion_records, so both count the same way.
+CREATE OR REPLACE FUNCTION public.user_daily_readings_sql(source text)
+RETURNS text AS $$
+    SELECT format($q$
+        INSERT INTO public.user_daily_stats AS d (
+            user_id, day, readings, stress_readings, stress_sum, stress_sq_sum,
+            happy_readings, sad_readings, angry_readings, fear_readings,
+            surprise_readings, neutral_readings, disgust_readings, calm_readings
+        )
+        SELECT
+            s.user_id,
+            (r.recorded_at AT TIME ZONE 'UTC')::date,
+            COUNT(*),
+            COUNT(r.stress_score),
+            COALESCE(SUM(r.stress_score), 0),
+            COALESCE(SUM(r.stress_score::bigint * r.stress_score), 0),
+            COUNT(*) FILTER (WHERE r.emotion = 'happy'),
+            COUNT(*) FILTER (WHERE r.emotion = 'sad'),
+            COUNT(*) FILTER (WHERE r.emotion = 'angry'),
+            COUNT(*) FILTER (WHERE r.emotion = 'fear'),
+            COUNT(*) FILTER (WHERE r.emotion = 'surprise'),
+            COUNT(*) FILTER (WHERE r.emotion = 'neutral'),
+            COUNT(*) FILTER (WHERE r.emotion = 'disgust'),
+            COUNT(*) FILTER (WHERE r.emotion = 'calm')
+        FROM %s r
+        JOIN public.sessions s ON s.id = r.session_id
+        GROUP BY 1, 2
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            readings = d.readings + EXCLUDED.readings,
+            stress_readings = d.stress_readings + EXCLUDED.stress_readings,
+            stress_sum = d.stress_sum + EXCLUDED.stress_sum,
+            stress_sq_sum = d.stress_sq_sum + EXCLUDED.stress_sq_sum,
+            happy_readings = d.happy_readings + EXCLUDED.happy_readings,
+            sad_readings = d.sad_readings + EXCLUDED.sad_readings,
+            angry_readings = d.angry_readings + EXCLUDED.angry_readings,
+            fear_readings = d.fear_readings + EXCLUDED.fear_readings,
+            surprise_readings = d.surprise_readings + EXCLUDED.surprise_readings,
+            neutral_readings = d.neutral_readings + EXCLUDED.neutral_readings,
+            disgust_readings = d.disgust_readings + EXCLUDED.disgust_readings,
+            calm_readings = d.calm_readings + EXCLUDED.calm_readings
+    $q$, source);
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Adds a finished session, split across the UTC days it overlaps. Only the
+-- part after since counts, and the session itself is counted on its start
+-- day if that day is included.
+CREATE OR REPLACE FUNCTION public.add_user_daily_session(
+    session_user_id uuid,
+    session_started_at timestamptz,
+    session_ended_at timestamptz,
+    since timestamptz DEFAULT '-infinity'
+)
+RETURNS void AS $$
+    INSERT INTO public.user_daily_stats AS d (user_id, day, sessions, session_seconds)
+    SELECT
+        session_user_id,
+        day::date,
+        CASE WHEN day::date = (session_started_at AT TIME ZONE 'UTC')::date THEN 1 ELSE 0 END,
+        EXTRACT(EPOCH FROM (
+            LEAST(session_ended_at, (day + interval '1 day') AT TIME ZONE 'UTC')
+            - GREATEST(session_started_at, since, day AT TIME ZONE 'UTC')
+        ))::integer
+    FROM generate_series(
+        date_trunc('day', GREATEST(session_started_at, since) AT TIME ZONE 'UTC'),
+        date_trunc('day', session_ended_at AT TIME ZONE 'UTC'),
+        interval '1 day'
+    ) AS day
+    WHERE session_ended_at > GREATEST(session_started_at, since)
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        sessions = d.sessions + EXCLUDED.sessions,
+        session_seconds = d.session_seconds + EXCLUDED.session_seconds;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.update_user_daily_stats_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Transition tables are only visible to SQL run from this function
+    EXECUTE public.user_daily_readings_sql('new_records');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS update_user_daily_stats_on_insert ON public.emotion_records;
+CREATE TRIGGER update_user_daily_stats_on_insert
+    AFTER INSERT ON public.emotion_records
+    REFERENCING NEW TABLE AS new_records
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.update_user_daily_stats_on_insert();
+
+CREATE OR REPLACE FUNCTION public.update_user_daily_stats_on_end()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM public.add_user_daily_session(NEW.user_id, NEW.started_at, NEW.ended_at);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- end_session sets ended_at once; the WHEN clause skips every other update
+DROP TRIGGER IF EXISTS update_user_daily_stats_on_end ON public.sessions;
+CREATE TRIGGER update_user_daily_stats_on_end
+    AFTER UPDATE OF ended_at ON public.sessions
+    FOR EACH ROW
+    WHEN (OLD.ended_at IS NULL AND NEW.ended_at IS NOT NULL)
+    EXECUTE FUNCTION public.update_user_daily_stats_on_end();
+
+-- Rebuilds the rollup from raw data for days on or after since_day (by
+-- default the earliest day that still has raw readings, so rows for retired
+-- partitions are left alone). Returns the number of day rows written.
+CREATE OR REPLACE FUNCTION public.backfill_user_daily_stats(since_day date DEFAULT NULL)
+RETURNS bigint AS $$
+DECLARE
+    from_day date := COALESCE(
+        since_day,
+        (SELECT (MIN(recorded_at) AT TIME ZONE 'UTC')::date FROM public.emotion_records)
+    );
+    since timestamptz;
+    session_row record;
+    written bigint;
+BEGIN
+    IF from_day IS NULL THEN
+        RETURN 0;
+    END IF;
+    since := from_day::timestamp AT TIME ZONE 'UTC';
+
+    DELETE FROM public.user_daily_stats WHERE day >= from_day;
+
+    EXECUTE public.user_daily_readings_sql(format(
+        '(SELECT session_id, recorded_at, emotion, stress_score FROM public.emotion_records WHERE recorded_at >= %L)',
+        since
+    ));
+
+    FOR session_row IN
+        SELECT user_id, started_at, ended_at
+        FROM public.sessions
+        WHERE ended_at >= since
+    LOOP
+        PERFORM public.add_user_daily_session(session_row.user_id, session_row.started_at, session_row.ended_at, since);
+    END LOOP;
+
+    SELECT COUNT(*) INTO written FROM public.user_daily_stats WHERE day >= from_day;
+    RETURN written;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE ALL ON FUNCTION public.add_user_daily_session(uuid, timestamptz, timestamptz, timestamptz) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.backfill_user_daily_stats(date) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.backfill_user_daily_stats(date) TO service_role;
@@ -0,0 +1,52 @@
+"""Add composite and partial indexes for the hot session and emotion record queries
+
+Replaces the single-column indexes with ones matched to how the tables are
+read: sessions by user and start time, a user's open session, and a
+session's readings in recorded order. Indexes are built CONCURRENTLY, so
+this migration runs outside a transaction.
+"""
+
+from yoyo import step
+
+__depends__ = {'20231212_01_session_triggers'}
+__transactional__ = False
+
+steps = [
+    step(
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_user_started
+        ON sessions(user_id, started_at DESC)
+        """,
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_sessions_user_started"
+    ),
+    step(
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_user_active
+        ON sessions(user_id)
+        WHERE ended_at IS NULL
+        """,
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_sessions_user_active"
+    ),
+    step(
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_emotion_records_session_recorded
+        ON emotion_records(session_id, recorded_at, id)
+        INCLUDE (emotion, stress_score, confidence, face_detected)
+        """,
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_emotion_records_session_recorded"
+    ),
+    step(
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_sessions_user_id",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_user_id ON sessions(user_id)"
+    ),
+    step(
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_emotion_records_session_id",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_emotion_records_session_id ON emotion_records(session_id)"
+    ),
+    step(
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_emotion_records_emotion",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_emotion_records_emotion ON emotion_records(emotion)"
+    ),
+    step("ANALYZE sessions"),
+    step("ANALYZE emotion_records")
+]
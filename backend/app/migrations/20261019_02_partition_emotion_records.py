@@ -0,0 +1,24 @@
+"""Partition emotion_records by month with a compact row format
+
+Rebuilds emotion_records as a monthly range-partitioned table with smallint
+stress and confidence, adds BRIN indexing on recorded_at, statement-level
+session stats triggers and the maintain_emotion_records() retention job.
+The SQL lives in app/db/partition_emotion_records.sql and manages its own
+transaction. There is no rollback; take a backup first.
+"""
+
+import os
+
+from yoyo import step
+
+__depends__ = {'20261019_01_query_indexes'}
+__transactional__ = False
+
+_SQL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "db",
+    "partition_emotion_records.sql"
+)
+
+with open(_SQL_PATH) as sql_file:
+    steps = [step(sql_file.read())]
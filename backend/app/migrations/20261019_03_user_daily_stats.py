@@ -0,0 +1,35 @@
+"""Add the user_daily_stats rollup for the Insights views
+
+Creates user_daily_stats with triggers that add each inserted batch of
+readings and each ended session to it, plus backfill_user_daily_stats()
+for existing data. The SQL lives in app/db/user_daily_stats.sql.
+"""
+
+import os
+
+from yoyo import step
+
+__depends__ = {'20261019_02_partition_emotion_records'}
+
+_SQL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "db",
+    "user_daily_stats.sql"
+)
+
+with open(_SQL_PATH) as sql_file:
+    steps = [
+        step(
+            sql_file.read(),
+            """
+            DROP TRIGGER IF EXISTS update_user_daily_stats_on_insert ON emotion_records;
+            DROP TRIGGER IF EXISTS update_user_daily_stats_on_end ON sessions;
+            DROP FUNCTION IF EXISTS update_user_daily_stats_on_insert();
+            DROP FUNCTION IF EXISTS update_user_daily_stats_on_end();
+            DROP FUNCTION IF EXISTS backfill_user_daily_stats(date);
+            DROP FUNCTION IF EXISTS add_user_daily_session(uuid, timestamptz, timestamptz, timestamptz);
+            DROP FUNCTION IF EXISTS user_daily_readings_sql(text);
+            DROP TABLE IF EXISTS user_daily_stats;
+            """
+        )
+    ]
@@ -0,0 +1,31 @@
+"""Record when each emotion reading was inserted
+
+Adds emotion_records.inserted_at, backfilled from recorded_at, and an index
+on (session_id, inserted_at, id) for the archive export's watermark. The
+SQL lives in app/db/emotion_records_inserted_at.sql and manages its own
+transaction.
+"""
+
+import os
+
+from yoyo import step
+
+__depends__ = {'20261019_03_user_daily_stats'}
+__transactional__ = False
+
+_SQL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "db",
+    "emotion_records_inserted_at.sql"
+)
+
+with open(_SQL_PATH) as sql_file:
+    steps = [
+        step(
+            sql_file.read(),
+            """
+            DROP INDEX IF EXISTS idx_emotion_records_session_inserted;
+            ALTER TABLE emotion_records DROP COLUMN IF EXISTS inserted_at;
+            """
+        )
+    ]
@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from flask import Response, request
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "tolist"):
+        # numpy scalars and arrays
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialise to UTF-8 JSON; orjson handles UUID, datetime and numpy natively."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the json module."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+
+def _compress(body: bytes) -> Tuple[bytes, Optional[str]]:
+    """Pick the best encoding the client accepts; returns (body, encoding or None)."""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if accepted.quality("gzip") > 0:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def _not_modified(tag: str, last_modified: Optional[datetime]) -> bool:
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        return request.if_none_match.contains_weak(tag)
+    if last_modified and request.if_modified_since:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _validators(last_modified: Optional[datetime], version: Optional[str]) -> Tuple[str, Dict[str, str]]:
+    seed = f"{request.full_path}|{version or ''}|{last_modified.isoformat() if last_modified else ''}"
+    tag = hashlib.sha1(seed.encode()).hexdigest()[:20]
+    headers = {
+        "Vary": "Accept-Encoding",
+        "ETag": f'W/"{tag}"',
+        # Cache it, but check back with us before every reuse
+        "Cache-Control": "private, no-cache"
+    }
+    if last_modified:
+        headers["Last-Modified"] = last_modified.astimezone(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT")
+    return tag, headers
+
+
+def not_modified_response(last_modified: Optional[datetime] = None,
+                          version: Optional[str] = None) -> Optional[Response]:
+    """An empty 304 if the client's copy is current, else None.
+
+    Lets a route answer a conditional GET before running its expensive query.
+    """
+    tag, headers = _validators(last_modified, version)
+    if _not_modified(tag, last_modified):
+        return Response(status=304, headers=headers)
+    return None
+
+
+def json_response(data: Any, status: int = 200, last_modified: Optional[datetime] = None,
+                  version: Optional[str] = None) -> Response:
+    """Serialise data into a compressed JSON response.
+
+    With last_modified or version the response carries a weak ETag and
+    Last-Modified, and a matching conditional GET gets an empty 304 without
+    serialising or compressing anything. version should change whenever the
+    payload would but last_modified does not, e.g. the number of rows.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if last_modified or version:
+        tag, headers = _validators(last_modified, version)
+        if status == 200 and _not_modified(tag, last_modified):
+            return Response(status=304, headers=headers)
+
+    body, encoding = _compress(dumps_bytes(data))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, status=status, headers=headers, mimetype="application/json")
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a Supabase timestamptz string."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def newest(rows, field: str = "updated_at") -> Optional[datetime]:
+    """Latest timestamp in field across rows, for Last-Modified."""
+    stamps = [parse_timestamp(row.get(field)) for row in rows]
+    stamps = [stamp for stamp in stamps if stamp]
+    return max(stamps) if stamps else None
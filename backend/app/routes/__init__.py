@@ -1,10 +1,18 @@
+import os
 from flask import Blueprint
 from app.routes.sessions import sessions_bp
 from app.routes.video import video_bp
+from app.routes.status import status_bp
 
 # Create the main API blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 # Register the blueprints
 api_bp.register_blueprint(sessions_bp, url_prefix='/sessions')
-api_bp.register_blueprint(video_bp)
\ No newline at end of file
+api_bp.register_blueprint(video_bp)
+api_bp.register_blueprint(status_bp)
+
+# Profiling endpoints only exist when an admin token is configured
+if os.getenv("MOODVUE_ADMIN_TOKEN"):
+    from app.routes.admin import admin_bp
+    api_bp.register_blueprint(admin_bp, url_prefix='/admin')
\ No newline at end of file
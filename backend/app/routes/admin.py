@@ -0,0 +1,72 @@
+import hmac
+import os
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify, request
+from app.analysis_service import analysis_service
+
+admin_bp = Blueprint('admin', __name__)
+
+# Longest profile one request may ask for
+MAX_PROFILE_SECONDS = 60
+
+
+def require_admin(view):
+    """Reject requests without the MOODVUE_ADMIN_TOKEN bearer token."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.getenv("MOODVUE_ADMIN_TOKEN", "")
+        scheme, _, supplied = request.headers.get("Authorization", "").partition(" ")
+        if not token or scheme != "Bearer" or not hmac.compare_digest(supplied.encode(), token.encode()):
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin_bp.route('/profile', methods=['POST'])
+@require_admin
+def start_profile():
+    """Start sampling the analysis thread or the request threads."""
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data.get("seconds", 10))
+        interval = float(data.get("interval", 0.01))
+        if seconds > MAX_PROFILE_SECONDS:
+            raise ValueError(f"seconds must be at most {MAX_PROFILE_SECONDS}")
+        profile = analysis_service.start_profile(data.get("target", "analysis"), seconds, interval)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(profile), 202
+
+
+@admin_bp.route('/profile/<profile_id>', methods=['GET'])
+@require_admin
+def get_profile(profile_id):
+    """Folded stacks of a finished profile, ready for flamegraph.pl or speedscope."""
+    profile = analysis_service.get_profile(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if "folded" not in profile:
+        return jsonify(profile), 202 if profile["status"] == "running" else 500
+    if request.args.get("format") == "json":
+        return jsonify(profile)
+    return Response(profile["folded"], mimetype="text/plain", headers={
+        "Content-Disposition": f'inline; filename="{profile_id}.folded"'
+    })
+
+
+@admin_bp.route('/memory', methods=['GET', 'POST'])
+@require_admin
+def memory():
+    """POST {"action": "start" | "stop"} toggles tracemalloc; GET returns the top allocation sites."""
+    try:
+        if request.method == 'POST':
+            action = (request.get_json(silent=True) or {}).get("action")
+            if action not in ("start", "stop"):
+                return jsonify({"error": "action must be start or stop"}), 400
+            return jsonify(analysis_service.memory_snapshot(action))
+        return jsonify(analysis_service.memory_snapshot("snapshot", request.args.get("top", 20, type=int)))
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
@@ -1,12 +1,18 @@
-from flask import Blueprint, jsonify, request, Response
+from flask import Blueprint, jsonify, request
 from uuid import UUID
 from app.analysis_service import analysis_service
+from app.responses import json_response, newest, not_modified_response, parse_timestamp
+from app.routing import route_new_session, session_affinity
 
 sessions_bp = Blueprint('sessions', __name__)
 
 @sessions_bp.route('/start', methods=['POST'])
 async def start_session():
     """Start a new session for the current user."""
+    # In a cluster the least loaded node starts the session
+    routed = route_new_session()
+    if routed is not None:
+        return routed
     try:
         if not request.is_json:
             print("Error: Request is not JSON")
@@ -29,11 +35,18 @@ async def start_session():
             return jsonify({"error": "Invalid user_id format"}), 400
 
         print(f"Starting session for user: {user_uuid}")
-        session = await analysis_service.start_session(user_uuid)
+        # Optional per-session face detector override
+        session = await analysis_service.start_session(user_uuid, json_data.get('detector'))
         if not session:
             print("Error: Failed to create session")
             return jsonify({"error": "Failed to create session"}), 500
 
+        # The node is at capacity: tell the client to retry or go elsewhere
+        if session.get('admission') == 'queued':
+            return jsonify(session), 202, {'Retry-After': str(session['retry_after'])}
+        if session.get('admission') == 'rejected':
+            return jsonify(session), 503, {'Retry-After': str(session['retry_after'])}
+
         print(f"Session created successfully: {session}")
         return jsonify(session), 201
     except Exception as e:
@@ -41,13 +54,30 @@ async def start_session():
         return jsonify({"error": str(e)}), 400
 
 @sessions_bp.route('/end', methods=['POST'])
+@session_affinity
 async def end_session():
-    """End the current session."""
+    """End one of the caller's sessions."""
+    json_data = request.get_json(silent=True) or {}
+    session_id = json_data.get('session_id')
+    user_id = json_data.get('user_id') or request.headers.get('X-User-Id')
+    if not session_id:
+        return jsonify({"error": "session_id is required"}), 400
+    if not user_id or user_id in ('null', 'undefined'):
+        return jsonify({"error": "user_id is required"}), 401
+    try:
+        session_uuid, user_uuid = UUID(session_id), UUID(user_id)
+    except ValueError:
+        return jsonify({"error": "Invalid session_id or user_id format"}), 400
+
     try:
-        session = await analysis_service.end_session()
-        return jsonify(session), 200
+        session = await analysis_service.end_session(session_uuid, user_uuid)
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+    if session is None:
+        return jsonify({"error": "Session is not running"}), 404
+    return jsonify(session), 200
 
 @sessions_bp.route('/user/<user_id>/sessions', methods=['GET', 'OPTIONS'])
 async def get_user_sessions(user_id):
@@ -55,7 +85,27 @@ async def get_user_sessions(user_id):
     try:
         days = int(request.args.get('days', 7))
         sessions = await analysis_service.get_user_sessions(UUID(user_id), days)
-        return jsonify(sessions), 200
+        return json_response(sessions, last_modified=newest(sessions), version=str(len(sessions)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@sessions_bp.route('/user/<user_id>/history', methods=['GET'])
+def get_user_history(user_id):
+    """Get daily emotion summaries for a user from the columnar archive."""
+    try:
+        days = int(request.args.get('days', 90))
+        history = analysis_service.get_archived_history(UUID(user_id), days)
+        return jsonify(history), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@sessions_bp.route('/user/<user_id>/summary', methods=['GET'])
+async def get_user_summary(user_id):
+    """Get a user's 1 to 30 day summary from the daily rollup."""
+    try:
+        days = int(request.args.get('days', 7))
+        summary = await analysis_service.get_user_daily_summary(UUID(user_id), days)
+        return jsonify(summary), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -72,8 +122,16 @@ async def get_session_stats(session_id):
 async def get_session_emotions(session_id):
     """Get all emotion records for a session."""
     try:
-        emotions = await analysis_service.get_session_emotions(UUID(session_id))
-        return jsonify(emotions), 200
+        # Inserting readings bumps the session's updated_at, so it versions
+        # the whole list and an unchanged one is answered before it is queried
+        session = await analysis_service.get_session(UUID(session_id))
+        last_modified = parse_timestamp(session.get("updated_at"))
+        version = f"{session.get('total_readings')}:{session.get('ended_at')}"
+        not_modified = not_modified_response(last_modified, version)
+        if not_modified:
+            return not_modified
+        emotions = await analysis_service.get_session_emotions(UUID(session_id), session)
+        return json_response(emotions, last_modified=last_modified, version=version)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -93,14 +151,9 @@ async def get_sessions():
     try:
         days = int(request.args.get('days', 7))
         sessions = await analysis_service.get_user_sessions(user_uuid, days)
-        return jsonify(sessions), 200
+        # The user comes from a header, so it is part of the version
+        return json_response(
+            sessions, last_modified=newest(sessions), version=f"{user_uuid}:{len(sessions)}"
+        )
     except Exception as e:
-        return jsonify({"error": str(e)}), 400
-
-@sessions_bp.route('/video_feed')
-def video_feed():
-    """Video streaming route."""
-    return Response(
-        analysis_service.generate_video_feed(),
-        mimetype='multipart/x-mixed-replace; boundary=frame'
-    )
\ No newline at end of file
+        return jsonify({"error": str(e)}), 400
\ No newline at end of file
@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify
+from app.analysis_service import analysis_service
+
+status_bp = Blueprint('status', __name__)
+
+@status_bp.route('/capacity', methods=['GET'])
+def capacity():
+    """Capacity status; 503 while the node is not accepting sessions so load balancers route around it."""
+    status = analysis_service.get_capacity()
+    return jsonify(status), 200 if status["accepting"] else 503
+
+@status_bp.route('/nodes', methods=['GET'])
+def nodes():
+    """Analysis nodes in the registry with their load and liveness."""
+    cluster = analysis_service.cluster
+    if cluster is None:
+        return jsonify({"clustered": False, "nodes": []})
+    return jsonify({"clustered": True, "node_id": cluster.node_id, "nodes": cluster.registry.nodes()})
@@ -1,17 +1,108 @@
-from flask import Blueprint, Response, jsonify
+import math
+import os
+from urllib.parse import urlsplit
+
+from flask import Blueprint, Response, jsonify, redirect, request
 from app.analysis_service import analysis_service
+from app.routing import session_affinity
+from app.services.stress_scoring import ScoringModel
 
 video_bp = Blueprint('video', __name__)
 
+def _positive_int(name, value) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{name} must be a positive integer")
+    if number < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return number
+
+def _positive_float(name, value) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a positive number")
+    if not math.isfinite(number) or number <= 0:
+        raise ValueError(f"{name} must be a positive number")
+    return number
+
 @video_bp.route('/video_feed')
+@session_affinity(always_redirect=True)
 def video_feed():
-    """Video streaming route."""
+    """Video streaming route.
+
+    Redirects to the node's event-driven MJPEG server, which takes
+    ?session_id= and ?fps=; falls back to streaming from this thread.
+    """
+    stream_port = analysis_service.video_stream_port()
+    if stream_port:
+        base = os.getenv("MJPEG_PUBLIC_URL")
+        if not base:
+            host = urlsplit(request.host_url).hostname
+            base = f"{request.scheme}://{f'[{host}]' if ':' in host else host}:{stream_port}"
+        query = request.query_string.decode()
+        return redirect(f"{base.rstrip('/')}/api/video_feed" + (f"?{query}" if query else ""), code=307)
     return Response(
         analysis_service.generate_video_feed(),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
 @video_bp.route('/analyze', methods=['GET'])
+@session_affinity
 def analyze():
     """Get current analysis results."""
-    return jsonify(analysis_service.get_analysis())
\ No newline at end of file
+    return jsonify(analysis_service.get_analysis())
+
+@video_bp.route('/history', methods=['GET'])
+@session_affinity
+def history():
+    """Get the most recent stored analysis results."""
+    try:
+        limit = _positive_int("limit", request.args.get('limit', 100))
+        return jsonify(analysis_service.get_history(limit)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@video_bp.route('/history/stats', methods=['GET'])
+@session_affinity
+def history_stats():
+    """Get rolling statistics over the recent history window."""
+    try:
+        window = _positive_float("window", request.args.get('window', 300))
+        return jsonify(analysis_service.get_history_stats(window)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@video_bp.route('/history/rescore', methods=['POST'])
+@session_affinity
+def rescore_history():
+    """Preview the stored history re-scored under another scoring model.
+
+    The body may hold a scoring "model" (stress map and override rules),
+    "last" readings to rescore and a "limit" on those returned.
+    """
+    try:
+        json_data = request.get_json(silent=True) or {}
+        model = json_data.get('model')
+        if model is not None:
+            # Validated here so a bad model is a 400 in every deployment
+            ScoringModel.from_dict(model)
+        last = json_data.get('last')
+        return jsonify(analysis_service.rescore_history(
+            model,
+            _positive_int("last", last) if last is not None else None,
+            _positive_int("limit", json_data.get('limit', 100))
+        )), 200
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+@video_bp.route('/spool', methods=['GET'])
+def spool_stats():
+    """Get the backlog of readings waiting to be shipped to Supabase."""
+    return jsonify(analysis_service.get_spool_stats())
+
+@video_bp.route('/inference-cache', methods=['GET'])
+def inference_cache_stats():
+    """Get the inference cache hit rate and accuracy delta versus uncached runs."""
+    return jsonify(analysis_service.get_inference_cache_stats())
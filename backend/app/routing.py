@@ -0,0 +1,122 @@
+import inspect
+import os
+from functools import wraps
+from typing import Any, Dict, Optional
+
+import httpx
+from flask import Response, jsonify, redirect, request
+
+from app.analysis_service import analysis_service
+
+# Set on forwarded requests so the receiving node serves them itself
+FORWARDED_HEADER = "X-MoodVue-Forwarded-By"
+
+# "forward" proxies requests to the owning node, "redirect" answers 307
+ROUTING_MODE = os.getenv("SESSION_ROUTING", "forward")
+FORWARD_TIMEOUT = float(os.getenv("SESSION_FORWARD_TIMEOUT", 10))
+
+_HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade",
+               "proxy-authorization", "proxy-authenticate", "host", "content-length"}
+
+_client: Optional[httpx.Client] = None
+
+
+def _http() -> httpx.Client:
+    global _client
+    if _client is None:
+        _client = httpx.Client(timeout=FORWARD_TIMEOUT)
+    return _client
+
+
+def _session_id() -> Optional[str]:
+    """Session a request is about: URL, query string, X-Session-Id header or JSON body."""
+    session_id = (request.view_args or {}).get("session_id") or request.args.get("session_id") \
+        or request.headers.get("X-Session-Id")
+    if not session_id and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get("session_id")
+    return session_id
+
+
+def _route_to(node: Dict[str, Any], always_redirect: bool = False) -> Response:
+    url = node["url"].rstrip("/") + request.full_path.rstrip("?")
+    if always_redirect or ROUTING_MODE == "redirect":
+        # 307 keeps the method and body
+        return redirect(url, code=307)
+
+    headers = {name: value for name, value in request.headers if name.lower() not in _HOP_BY_HOP}
+    headers[FORWARDED_HEADER] = analysis_service.cluster.node_id
+    # httpx asks for gzip itself when the client did not say; the body is
+    # relayed undecoded, so only ask for what the client can decode
+    headers.setdefault("Accept-Encoding", "identity")
+    client = _http()
+    try:
+        upstream = client.send(
+            client.build_request(request.method, url, headers=headers, content=request.get_data()),
+            stream=True
+        )
+    except httpx.HTTPError as e:
+        return jsonify({"error": f"Node {node['node_id']} is unreachable: {e}"}), 502
+    # The body is relayed as raw bytes, still compressed if it was, so
+    # Content-Encoding is kept and matches what the client receives
+    response_headers = [(name, value) for name, value in upstream.headers.multi_items()
+                        if name.lower() not in _HOP_BY_HOP]
+    response_headers.append(("X-MoodVue-Node", node["node_id"]))
+    response = Response(upstream.iter_raw(), status=upstream.status_code, headers=response_headers)
+    response.call_on_close(upstream.close)
+    return response
+
+
+def _route_to_owner(always_redirect: bool = False) -> Optional[Response]:
+    """Response from the node owning the request's session, or None to serve it here."""
+    cluster = analysis_service.cluster
+    if cluster is None or request.headers.get(FORWARDED_HEADER):
+        return None
+    session_id = _session_id()
+    if not session_id:
+        return None
+    owner = cluster.registry.owner(str(session_id))
+    if owner is None or owner["node_id"] == cluster.node_id:
+        return None
+    if not owner["alive"] or not owner["url"]:
+        retry_after = str(int(cluster.registry.ttl + cluster.interval))
+        return jsonify({"error": "The session's node is down; it is being reassigned"}), 503, \
+            {"Retry-After": retry_after}
+    return _route_to(owner, always_redirect)
+
+
+def route_new_session() -> Optional[Response]:
+    """Send a session start to the least loaded node, or None if that is this node."""
+    cluster = analysis_service.cluster
+    if cluster is None or request.headers.get(FORWARDED_HEADER):
+        return None
+    node = cluster.registry.choose_node()
+    if node is None or node["node_id"] == cluster.node_id:
+        return None
+    return _route_to(node)
+
+
+def session_affinity(view=None, *, always_redirect: bool = False):
+    """Serve a view on the node that owns the request's session.
+
+    always_redirect is for streams, which would tie up a thread on the
+    forwarding node for as long as they run.
+    """
+    if view is None:
+        return lambda view: session_affinity(view, always_redirect=always_redirect)
+
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            routed = _route_to_owner(always_redirect)
+            if routed is not None:
+                return routed
+            return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        routed = _route_to_owner(always_redirect)
+        if routed is not None:
+            return routed
+        return view(*args, **kwargs)
+    return wrapper
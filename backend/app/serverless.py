@@ -0,0 +1,156 @@
+import base64
+import io
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote_to_bytes, urlencode
+
+# Content types returned as plain text; everything else is base64-encoded
+_TEXT_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+# Lambda-style platforms reject buffered responses above 6 MB
+DEFAULT_MAX_BODY_BYTES = 6 * 1024 * 1024 - 64 * 1024
+
+
+class ServerlessAdapter:
+    """Runs a WSGI app for API Gateway style events (payload v1 and v2).
+
+    The app is created once per cold start and reused by every warm
+    invocation; each event only costs building a WSGI environ and iterating
+    the response. Binary request and response bodies travel base64-encoded,
+    repeated headers and query parameters are preserved, and streamed
+    responses are iterated chunk by chunk up to max_body_bytes, after which
+    the stream is closed and the body is cut short.
+    """
+
+    def __init__(self, app: Callable, max_body_bytes: int = DEFAULT_MAX_BODY_BYTES):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self._base_environ = {
+            "wsgi.version": (1, 0),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "SCRIPT_NAME": "",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+        }
+
+    def __call__(self, event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
+        environ = self.environ(event, context)
+        response: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info and response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = headers
+
+        result = self.app(environ, start_response)
+        chunks = []
+        size = 0
+        truncated = False
+        try:
+            for chunk in result:
+                if not chunk:
+                    continue
+                if size + len(chunk) > self.max_body_bytes:
+                    truncated = True
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+        headers: Dict[str, str] = {}
+        multi_headers: Dict[str, List[str]] = {}
+        for name, value in response["headers"]:
+            headers[name] = value
+            multi_headers.setdefault(name, []).append(value)
+        if truncated:
+            headers["X-Body-Truncated"] = "true"
+            multi_headers["X-Body-Truncated"] = ["true"]
+
+        body = b"".join(chunks)
+        content_type = headers.get("Content-Type", "")
+        is_text = content_type.startswith(_TEXT_TYPES) and "Content-Encoding" not in headers
+        return {
+            "statusCode": response["status"],
+            "headers": headers,
+            "multiValueHeaders": multi_headers,
+            "body": body.decode("utf-8") if is_text else base64.b64encode(body).decode("ascii"),
+            "isBase64Encoded": not is_text,
+        }
+
+    def environ(self, event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
+        """Translate one event into a WSGI environ."""
+        http = event.get("requestContext", {}).get("http", {})
+        method = event.get("httpMethod") or http.get("method", "GET")
+        path = event.get("path") or event.get("rawPath") or "/"
+
+        body = event.get("body") or ""
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body)
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+
+        environ = dict(self._base_environ)
+        environ.update({
+            "REQUEST_METHOD": method.upper(),
+            # WSGI wants the unquoted path as latin-1 decoded bytes
+            "PATH_INFO": unquote_to_bytes(path).decode("latin-1"),
+            "QUERY_STRING": self._query_string(event),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+            "serverless.event": event,
+            "serverless.context": context,
+        })
+
+        headers = event.get("multiValueHeaders")
+        if headers:
+            headers = {
+                name: ("; " if name.lower() == "cookie" else ", ").join(values)
+                for name, values in headers.items() if values
+            }
+        else:
+            headers = dict(event.get("headers") or {})
+        if event.get("cookies"):
+            headers["cookie"] = "; ".join(event["cookies"])
+
+        for name, value in headers.items():
+            key = name.upper().replace("-", "_")
+            if key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                if key == "CONTENT_TYPE":
+                    environ[key] = value
+                continue
+            environ[f"HTTP_{key}"] = value
+
+        host = environ.get("HTTP_HOST", "localhost")
+        environ["SERVER_NAME"], _, port = host.partition(":")
+        environ["wsgi.url_scheme"] = environ.get("HTTP_X_FORWARDED_PROTO", "https").split(",")[0].strip()
+        environ["SERVER_PORT"] = port or environ.get(
+            "HTTP_X_FORWARDED_PORT", "443" if environ["wsgi.url_scheme"] == "https" else "80"
+        )
+        environ["REMOTE_ADDR"] = self._source_ip(event, environ)
+        return environ
+
+    @staticmethod
+    def _query_string(event: Dict[str, Any]) -> str:
+        if event.get("rawQueryString") is not None:
+            return event["rawQueryString"]
+        if event.get("multiValueQueryStringParameters"):
+            return urlencode(event["multiValueQueryStringParameters"], doseq=True)
+        if event.get("queryStringParameters"):
+            return urlencode(event["queryStringParameters"])
+        return ""
+
+    @staticmethod
+    def _source_ip(event: Dict[str, Any], environ: Dict[str, Any]) -> str:
+        request_context = event.get("requestContext", {})
+        source_ip: Optional[str] = (
+            request_context.get("identity", {}).get("sourceIp")
+            or request_context.get("http", {}).get("sourceIp")
+        )
+        if not source_ip and "HTTP_X_FORWARDED_FOR" in environ:
+            source_ip = environ["HTTP_X_FORWARDED_FOR"].split(",")[0].strip()
+        return source_ip or "127.0.0.1"
@@ -0,0 +1,175 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Degradation ladder applied to every session on the node when it runs hot:
+# first sample fewer frames, then cheapen the video, then drop video entirely.
+DEGRADE_LEVELS = [
+    {"name": "full", "analyze_every": 30, "jpeg_quality": 90, "video_scale": 1.0, "video": True},
+    {"name": "reduced_sampling", "analyze_every": 60, "jpeg_quality": 90, "video_scale": 1.0, "video": True},
+    {"name": "reduced_video", "analyze_every": 60, "jpeg_quality": 60, "video_scale": 0.5, "video": True},
+    {"name": "analysis_only", "analyze_every": 90, "jpeg_quality": 60, "video_scale": 0.5, "video": False},
+]
+
+
+class CapacityModel:
+    """Admission control and load shedding driven by measured CPU work.
+
+    The processing thread and video encoders report how long each unit of
+    work took via record_work(). Utilisation is the share of the node's
+    CPU budget (cores * budget) spent on that work, smoothed with an EWMA
+    whose weight depends on the time elapsed, so it decays with time
+    constant smoothing seconds however rarely the model is consulted.
+    The node has one camera and one analysis loop, so at most max_sessions
+    sessions record at a time and inference cost does not grow with them.
+    Starting a session costs the pipeline's fixed utilisation, learned
+    while it runs, or nothing if viewers already keep it running. A new
+    session is admitted only if there is a free slot and the projected
+    utilisation stays under admit_threshold; otherwise it waits in a
+    bounded queue or is rejected. The degradation level steps up above
+    degrade_threshold and back down below recover_threshold, at most once
+    per cooldown seconds; it resets when the pipeline stops.
+    """
+
+    def __init__(self, cores: Optional[int] = None, budget: float = 0.8, admit_threshold: float = 0.85,
+                 degrade_threshold: float = 0.9, recover_threshold: float = 0.6, max_queue: int = 10,
+                 queue_ttl: float = 60.0, cooldown: float = 10.0, max_sessions: int = 1,
+                 initial_pipeline_cost: float = 0.1, smoothing: float = 3.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.cores = cores or os.cpu_count() or 1
+        self.budget = budget
+        self.admit_threshold = admit_threshold
+        self.degrade_threshold = degrade_threshold
+        self.recover_threshold = recover_threshold
+        self.max_queue = max_queue
+        self.queue_ttl = queue_ttl
+        self.cooldown = cooldown
+        self.max_sessions = max_sessions
+        self.smoothing = smoothing
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._busy = 0.0
+        self._window_start = clock()
+        self.utilisation = 0.0
+        self.level = 0
+        self._level_changed_at = 0.0
+        self.active = set()
+        self.pipeline_running = False
+        self.pipeline_cost = initial_pipeline_cost
+        self._queue: "OrderedDict[str, float]" = OrderedDict()
+
+    def record_work(self, seconds: float):
+        """Account for CPU time spent on analysis or encoding."""
+        with self._lock:
+            self._busy += seconds
+        self._tick()
+
+    def _tick(self, window: float = 1.0):
+        now = self._clock()
+        with self._lock:
+            elapsed = now - self._window_start
+            if elapsed < window:
+                return
+            sample = self._busy / (elapsed * self.cores * self.budget)
+            # A gap of several smoothing periods leaves almost only the new sample
+            alpha = 1 - math.exp(-elapsed / self.smoothing)
+            self.utilisation = alpha * sample + (1 - alpha) * self.utilisation
+            if self.pipeline_running:
+                self.pipeline_cost = alpha * sample + (1 - alpha) * self.pipeline_cost
+            self._busy = 0.0
+            self._window_start = now
+
+            since_change = now - self._level_changed_at
+            if since_change < self.cooldown:
+                return
+            if self.utilisation > self.degrade_threshold and self.level < len(DEGRADE_LEVELS) - 1:
+                self.level += 1
+                self._level_changed_at = now
+                print(f"Capacity: utilisation {self.utilisation:.0%}, degrading to {DEGRADE_LEVELS[self.level]['name']}")
+            elif self.utilisation < self.recover_threshold and self.level > 0:
+                # One step per cooldown that has passed, even if nobody asked in between
+                self.level = max(0, self.level - int(since_change // self.cooldown))
+                self._level_changed_at = now
+                print(f"Capacity: utilisation {self.utilisation:.0%}, recovering to {DEGRADE_LEVELS[self.level]['name']}")
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return DEGRADE_LEVELS[self.level]
+
+    def set_pipeline_running(self, running: bool):
+        """Called by the processing thread when capture starts and stops."""
+        with self._lock:
+            self.pipeline_running = running
+            if not running and self.level:
+                # The load that caused the degradation stopped with the pipeline
+                self.level = 0
+                self._level_changed_at = self._clock()
+                print(f"Capacity: pipeline stopped, recovering to {DEGRADE_LEVELS[0]['name']}")
+
+    def admission_cost(self) -> float:
+        """Estimated utilisation added by starting a session now."""
+        return 0.0 if self.pipeline_running else self.pipeline_cost
+
+    def _accepting(self) -> bool:
+        return (
+            self.level == 0
+            and len(self.active) < self.max_sessions
+            and self.utilisation + self.admission_cost() <= self.admit_threshold
+        )
+
+    def admit(self, key: str) -> Dict[str, Any]:
+        """Decide whether the session identified by key may start now."""
+        self._tick()
+        now = self._clock()
+        with self._lock:
+            for queued, seen in list(self._queue.items()):
+                if now - seen > self.queue_ttl:
+                    del self._queue[queued]
+
+            fits = self._accepting()
+            at_head = not self._queue or next(iter(self._queue)) == key
+            if key in self.active or (fits and at_head):
+                self._queue.pop(key, None)
+                self.active.add(key)
+                return {"admission": "admitted"}
+
+            if key in self._queue or len(self._queue) < self.max_queue:
+                # Polling again refreshes the entry's TTL but keeps its place
+                self._queue[key] = now
+                return {
+                    "admission": "queued",
+                    "position": list(self._queue).index(key) + 1,
+                    "retry_after": 5
+                }
+
+            return {"admission": "rejected", "retry_after": 30}
+
+    def adopt(self, key: str):
+        """Count a session taken over from another node, bypassing admission."""
+        with self._lock:
+            self._queue.pop(key, None)
+            self.active.add(key)
+
+    def release(self, key: str):
+        with self._lock:
+            self.active.discard(key)
+            self._queue.pop(key, None)
+
+    def status(self) -> Dict[str, Any]:
+        self._tick()
+        with self._lock:
+            return {
+                "utilisation": round(self.utilisation, 3),
+                "cores": self.cores,
+                "level": self.level,
+                "mode": DEGRADE_LEVELS[self.level]["name"],
+                "active_sessions": len(self.active),
+                "max_sessions": self.max_sessions,
+                "queued_sessions": len(self._queue),
+                "pipeline_cost": round(self.pipeline_cost, 3),
+                "accepting": self._accepting()
+            }
@@ -0,0 +1,177 @@
+import glob
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.services.emotion_classifier import LEAN_DETECTORS, DETECTORS, FaceDetector
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Images that each show at least one face
+DEFAULT_SAMPLE_DIR = os.path.join(_BACKEND_DIR, "calibration", "faces")
+DEFAULT_CALIBRATION_PATH = os.path.join(_BACKEND_DIR, "models", "face_detector.json")
+
+# Used by FACE_DETECTOR=auto when this host has not been calibrated
+FALLBACK_DETECTOR = "ssd"
+
+_IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+
+
+def host_fingerprint(emotion_backend: str) -> Dict[str, Any]:
+    """What a calibration result depends on; a different value means recalibrate."""
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "emotion_backend": emotion_backend,
+        "opencv": cv2.__version__,
+    }
+
+
+def load_samples(sample_dir: str = DEFAULT_SAMPLE_DIR, limit: int = 30) -> List[np.ndarray]:
+    """Read up to limit BGR images from sample_dir."""
+    paths = sorted(path for pattern in _IMAGE_PATTERNS for path in glob.glob(os.path.join(sample_dir, pattern)))
+    frames = [cv2.imread(path) for path in paths[:limit]]
+    return [frame for frame in frames if frame is not None]
+
+
+def capture_frames(camera, count: int = 30, interval: float = 0.1) -> List[np.ndarray]:
+    """Grab count frames from an open cv2.VideoCapture, spaced so they differ."""
+    frames = []
+    for _ in range(count * 2):
+        success, frame = camera.read()
+        if success:
+            frames.append(frame)
+            if len(frames) == count:
+                break
+        time.sleep(interval)
+    return frames
+
+
+def _face_counter(detector: str, lean: bool) -> Callable[[np.ndarray], int]:
+    if lean:
+        face_detector = FaceDetector(detector)
+        return lambda frame: len(face_detector.detect(frame))
+
+    from deepface import DeepFace
+
+    def count(frame: np.ndarray) -> int:
+        try:
+            return len(DeepFace.extract_faces(frame, detector_backend=detector, enforce_detection=True, align=False))
+        except ValueError:
+            # Raised when no face is found
+            return 0
+    return count
+
+
+def benchmark_detector(detector: str, frames: List[np.ndarray], lean: bool) -> Dict[str, Any]:
+    """Time one detector over frames and measure how many of them it finds a face in."""
+    result: Dict[str, Any] = {"detector": detector}
+    try:
+        count_faces = _face_counter(detector, lean)
+        # The first call loads weights; keep it out of the timings
+        count_faces(frames[0])
+    except Exception as e:
+        result.update(available=False, error=str(e))
+        return result
+
+    timings = []
+    detected = 0
+    for frame in frames:
+        started = time.perf_counter()
+        found = count_faces(frame)
+        timings.append((time.perf_counter() - started) * 1000)
+        detected += found > 0
+    timings.sort()
+    result.update(
+        available=True,
+        detection_rate=round(detected / len(frames), 3),
+        median_ms=round(statistics.median(timings), 2),
+        p90_ms=round(timings[int(0.9 * (len(timings) - 1))], 2),
+    )
+    return result
+
+
+def calibrate(frames: List[np.ndarray], emotion_backend: str, min_detection_rate: float = 0.9,
+              candidates: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Benchmark the detectors the emotion backend supports and pick one.
+
+    The fastest detector (by median latency) that finds a face in at least
+    min_detection_rate of the frames wins; if none does, the one with the
+    best detection rate. chosen is None when no detector found any face,
+    e.g. the camera was pointed at an empty room.
+    """
+    if not frames:
+        raise ValueError("No frames to calibrate on")
+    lean = emotion_backend != "deepface"
+    supported = LEAN_DETECTORS if lean else DETECTORS
+    candidates = [detector for detector in (candidates or supported) if detector in supported]
+
+    results = []
+    for detector in candidates:
+        result = benchmark_detector(detector, frames, lean)
+        logger.info(f"Detector calibration: {result}")
+        results.append(result)
+
+    usable = [r for r in results if r.get("available") and r["detection_rate"] > 0]
+    qualified = [r for r in usable if r["detection_rate"] >= min_detection_rate]
+    if qualified:
+        chosen = min(qualified, key=lambda r: r["median_ms"])
+    elif usable:
+        chosen = max(usable, key=lambda r: (r["detection_rate"], -r["median_ms"]))
+    else:
+        chosen = None
+
+    return {
+        "chosen": chosen["detector"] if chosen else None,
+        "min_detection_rate": min_detection_rate,
+        "frames": len(frames),
+        "results": results,
+        "host": host_fingerprint(emotion_backend),
+        "calibrated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def save_calibration(result: Dict[str, Any], path: str = DEFAULT_CALIBRATION_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_calibration(emotion_backend: str, path: str = DEFAULT_CALIBRATION_PATH) -> Optional[Dict[str, Any]]:
+    """The persisted calibration, or None if missing or made on another host or backend."""
+    try:
+        with open(path) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if result.get("host") != host_fingerprint(emotion_backend) or not result.get("chosen"):
+        return None
+    return result
+
+
+def resolve_detector(emotion_backend: str) -> str:
+    """The detector to use when FACE_DETECTOR is 'auto'.
+
+    Reads the choice scripts/calibrate_face_detector.py persisted for this
+    host. Calibration is never run here: it takes seconds per detector and
+    on camera frames would depend on whoever is in front of the camera.
+    """
+    calibration = load_calibration(emotion_backend, os.getenv("FACE_DETECTOR_CALIBRATION", DEFAULT_CALIBRATION_PATH))
+    if calibration:
+        return calibration["chosen"]
+    logger.warning(f"No face detector calibration for this host; using {FALLBACK_DETECTOR}. "
+                   f"Run scripts/calibrate_face_detector.py to choose one.")
+    return FALLBACK_DETECTOR
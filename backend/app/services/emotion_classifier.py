@@ -0,0 +1,306 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.inference_cache import InferenceCache, perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+# Output order of DeepFace's facial expression model
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+# DeepFace pads every face onto a 224x224 canvas before the emotion model
+# resizes it down to its 48x48 grayscale input.
+_DEMOGRAPHY_SIZE = (224, 224)
+_EMOTION_INPUT_SIZE = (48, 48)
+
+# Face detectors DeepFace can use, and the ones FaceDetector runs without TensorFlow
+DETECTORS = ("opencv", "ssd", "mtcnn", "retinaface")
+LEAN_DETECTORS = ("opencv", "ssd")
+
+DEFAULT_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "models",
+    "emotion.onnx"
+)
+
+
+def preprocess_faces(crops: List[np.ndarray]) -> np.ndarray:
+    """Turn BGR face crops into a (N, 48, 48, 1) float32 batch.
+
+    Crops may be uint8 or already scaled to [0, 1]. Mirrors the steps
+    DeepFace.analyze applies before the emotion model: scale to [0, 1],
+    letterbox onto a 224x224 canvas, convert to grayscale and resize to 48x48.
+    """
+    batch = np.empty((len(crops),) + _EMOTION_INPUT_SIZE + (1,), dtype=np.float32)
+    for i, crop in enumerate(crops):
+        face = crop.astype(np.float32)
+        if crop.dtype == np.uint8:
+            face /= 255.0
+        factor = min(_DEMOGRAPHY_SIZE[0] / face.shape[0], _DEMOGRAPHY_SIZE[1] / face.shape[1])
+        dsize = (int(face.shape[1] * factor), int(face.shape[0] * factor))
+        face = cv2.resize(face, dsize)
+        diff_0 = _DEMOGRAPHY_SIZE[0] - face.shape[0]
+        diff_1 = _DEMOGRAPHY_SIZE[1] - face.shape[1]
+        face = np.pad(
+            face,
+            ((diff_0 // 2, diff_0 - diff_0 // 2), (diff_1 // 2, diff_1 - diff_1 // 2), (0, 0)),
+            "constant"
+        )
+        if face.shape[0:2] != _DEMOGRAPHY_SIZE:
+            face = cv2.resize(face, _DEMOGRAPHY_SIZE)
+        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+        batch[i, :, :, 0] = cv2.resize(gray, _EMOTION_INPUT_SIZE)
+    return batch
+
+
+def to_emotion_result(probabilities: np.ndarray, region: Dict[str, int], face_confidence: float) -> Dict[str, Any]:
+    """Build a DeepFace-shaped result dict from one row of model output."""
+    total = float(np.sum(probabilities)) or 1.0
+    emotions = {label: 100 * float(p) / total for label, p in zip(EMOTION_LABELS, probabilities)}
+    return {
+        "emotion": emotions,
+        "dominant_emotion": EMOTION_LABELS[int(np.argmax(probabilities))],
+        "region": region,
+        "face_confidence": face_confidence
+    }
+
+
+class FaceDetector:
+    """OpenCV-only face detector so lean backends never import TensorFlow.
+
+    'ssd' runs the same res10 Caffe model DeepFace's ssd backend downloads to
+    ~/.deepface/weights; 'opencv' uses the bundled Haar cascade.
+    """
+
+    SSD_CONFIDENCE = 0.9
+
+    def __init__(self, backend: str = "ssd"):
+        self.backend = backend
+        if backend == "ssd":
+            weights_dir = os.path.join(
+                os.getenv("DEEPFACE_HOME", os.path.expanduser("~")), ".deepface", "weights"
+            )
+            self._net = cv2.dnn.readNetFromCaffe(
+                os.path.join(weights_dir, "deploy.prototxt"),
+                os.path.join(weights_dir, "res10_300x300_ssd_iter_140000.caffemodel")
+            )
+        elif backend == "opencv":
+            self._cascade = cv2.CascadeClassifier(
+                os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+            )
+        else:
+            raise ValueError(f"Unsupported detector backend for lean inference: {backend}")
+
+    def detect(self, frame: np.ndarray) -> List[Tuple[Dict[str, int], float]]:
+        """Return (region, confidence) pairs for every face in a BGR frame."""
+        height, width = frame.shape[:2]
+        faces = []
+        if self.backend == "ssd":
+            blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+            self._net.setInput(blob)
+            detections = self._net.forward()[0, 0]
+            for detection in detections[detections[:, 2] >= self.SSD_CONFIDENCE]:
+                x1, y1, x2, y2 = (detection[3:7] * [width, height, width, height]).astype(int)
+                x1, y1 = max(x1, 0), max(y1, 0)
+                x2, y2 = min(x2, width), min(y2, height)
+                if x2 > x1 and y2 > y1:
+                    faces.append(({'x': int(x1), 'y': int(y1), 'w': int(x2 - x1), 'h': int(y2 - y1)}, float(detection[2])))
+        else:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            for (x, y, w, h) in self._cascade.detectMultiScale(gray, 1.1, 10):
+                faces.append(({'x': int(x), 'y': int(y), 'w': int(w), 'h': int(h)}, 1.0))
+        return faces
+
+
+class EmotionClassifier(ABC):
+    """Detects every face in a frame once, then classifies all crops in one batch.
+
+    Subclasses provide set_detector(), detect_faces() and predict();
+    analyze() keeps the result shape of DeepFace.analyze(actions=['emotion'])
+    with one entry per face.
+    With a cache, faces that look like a recent one reuse its model output.
+    """
+
+    name = "base"
+    supported_detectors: Tuple[str, ...] = DETECTORS
+    detector_backend = None
+    cache: Optional[InferenceCache] = None
+
+    @abstractmethod
+    def set_detector(self, detector_backend: str):
+        """Switch the face detector used by later analyze() calls."""
+
+    @abstractmethod
+    def detect_faces(self, frame: np.ndarray) -> List[Tuple[Dict[str, int], float, np.ndarray]]:
+        """Return (region, detection confidence, BGR face crop) for every face."""
+
+    @abstractmethod
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """Run the model on a preprocessed (N, 48, 48, 1) batch, returning (N, 7) scores."""
+
+    def analyze(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        faces = self.detect_faces(frame)
+        if not faces:
+            return []
+        batch = preprocess_faces([crop for _, _, crop in faces])
+        probabilities = self.predict(batch) if self.cache is None else self._predict_cached(batch)
+        return [
+            to_emotion_result(probabilities[i], region, confidence)
+            for i, (region, confidence, _) in enumerate(faces)
+        ]
+
+
+    def _predict_cached(self, batch: np.ndarray) -> np.ndarray:
+        """predict() for the faces the cache cannot answer, plus a sample of hits to audit."""
+        cache = self.cache
+        keys = [perceptual_hash(face[:, :, 0]) for face in batch]
+        probabilities = [cache.lookup(key) for key in keys]
+        run = [i for i, cached in enumerate(probabilities) if cached is None or cache.should_audit()]
+        if run:
+            for i, fresh in zip(run, self.predict(batch[run])):
+                if probabilities[i] is not None:
+                    cache.record_audit(probabilities[i], fresh)
+                cache.store(keys[i], fresh)
+                probabilities[i] = fresh
+        return np.stack(probabilities)
+
+
+class DeepFaceClassifier(EmotionClassifier):
+    """Reference backend: DeepFace detectors and the Keras emotion model."""
+
+    name = "deepface"
+
+    def __init__(self, detector_backend: str = "ssd"):
+        # Imported here so the lean backends never pay for TensorFlow
+        from deepface import DeepFace
+        self._deepface = DeepFace
+        self._model = DeepFace.build_model("Emotion", task="facial_attribute").model
+        self.detector_backend = detector_backend
+
+    def set_detector(self, detector_backend: str):
+        if detector_backend not in self.supported_detectors:
+            raise ValueError(f"Unsupported face detector: {detector_backend}")
+        self.detector_backend = detector_backend
+
+    def detect_faces(self, frame: np.ndarray) -> List[Tuple[Dict[str, int], float, np.ndarray]]:
+        faces = self._deepface.extract_faces(
+            frame,
+            detector_backend=self.detector_backend,
+            enforce_detection=False,
+            align=True
+        )
+        return [
+            (
+                {k: int(face["facial_area"][k]) for k in ('x', 'y', 'w', 'h')},
+                float(face.get("confidence", 0.0)),
+                # extract_faces hands back RGB in [0, 1]; the model pipeline expects BGR
+                face["face"][:, :, ::-1]
+            )
+            for face in faces
+        ]
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self._model(batch, training=False).numpy()
+
+
+class OnnxEmotionClassifier(EmotionClassifier):
+    """Exported copy of the DeepFace emotion model on a lean CPU runtime.
+
+    runtime is 'onnxruntime' or 'opencv' (cv2.dnn). Either loads the file
+    written by scripts/export_emotion_model.py, quantised or not.
+    """
+
+    supported_detectors = LEAN_DETECTORS
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, runtime: str = "onnxruntime",
+                 detector_backend: str = "ssd", threads: Optional[int] = None):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"Emotion model not found at {model_path}. Run scripts/export_emotion_model.py first."
+            )
+        self.name = runtime
+        self.model_path = model_path
+        self._detectors: Dict[str, FaceDetector] = {}
+        self.set_detector(detector_backend)
+
+        if runtime == "onnxruntime":
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if threads:
+                options.intra_op_num_threads = threads
+                options.inter_op_num_threads = 1
+            self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+            self._input_name = self._session.get_inputs()[0].name
+        elif runtime == "opencv":
+            self._net = cv2.dnn.readNetFromONNX(model_path)
+            self._net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self._net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        else:
+            raise ValueError(f"Unknown emotion runtime: {runtime}")
+
+        logger.info(f"Loaded emotion model {model_path} on {runtime}")
+
+    def set_detector(self, detector_backend: str):
+        # Detectors are kept once loaded so switching back and forth is free
+        if detector_backend not in self._detectors:
+            self._detectors[detector_backend] = FaceDetector(detector_backend)
+        self.detector = self._detectors[detector_backend]
+        self.detector_backend = detector_backend
+
+    def detect_faces(self, frame: np.ndarray) -> List[Tuple[Dict[str, int], float, np.ndarray]]:
+        detections = self.detector.detect(frame)
+        if not detections:
+            # DeepFace falls back to the whole frame when enforce_detection is off
+            height, width = frame.shape[:2]
+            detections = [({'x': 0, 'y': 0, 'w': int(width), 'h': int(height)}, 0.0)]
+        return [
+            (region, confidence, frame[region['y']:region['y'] + region['h'], region['x']:region['x'] + region['w']])
+            for region, confidence in detections
+        ]
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        if self.name == "onnxruntime":
+            return self._session.run(None, {self._input_name: batch})[0]
+        self._net.setInput(batch)
+        return self._net.forward()
+
+
+def create_emotion_classifier(backend: Optional[str] = None, detector_backend: Optional[str] = None):
+    """Build the classifier selected by EMOTION_BACKEND (deepface, onnxruntime or opencv).
+
+    FACE_DETECTOR defaults to ssd; auto picks the detector
+    scripts/calibrate_face_detector.py chose for this host.
+    INFERENCE_CACHE_SIZE > 0 (the default) attaches an InferenceCache.
+    """
+    backend = backend or os.getenv("EMOTION_BACKEND", "deepface")
+    detector_backend = detector_backend or os.getenv("FACE_DETECTOR", "ssd")
+    if detector_backend == "auto":
+        from app.services.detector_calibration import resolve_detector
+        detector_backend = resolve_detector(backend)
+
+    if backend == "deepface":
+        classifier = DeepFaceClassifier(detector_backend)
+    else:
+        threads = os.getenv("EMOTION_THREADS")
+        classifier = OnnxEmotionClassifier(
+            model_path=os.getenv("EMOTION_MODEL_PATH", DEFAULT_MODEL_PATH),
+            runtime=backend,
+            detector_backend=detector_backend,
+            threads=int(threads) if threads else None
+        )
+
+    cache_size = int(os.getenv("INFERENCE_CACHE_SIZE", 64))
+    if cache_size > 0:
+        classifier.cache = InferenceCache(
+            max_entries=cache_size,
+            tolerance=int(os.getenv("INFERENCE_CACHE_TOLERANCE", 4)),
+            ttl=float(os.getenv("INFERENCE_CACHE_TTL", 5)),
+            audit_rate=float(os.getenv("INFERENCE_CACHE_AUDIT_RATE", 0.05))
+        )
+    return classifier
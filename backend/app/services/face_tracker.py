@@ -0,0 +1,83 @@
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) arrays of x, y, w, h boxes."""
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = inter_w * inter_h
+    union = a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+class Track:
+    """One face followed across frames, with its own per-face state."""
+
+    def __init__(self, face_id: int, region: Dict[str, int], state=None):
+        self.face_id = face_id
+        self.region = region
+        self.missed = 0
+        self.state = state
+
+
+class FaceTracker:
+    """Keeps stable face ids across analysed frames by greedy IoU matching.
+
+    A track survives max_missed analyses without a match before its id is
+    retired. state_factory builds the per-face state (e.g. a smoother)
+    attached to each new track.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 3,
+                 state_factory: Optional[Callable[[], object]] = None):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.state_factory = state_factory
+        self.tracks: List[Track] = []
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = []
+
+    def update(self, regions: List[Dict[str, int]]) -> List[Track]:
+        """Match this frame's face regions to tracks, returning one track per region."""
+        assigned: List[Optional[Track]] = [None] * len(regions)
+
+        if self.tracks and regions:
+            boxes = np.array([[r['x'], r['y'], r['w'], r['h']] for r in regions], dtype=np.float64)
+            known = np.array([[t.region['x'], t.region['y'], t.region['w'], t.region['h']] for t in self.tracks],
+                             dtype=np.float64)
+            iou = _iou_matrix(boxes, known)
+            # Take the best remaining pair until nothing overlaps enough
+            while True:
+                i, j = np.unravel_index(np.argmax(iou), iou.shape)
+                if iou[i, j] < self.iou_threshold:
+                    break
+                assigned[i] = self.tracks[j]
+                iou[i, :] = -1
+                iou[:, j] = -1
+
+        matched = {id(track) for track in assigned if track is not None}
+        for track in self.tracks:
+            if id(track) not in matched:
+                track.missed += 1
+
+        for i, region in enumerate(regions):
+            track = assigned[i]
+            if track is None:
+                track = Track(self._next_id, region, self.state_factory() if self.state_factory else None)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[i] = track
+            track.region = region
+            track.missed = 0
+
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return assigned
@@ -0,0 +1,154 @@
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.emotion_classifier import EMOTION_LABELS
+
+# Emotion codes stored in the buffer; anything else (e.g. "error") is -1
+EMOTION_CODES = {label: code for code, label in enumerate(EMOTION_LABELS)}
+
+HISTORY_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("emotion", "i1"),
+    ("confidence", "f4"),
+    ("stress", "i2"),
+    ("face_detected", "?"),
+    ("region", "i4", (4,)),
+    ("emotions", "f4", (len(EMOTION_LABELS),)),
+])
+
+
+class HistoryBuffer:
+    """Fixed-capacity ring buffer of analysis results as structured NumPy records.
+
+    Appends are O(1) and never allocate; the whole buffer costs
+    capacity * HISTORY_DTYPE.itemsize bytes up front (about 60 bytes per
+    reading, so four hours at one reading per second is under 1 MB).
+    Not thread-safe: callers hold AnalysisService.data_lock.
+    """
+
+    def __init__(self, capacity: int = 14400):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._records = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._records.nbytes
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+    def append(self, result: Dict[str, Any], timestamp: Optional[float] = None):
+        """Store one analysis_result dict."""
+        record = self._records[self._next]
+        record["timestamp"] = time.time() if timestamp is None else timestamp
+        record["emotion"] = EMOTION_CODES.get(result.get("emotion"), -1)
+        record["confidence"] = result.get("confidence", 0.0)
+        record["stress"] = result.get("stress_score", 0)
+        record["face_detected"] = result.get("face_detected", False)
+        region = result.get("region") or {}
+        record["region"] = (region.get("x", 0), region.get("y", 0), region.get("w", 0), region.get("h", 0))
+        all_emotions = result.get("all_emotions")
+        if all_emotions:
+            record["emotions"] = [all_emotions.get(label, 0.0) for label in EMOTION_LABELS]
+        else:
+            record["emotions"] = 0.0
+
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def snapshot(self, last: Optional[int] = None) -> np.ndarray:
+        """Return the newest `last` records (default all) oldest first.
+
+        The result is a read-only view when the range does not wrap around
+        the end of the buffer, otherwise a copy. Views are invalidated by
+        later appends, so take them under the same lock.
+        """
+        count = self._size if last is None else max(0, min(last, self._size))
+        start = (self._next - count) % self.capacity
+        if start + count <= self.capacity:
+            view = self._records[start:start + count]
+            view.flags.writeable = False
+            return view
+        return np.concatenate((self._records[start:], self._records[:self._next]))
+
+    def since(self, seconds: float, now: Optional[float] = None) -> np.ndarray:
+        """Records from the last `seconds` seconds, oldest first."""
+        records = self.snapshot()
+        cutoff = (time.time() if now is None else now) - seconds
+        return records[np.searchsorted(records["timestamp"], cutoff):]
+
+    def rolling_mean_stress(self, window: int) -> np.ndarray:
+        """Mean stress over a trailing window of `window` readings, per reading.
+
+        Error readings (stress -1) are excluded from the averages.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        stress = self.snapshot()["stress"]
+        valid = stress >= 0
+        sums = np.cumsum(np.where(valid, stress, 0), dtype=np.float64)
+        counts = np.cumsum(valid, dtype=np.int64)
+        sums[window:] = sums[window:] - sums[:-window]
+        counts[window:] = counts[window:] - counts[:-window]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    def window_stats(self, seconds: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """Summary of the readings in the last `seconds` seconds."""
+        records = self.since(seconds, now)
+        valid = records[records["emotion"] >= 0]
+        shares = np.bincount(valid["emotion"], minlength=len(EMOTION_LABELS)) / max(len(valid), 1)
+        mean_emotions = valid["emotions"].mean(axis=0) if len(valid) else np.zeros(len(EMOTION_LABELS))
+
+        return {
+            "window_seconds": seconds,
+            "readings": int(len(records)),
+            "mean_stress": float(valid["stress"].mean()) if len(valid) else None,
+            "max_stress": int(valid["stress"].max()) if len(valid) else None,
+            "mean_confidence": float(valid["confidence"].mean()) if len(valid) else None,
+            "emotion_share": {label: float(share) for label, share in zip(EMOTION_LABELS, shares)},
+            "mean_emotions": {label: float(value) for label, value in zip(EMOTION_LABELS, mean_emotions)},
+        }
+
+    def rescored(self, model, last: Optional[int] = None) -> np.ndarray:
+        """A copy of the newest `last` records re-scored under a ScoringModel.
+
+        Emotion, confidence and stress of every reading with a face are
+        recomputed from its stored distribution in one pass. The sticky
+        dominant-emotion hysteresis is not replayed.
+        """
+        records = self.snapshot(last).copy()
+        scored = (records["emotion"] >= 0) & records["face_detected"]
+        distributions = records["emotions"][scored].astype(np.float64)
+        dominant, stress = model.evaluate(distributions)
+        records["emotion"][scored] = dominant
+        records["confidence"][scored] = np.round(distributions[np.arange(len(dominant)), dominant] / 100, 2)
+        records["stress"][scored] = stress
+        return records
+
+    def to_dicts(self, last: Optional[int] = None, records: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Render records (default the newest `last`) in the analysis_result shape used by the API."""
+        results = []
+        for record in self.snapshot(last) if records is None else records:
+            code = int(record["emotion"])
+            x, y, w, h = (int(v) for v in record["region"])
+            results.append({
+                "timestamp": float(record["timestamp"]),
+                "emotion": EMOTION_LABELS[code] if code >= 0 else "error",
+                "confidence": round(float(record["confidence"]), 2),
+                "stress_score": int(record["stress"]),
+                "all_emotions": {label: float(v) for label, v in zip(EMOTION_LABELS, record["emotions"])},
+                "face_detected": bool(record["face_detected"]),
+                "region": {'x': x, 'y': y, 'w': w, 'h': h}
+            })
+        return results
@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def perceptual_hash(face: np.ndarray) -> int:
+    """64-bit DCT hash of a grayscale face; small changes flip only a few bits."""
+    small = cv2.resize(face.astype(np.float32), (32, 32), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small)[:8, :8].flatten()
+    # The DC term only tracks overall brightness, so it is left out of the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class InferenceCache:
+    """LRU cache of emotion model outputs keyed by a perceptual hash of the face.
+
+    A lookup hits when a stored hash is within tolerance bits and younger
+    than ttl seconds. Entries belong to one scope (a session) at a time;
+    begin() clears them so one user's faces never answer for another's.
+    A share of hits (audit_rate) is re-run through the model to measure how
+    far cached results drift from fresh ones.
+    """
+
+    def __init__(self, max_entries: int = 64, tolerance: int = 4, ttl: float = 5.0,
+                 audit_rate: float = 0.05, max_scopes: int = 20):
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+        self.ttl = ttl
+        self.audit_rate = audit_rate
+        self.max_scopes = max_scopes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._stats: "OrderedDict[Hashable, Dict[str, float]]" = OrderedDict()
+        self.scope: Hashable = None
+        self.begin(None)
+
+    @staticmethod
+    def _new_stats() -> Dict[str, float]:
+        return {"lookups": 0, "hits": 0, "audits": 0, "delta_sum": 0.0, "delta_max": 0.0, "agreements": 0}
+
+    def begin(self, scope: Hashable):
+        """Drop all entries and count further lookups against scope."""
+        with self._lock:
+            self._entries.clear()
+            self.scope = scope
+            if scope not in self._stats:
+                self._stats[scope] = self._new_stats()
+                while len(self._stats) > self.max_scopes:
+                    self._stats.popitem(last=False)
+            self._stats.move_to_end(scope)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def lookup(self, key: int) -> Optional[np.ndarray]:
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats[self.scope]
+            stats["lookups"] += 1
+            best, best_distance = None, self.tolerance + 1
+            for stored, (_, stored_at) in list(self._entries.items()):
+                if now - stored_at > self.ttl:
+                    del self._entries[stored]
+                    continue
+                distance = hamming(key, stored)
+                if distance < best_distance:
+                    best, best_distance = stored, distance
+            if best is None:
+                return None
+            stats["hits"] += 1
+            self._entries.move_to_end(best)
+            return self._entries[best][0]
+
+    def store(self, key: int, probabilities: np.ndarray):
+        with self._lock:
+            self._entries[key] = (probabilities, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def should_audit(self) -> bool:
+        return random.random() < self.audit_rate
+
+    def record_audit(self, cached: np.ndarray, fresh: np.ndarray):
+        """Compare a cached result with a fresh run on the same face."""
+        cached = cached / (np.sum(cached) or 1.0)
+        fresh = fresh / (np.sum(fresh) or 1.0)
+        # Mean absolute difference per emotion, in percentage points
+        delta = float(np.mean(np.abs(cached - fresh))) * 100
+        with self._lock:
+            stats = self._stats[self.scope]
+            stats["audits"] += 1
+            stats["delta_sum"] += delta
+            stats["delta_max"] = max(stats["delta_max"], delta)
+            stats["agreements"] += int(np.argmax(cached) == np.argmax(fresh))
+
+    @staticmethod
+    def _summary(stats: Dict[str, float]) -> Dict[str, Any]:
+        audits = stats["audits"]
+        return {
+            "lookups": stats["lookups"],
+            "hits": stats["hits"],
+            "hit_rate": round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else None,
+            "audits": audits,
+            "mean_delta_pp": round(stats["delta_sum"] / audits, 2) if audits else None,
+            "max_delta_pp": round(stats["delta_max"], 2) if audits else None,
+            "dominant_agreement": round(stats["agreements"] / audits, 3) if audits else None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and audited accuracy delta overall and per scope."""
+        with self._lock:
+            total = self._new_stats()
+            for stats in self._stats.values():
+                for key in ("lookups", "hits", "audits", "delta_sum", "agreements"):
+                    total[key] += stats[key]
+                total["delta_max"] = max(total["delta_max"], stats["delta_max"])
+            return {
+                "enabled": True,
+                "tolerance_bits": self.tolerance,
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "total": self._summary(total),
+                "scopes": {str(scope): self._summary(stats) for scope, stats in self._stats.items()
+                           if stats["lookups"]},
+            }
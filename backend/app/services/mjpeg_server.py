@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATHS = ("/api/video_feed", "/video_feed", "/api/sessions/video_feed")
+
+_PART_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n"
+
+
+class ViewerLimitError(Exception):
+    def __init__(self, status: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class MJPEGServer:
+    """Serves the MJPEG video feed to every viewer from one asyncio event loop.
+
+    A single pump coroutine fetches the latest encoded frame (at most
+    max_fps times a second, only while someone is watching) and every
+    viewer coroutine sends it at its own requested rate. Viewers are
+    capped per node and per session; a viewer is dropped as soon as its
+    socket closes, when a write stalls for write_timeout seconds, or when
+    no new frame arrives for idle_timeout seconds. Each viewer holds the
+    capture pipeline through acquire/release while connected.
+    """
+
+    def __init__(self, frame_source: Callable[[], Tuple[int, Optional[bytes]]],
+                 acquire: Callable[[str], None], release: Callable[[str], None],
+                 host: str = "0.0.0.0", port: int = 5002, max_fps: float = 15.0,
+                 max_viewers: int = 200, max_viewers_per_session: int = 5,
+                 idle_timeout: float = 30.0, write_timeout: float = 10.0):
+        self.frame_source = frame_source
+        self.acquire = acquire
+        self.release = release
+        self.host = host
+        self.port = port
+        self.max_fps = max_fps
+        self.max_viewers = max_viewers
+        self.max_viewers_per_session = max_viewers_per_session
+        self.idle_timeout = idle_timeout
+        self.write_timeout = write_timeout
+
+        self.running = False
+        self.viewers: Dict[str, Optional[str]] = {}
+        self.frames_sent = 0
+        self.dropped = Counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._frame: Tuple[int, Optional[bytes]] = (-1, None)
+        # Resolved and replaced each time the pump publishes a new frame
+        self._next_frame: Optional[asyncio.Future] = None
+        self._pump: Optional[asyncio.Task] = None
+
+    def start(self) -> bool:
+        """Bind and serve from a background thread; False if the port could not be bound."""
+        started = threading.Event()
+        threading.Thread(target=self._run, args=(started,), name="mjpeg-server", daemon=True).start()
+        started.wait(5)
+        return self.running
+
+    def _run(self, started: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            logger.error(f"MJPEG server could not bind {self.host}:{self.port}: {str(e)}")
+            started.set()
+            return
+        self._next_frame = self._loop.create_future()
+        self.running = True
+        started.set()
+        logger.info(f"MJPEG server listening on {self.host}:{self.port}")
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            self.running = False
+
+    def stop(self):
+        if self._loop and self.running:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self) -> Dict[str, Any]:
+        """Viewer and frame counters, read on the event loop that changes them."""
+        loop = self._loop
+        if loop is None or not self.running:
+            return self._snapshot()
+        return asyncio.run_coroutine_threadsafe(self._snapshot_on_loop(), loop).result(timeout=5)
+
+    async def _snapshot_on_loop(self) -> Dict[str, Any]:
+        return self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        sessions = Counter(session_id for session_id in self.viewers.values() if session_id)
+        return {
+            "running": self.running,
+            "port": self.port,
+            "viewers": len(self.viewers),
+            "max_viewers": self.max_viewers,
+            "viewers_per_session": dict(sessions),
+            "frames_sent": self.frames_sent,
+            "dropped": dict(self.dropped),
+        }
+
+    async def _pump_frames(self):
+        """Fetch each new frame once for all viewers while anyone is watching."""
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.max_fps
+        while self.viewers:
+            started = loop.time()
+            try:
+                # Encoding happens outside the event loop
+                seq, jpeg = await loop.run_in_executor(None, self.frame_source)
+            except Exception as e:
+                logger.error(f"Error fetching video frame: {str(e)}")
+                seq, jpeg = self._frame
+            if jpeg and seq != self._frame[0]:
+                self._frame = (seq, jpeg)
+                next_frame, self._next_frame = self._next_frame, loop.create_future()
+                next_frame.set_result(seq)
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+        # The next viewer should not be greeted with a frame from minutes ago
+        self._frame = (-1, None)
+        self._pump = None
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, list]]:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+        request_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+        method, target, _ = request_line.split(" ", 2)
+        url = urlsplit(target)
+        return method, url.path, parse_qs(url.query)
+
+    def _admit(self, session_id: Optional[str]):
+        if len(self.viewers) >= self.max_viewers:
+            raise ViewerLimitError(503, "Too many video viewers on this node")
+        if session_id and sum(1 for s in self.viewers.values() if s == session_id) >= self.max_viewers_per_session:
+            raise ViewerLimitError(429, "Too many video viewers for this session")
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, reason: str, retry_after: Optional[int] = None):
+        body = reason.encode()
+        headers = [f"HTTP/1.1 {status} {reason}", "Content-Type: text/plain", f"Content-Length: {len(body)}",
+                   "Connection: close"]
+        if retry_after:
+            headers.append(f"Retry-After: {retry_after}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        viewer_id = None
+        try:
+            try:
+                method, path, query = await self._read_request(reader)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                return
+            if method != "GET" or path.rstrip("/") not in STREAM_PATHS:
+                await self._respond(writer, 404, "Not Found")
+                return
+
+            session_id = (query.get("session_id") or [None])[0]
+            try:
+                fps = min(float((query.get("fps") or [self.max_fps])[0]), self.max_fps)
+            except ValueError:
+                fps = self.max_fps
+            try:
+                self._admit(session_id)
+            except ViewerLimitError as e:
+                self.dropped["rejected"] += 1
+                await self._respond(writer, e.status, e.reason, retry_after=10)
+                return
+
+            viewer_id = f"viewer:{uuid4()}"
+            self.viewers[viewer_id] = session_id
+            self.acquire(viewer_id)
+            if self._pump is None:
+                self._pump = asyncio.ensure_future(self._pump_frames())
+
+            writer.write(b"HTTP/1.1 200 OK\r\n"
+                         b"Content-Type: multipart/x-mixed-replace; boundary=frame\r\n"
+                         b"Cache-Control: no-cache, no-store\r\n"
+                         b"Access-Control-Allow-Origin: *\r\n"
+                         b"Connection: close\r\n\r\n")
+            await self._stream(reader, writer, max(fps, 0.1))
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        except Exception as e:
+            logger.error(f"Error serving MJPEG viewer: {str(e)}")
+        finally:
+            if viewer_id:
+                self.viewers.pop(viewer_id, None)
+                self.release(viewer_id)
+            writer.close()
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, fps: float):
+        loop = asyncio.get_running_loop()
+        # Viewers never send anything after the request, so EOF means they left
+        disconnected = asyncio.ensure_future(reader.read())
+        last_seq = -1
+        next_at = loop.time()
+        try:
+            while True:
+                if self._frame[0] == last_seq:
+                    done, _ = await asyncio.wait({self._next_frame, disconnected}, timeout=self.idle_timeout,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                    if disconnected in done or not done:
+                        self.dropped["disconnected" if done else "idle"] += 1
+                        return
+                last_seq, jpeg = self._frame
+
+                writer.write(_PART_HEADER % len(jpeg) + jpeg + b"\r\n")
+                try:
+                    await asyncio.wait_for(writer.drain(), timeout=self.write_timeout)
+                except asyncio.TimeoutError:
+                    self.dropped["slow"] += 1
+                    return
+                self.frames_sent += 1
+
+                # Per-viewer pacing; frames that arrive meanwhile are skipped
+                next_at = max(next_at + 1.0 / fps, loop.time())
+                delay = next_at - loop.time()
+                if delay > 0:
+                    await asyncio.wait({disconnected}, timeout=delay)
+                    if disconnected.done():
+                        self.dropped["disconnected"] += 1
+                        return
+        finally:
+            disconnected.cancel()
@@ -0,0 +1,264 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    utilisation REAL NOT NULL DEFAULT 0,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    accepting INTEGER NOT NULL DEFAULT 1,
+    heartbeat_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_owners (
+    session_id TEXT PRIMARY KEY,
+    node_id TEXT NOT NULL,
+    user_id TEXT,
+    assigned_at REAL NOT NULL,
+    reassignments INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_session_owners_node ON session_owners (node_id);
+"""
+
+
+class NodeRegistry:
+    """Analysis nodes and the sessions they own, in a shared SQLite file.
+
+    A stand-in for a networked registry (Redis, Postgres) that works for
+    several processes on one host. Nodes heartbeat their load; a node whose
+    heartbeat is older than ttl seconds is considered dead and its sessions
+    are handed to the least loaded live node.
+    """
+
+    def __init__(self, path: str, ttl: float = 10.0):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so read-then-write steps
+        # such as picking a node for orphans cannot interleave across processes
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def heartbeat(self, node_id: str, url: str, status: Dict[str, Any]):
+        """Record that a node is alive along with its current load."""
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO nodes (node_id, url, utilisation, sessions, accepting, heartbeat_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (node_id) DO UPDATE SET
+                    url = excluded.url, utilisation = excluded.utilisation, sessions = excluded.sessions,
+                    accepting = excluded.accepting, heartbeat_at = excluded.heartbeat_at
+                """,
+                (node_id, url, status.get("utilisation", 0.0), status.get("active_sessions", 0),
+                 int(status.get("accepting", True)), time.time())
+            )
+
+    def deregister(self, node_id: str):
+        """Remove a node that is shutting down; its sessions become orphans."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,))
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        """Every registered node with its load and whether it is alive."""
+        cutoff = time.time() - self.ttl
+        rows = self._connection().execute("SELECT * FROM nodes ORDER BY node_id").fetchall()
+        return [{**dict(row), "accepting": bool(row["accepting"]), "alive": row["heartbeat_at"] >= cutoff}
+                for row in rows]
+
+    @staticmethod
+    def _least_loaded(conn: sqlite3.Connection, cutoff: float) -> Optional[sqlite3.Row]:
+        # Nodes that are accepting come first, then the least utilised, then the fewest sessions
+        return conn.execute(
+            """
+            SELECT * FROM nodes WHERE heartbeat_at >= ?
+            ORDER BY accepting DESC, utilisation, sessions, node_id LIMIT 1
+            """,
+            (cutoff,)
+        ).fetchone()
+
+    def choose_node(self) -> Optional[Dict[str, Any]]:
+        """The live node a new session should start on, or None if none is alive."""
+        row = self._least_loaded(self._connection(), time.time() - self.ttl)
+        return dict(row) if row else None
+
+    def assign(self, session_id: str, node_id: str, user_id: Optional[str] = None):
+        """Record node_id as the owner of a session."""
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO session_owners (session_id, node_id, user_id, assigned_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET node_id = excluded.node_id, assigned_at = excluded.assigned_at
+                """,
+                (session_id, node_id, user_id, time.time())
+            )
+            # Count it right away so back-to-back starts spread across nodes
+            conn.execute("UPDATE nodes SET sessions = sessions + 1 WHERE node_id = ?", (node_id,))
+
+    def release(self, session_id: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM session_owners WHERE session_id = ?", (session_id,))
+
+    def owner(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """The node that owns a session, with its URL and liveness, or None if unassigned."""
+        row = self._connection().execute(
+            """
+            SELECT s.session_id, s.node_id, n.url, n.heartbeat_at
+            FROM session_owners s LEFT JOIN nodes n ON n.node_id = s.node_id
+            WHERE s.session_id = ?
+            """,
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        owner = dict(row)
+        owner["alive"] = bool(row["heartbeat_at"]) and row["heartbeat_at"] >= time.time() - self.ttl
+        return owner
+
+    def owned_by(self, node_id: str) -> Dict[str, Optional[str]]:
+        """Sessions assigned to a node, mapped to their user ids."""
+        rows = self._connection().execute(
+            "SELECT session_id, user_id FROM session_owners WHERE node_id = ?", (node_id,)
+        ).fetchall()
+        return {row["session_id"]: row["user_id"] for row in rows}
+
+    def reassign_orphans(self) -> List[Tuple[str, str]]:
+        """Move sessions of dead or deregistered nodes to the least loaded live node.
+
+        Returns (session_id, new node_id) pairs. Safe to call from every node.
+        """
+        cutoff = time.time() - self.ttl
+        moved = []
+        with self._transaction() as conn:
+            orphans = conn.execute(
+                """
+                SELECT s.session_id FROM session_owners s LEFT JOIN nodes n ON n.node_id = s.node_id
+                WHERE n.node_id IS NULL OR n.heartbeat_at < ?
+                ORDER BY s.assigned_at
+                """,
+                (cutoff,)
+            ).fetchall()
+            for orphan in orphans:
+                target = self._least_loaded(conn, cutoff)
+                if target is None:
+                    break
+                conn.execute(
+                    """
+                    UPDATE session_owners SET node_id = ?, assigned_at = ?, reassignments = reassignments + 1
+                    WHERE session_id = ?
+                    """,
+                    (target["node_id"], time.time(), orphan["session_id"])
+                )
+                conn.execute("UPDATE nodes SET sessions = sessions + 1 WHERE node_id = ?", (target["node_id"],))
+                moved.append((orphan["session_id"], target["node_id"]))
+        return moved
+
+
+class ClusterNode:
+    """This node's membership in the registry.
+
+    A background thread heartbeats the node's capacity status every
+    interval seconds, hands sessions of dead nodes to live ones and calls
+    on_adopt / on_drop for sessions that moved to or away from this node.
+    """
+
+    def __init__(self, registry: NodeRegistry, node_id: str, url: str, interval: float = 2.0):
+        self.registry = registry
+        self.node_id = node_id
+        self.url = url
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, status: Callable[[], Dict[str, Any]], local_sessions: Callable[[], List[str]],
+              on_adopt: Callable[[str, Optional[str]], None], on_drop: Callable[[str], None]):
+        if self._thread and self._thread.is_alive():
+            return
+        self._status = status
+        self._local_sessions = local_sessions
+        self._on_adopt = on_adopt
+        self._on_drop = on_drop
+        self._stop.clear()
+        self.beat()
+        self._thread = threading.Thread(target=self._run, name="node-heartbeat", daemon=True)
+        self._thread.start()
+        logger.info(f"Node {self.node_id} registered at {self.url}")
+
+    def stop(self):
+        self._stop.set()
+        try:
+            self.registry.deregister(self.node_id)
+        except Exception as e:
+            logger.error(f"Error deregistering node {self.node_id}: {str(e)}")
+
+    def beat(self):
+        """Heartbeat once, reassign orphans and reconcile this node's sessions."""
+        self.registry.heartbeat(self.node_id, self.url, self._status())
+        for session_id, node_id in self.registry.reassign_orphans():
+            logger.warning(f"Session {session_id} reassigned to node {node_id}")
+
+        owned = self.registry.owned_by(self.node_id)
+        local = set(self._local_sessions())
+        for session_id in owned.keys() - local:
+            self._on_adopt(session_id, owned[session_id])
+        for session_id in local - owned.keys():
+            # Another node took the session over while this one was unreachable
+            owner = self.registry.owner(session_id)
+            if owner and owner["node_id"] != self.node_id:
+                self._on_drop(session_id)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                logger.error(f"Error sending node heartbeat: {str(e)}")
+
+    def assign(self, session_id: str, user_id: Optional[str] = None):
+        self.registry.assign(session_id, self.node_id, user_id)
+
+    def release(self, session_id: str):
+        self.registry.release(session_id)
+
+
+def cluster_from_env() -> Optional[ClusterNode]:
+    """The ClusterNode configured by MOODVUE_REGISTRY_PATH, or None on a single node."""
+    path = os.getenv("MOODVUE_REGISTRY_PATH")
+    if not path:
+        return None
+    port = os.getenv("PORT", "5001")
+    registry = NodeRegistry(path, ttl=float(os.getenv("NODE_TTL_SECONDS", 10)))
+    return ClusterNode(
+        registry,
+        node_id=os.getenv("MOODVUE_NODE_ID", f"{socket.gethostname()}:{port}"),
+        url=os.getenv("MOODVUE_NODE_URL", f"http://127.0.0.1:{port}"),
+        interval=float(os.getenv("NODE_HEARTBEAT_SECONDS", 2))
+    )
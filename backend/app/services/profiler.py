@@ -0,0 +1,235 @@
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Threads that belong to the service rather than to request handling
+BACKGROUND_THREADS = {"analysis", "spool-shipper", "shared-state", "control", "node-heartbeat", "mjpeg-server", "profiler"}
+
+
+def is_request_thread(thread: threading.Thread) -> bool:
+    return thread is not threading.main_thread() and thread.name not in BACKGROUND_THREADS
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples thread stacks with sys._current_frames().
+
+    Nothing runs until start() is called: a "profiler" thread then wakes
+    every interval seconds for the requested duration and counts the stacks
+    of the threads accepted by thread_filter. Results are folded stacks
+    ("thread;outer (file:line);inner (file:line) count" per line), which
+    flamegraph.pl and speedscope read directly. The last max_profiles
+    results are kept in memory, as are those other processes store().
+    """
+
+    def __init__(self, max_profiles: int = 5):
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._running: Optional[str] = None
+        self._next_id = 1
+
+    def start(self, target: str, seconds: float, interval: float,
+              thread_filter: Callable[[threading.Thread], bool],
+              publish: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Begin sampling in the background and return the profile's summary.
+
+        publish, if given, is called with the profile as get() returns it
+        when sampling starts and again when it ends, so processes other
+        than this one can serve it.
+        """
+        if not 0 < seconds <= 300:
+            raise ValueError("seconds must be between 0 and 300")
+        if not 0.001 <= interval <= 1:
+            raise ValueError("interval must be between 0.001 and 1")
+
+        with self._lock:
+            if self._running:
+                raise RuntimeError(f"Profile {self._running} is still running")
+            profile_id = f"{target}-{os.getpid()}-{self._next_id}"
+            self._next_id += 1
+            profile = {
+                "id": profile_id,
+                "target": target,
+                "status": "running",
+                "seconds": seconds,
+                "interval": interval,
+                "samples": 0,
+                "started_at": time.time(),
+                "stacks": Counter(),
+            }
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+            self._running = profile_id
+
+        self._publish(publish, profile)
+        threading.Thread(
+            target=self._sample, args=(profile, thread_filter, publish), name="profiler", daemon=True
+        ).start()
+        return self._summary(profile)
+
+    def _publish(self, publish: Optional[Callable[[Dict[str, Any]], None]], profile: Dict[str, Any]):
+        if publish is None:
+            return
+        try:
+            publish(self._result(profile))
+        except Exception as e:
+            logger.error(f"Error publishing profile {profile['id']}: {str(e)}")
+
+    def _sample(self, profile: Dict[str, Any], thread_filter: Callable[[threading.Thread], bool],
+                publish: Optional[Callable[[Dict[str, Any]], None]] = None):
+        me = threading.get_ident()
+        stacks = profile["stacks"]
+        deadline = time.monotonic() + profile["seconds"]
+        try:
+            while time.monotonic() < deadline:
+                threads = {thread.ident: thread for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    thread = threads.get(ident)
+                    if ident == me or thread is None or not thread_filter(thread):
+                        continue
+                    names = []
+                    while frame is not None:
+                        code = frame.f_code
+                        # Grouped by function rather than line so the graph stays readable
+                        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    names.append(thread.name)
+                    stacks[";".join(reversed(names))] += 1
+                profile["samples"] += 1
+                time.sleep(profile["interval"])
+            profile["status"] = "done"
+        except Exception as e:
+            profile["status"] = "failed"
+            profile["error"] = str(e)
+        finally:
+            with self._lock:
+                self._running = None
+            self._publish(publish, profile)
+
+    @staticmethod
+    def _summary(profile: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in profile.items() if key not in ("stacks", "folded")}
+
+    def _result(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        result = self._summary(profile)
+        if "folded" in profile:
+            result["folded"] = profile["folded"]
+        elif profile["status"] == "done":
+            result["folded"] = "".join(
+                f"{stack} {count}\n" for stack, count in profile["stacks"].most_common()
+            )
+        return result
+
+    def store(self, profile: Dict[str, Any]):
+        """Keep a profile another process published, replacing an earlier copy of it."""
+        with self._lock:
+            self._profiles.pop(profile["id"], None)
+            self._profiles[profile["id"]] = dict(profile)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """The profile's summary plus, once finished, its folded stacks."""
+        profile = self._profiles.get(profile_id)
+        if profile is None:
+            return None
+        return self._result(profile)
+
+    def list(self) -> list:
+        return [self._summary(profile) for profile in self._profiles.values()]
+
+
+class SharedProfiler:
+    """An HTTP worker's view of the profiles of the whole node.
+
+    Request threads are sampled in this worker and each profile is
+    published to the analysis process over the control channel, so whichever
+    worker a later GET lands on can serve it. Other targets are profiled in
+    the analysis process itself.
+    """
+
+    def __init__(self, control, local: Optional[SamplingProfiler] = None):
+        self.control = control
+        self.local = local or profiler
+
+    def start(self, target: str, seconds: float, interval: float) -> Dict[str, Any]:
+        if target == "requests":
+            return self.local.start(target, seconds, interval, is_request_thread, self._store)
+        return self.control.call("start_profile", target=target, seconds=seconds, interval=interval)
+
+    def _store(self, profile: Dict[str, Any]):
+        self.control.call("store_profile", profile=profile)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self.local.get(profile_id) or self.control.call("get_profile", profile_id=profile_id)
+
+
+class AllocationTracker:
+    """On-demand tracemalloc snapshots.
+
+    tracemalloc adds overhead to every allocation, so it only runs between
+    start() and stop(). Each snapshot() reports the top allocation sites and
+    how they grew since the previous snapshot, which is where per-frame
+    copies show up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self, frames: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._previous = None
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {"tracing": tracing, "traced_bytes": current, "peak_bytes": peak}
+
+    def snapshot(self, top: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        if group_by not in ("lineno", "filename", "traceback"):
+            raise ValueError("group_by must be lineno, filename or traceback")
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("Allocation tracking is not started")
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            previous, self._previous = self._previous, snapshot
+
+        def site(traceback: tracemalloc.Traceback) -> list:
+            return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+        result = self.status()
+        result["top"] = [
+            {"site": site(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:top]
+        ]
+        if previous is not None:
+            result["growth"] = [
+                {"site": site(stat.traceback), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in snapshot.compare_to(previous, group_by)[:top]
+            ]
+        return result
+
+
+profiler = SamplingProfiler()
+allocations = AllocationTracker()
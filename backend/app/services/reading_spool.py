@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from postgrest.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "spool",
+    "readings.db"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    user_id TEXT,
+    emotion TEXT NOT NULL,
+    stress_score INTEGER,
+    confidence REAL NOT NULL,
+    face_detected INTEGER NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    user_id TEXT,
+    emotion TEXT NOT NULL,
+    stress_score INTEGER,
+    confidence REAL NOT NULL,
+    face_detected INTEGER NOT NULL,
+    recorded_at TEXT NOT NULL,
+    error TEXT NOT NULL,
+    failed_at TEXT NOT NULL
+);
+"""
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """Whether Supabase rejected a row for good rather than failed to take it.
+
+    Integrity (SQLSTATE 23xxx, e.g. a deleted session's foreign key or the
+    stress_score CHECK) and data (22xxx) violations, and PostgREST request
+    errors (PGRST1xx, sent as 4xx), fail the same way on every retry.
+    """
+    if not isinstance(error, APIError):
+        return False
+    code = str(error.code or "")
+    return code[:2] in ("22", "23") or code.startswith("PGRST1")
+
+
+class ReadingSpool:
+    """Durable local log that every emotion reading is written to first.
+
+    Readings get a client-generated UUID so replays to Supabase are
+    idempotent. Appends are buffered in memory and committed in one
+    transaction per batch (or every flush_interval seconds), so the fsync
+    cost is paid per batch rather than per reading. Shipped rows are
+    deleted from the head of the log and the file is compacted with
+    incremental vacuum; when max_rows is exceeded the oldest unshipped
+    readings are dropped to keep disk usage bounded. Readings Supabase
+    will never accept are moved to a dead_letters table (also capped at
+    max_rows) so they cannot hold up the rest.
+    """
+
+    def __init__(self, path: str = DEFAULT_SPOOL_PATH, max_rows: int = 500_000,
+                 batch_size: int = 50, flush_interval: float = 1.0):
+        self.path = path
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer: List[Tuple] = []
+        self._last_flush = time.monotonic()
+        self.dropped = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # auto_vacuum only takes effect on a fresh database file
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+
+    def append(self, session_id: UUID, user_id: Optional[UUID], result: Dict[str, Any]) -> str:
+        """Queue one analysis result for the session and return its record id."""
+        record_id = str(uuid.uuid4())
+        row = (
+            record_id,
+            str(session_id),
+            str(user_id) if user_id else None,
+            result["emotion"].lower(),
+            result.get("stress_score"),
+            result["confidence"],
+            int(bool(result.get("face_detected", True))),
+            datetime.now(timezone.utc).isoformat()
+        )
+        with self._lock:
+            self._buffer.append(row)
+            due = (
+                len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+        return record_id
+
+    def flush(self):
+        """Commit buffered readings to disk in a single transaction."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT INTO readings (id, session_id, user_id, emotion, stress_score, confidence, "
+                    "face_detected, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                # Keep the readings in memory and retry on the next flush
+                self._buffer = rows + self._buffer
+                logger.error(f"Error writing readings to spool: {str(e)}")
+                return
+        self._enforce_limit()
+
+    def pending(self, limit: int = 500) -> List[Tuple[int, Dict[str, Any]]]:
+        """Oldest unshipped readings as (seq, emotion_records row) pairs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, id, session_id, user_id, emotion, stress_score, confidence, face_detected, recorded_at "
+                "FROM readings ORDER BY seq LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            (seq, {
+                "id": record_id,
+                "session_id": session_id,
+                "user_id": user_id,
+                "emotion": emotion,
+                "stress_score": stress_score,
+                "confidence": confidence,
+                "face_detected": bool(face_detected),
+                "recorded_at": recorded_at
+            })
+            for seq, record_id, session_id, user_id, emotion, stress_score, confidence, face_detected, recorded_at in rows
+        ]
+
+    def mark_shipped(self, up_to_seq: int):
+        """Drop every reading up to and including up_to_seq from the log."""
+        with self._lock:
+            self._conn.execute("DELETE FROM readings WHERE seq <= ?", (up_to_seq,))
+
+    def dead_letter(self, seq: int, error: str):
+        """Move one reading out of the log into dead_letters."""
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO dead_letters SELECT *, ?, ? FROM readings WHERE seq = ?",
+                    (error, datetime.now(timezone.utc).isoformat(), seq)
+                )
+                self._conn.execute("DELETE FROM readings WHERE seq = ?", (seq,))
+                self._conn.execute(
+                    "DELETE FROM dead_letters WHERE seq NOT IN "
+                    "(SELECT seq FROM dead_letters ORDER BY seq DESC LIMIT ?)",
+                    (self.max_rows,)
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+    def compact(self):
+        """Return free pages left behind by shipped readings to the filesystem."""
+        with self._lock:
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _enforce_limit(self):
+        with self._lock:
+            # Rows only leave from the head, or from the batch being shipped
+            # when one is dead-lettered, so this is at most a batch too high
+            count = self._conn.execute("SELECT COALESCE(MAX(seq) - MIN(seq) + 1, 0) FROM readings").fetchone()[0]
+            overflow = count - self.max_rows
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM readings WHERE seq IN (SELECT seq FROM readings ORDER BY seq LIMIT ?)",
+                    (overflow,)
+                )
+                self.dropped += overflow
+                logger.warning(f"Spool full, dropped {overflow} oldest readings")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+            dead_letters = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+            buffered = len(self._buffer)
+        return {
+            "pending": count + buffered,
+            "buffered": buffered,
+            "dropped": self.dropped,
+            "dead_letters": dead_letters,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class SpoolShipper:
+    """Background thread that replays the spool to Supabase in bulk.
+
+    Failures back off exponentially up to max_backoff seconds; nothing is
+    removed from the spool until Supabase has accepted it. When a batch is
+    rejected permanently it is split in halves until the rejected readings
+    are isolated; those are dead-lettered and the rest are shipped.
+    """
+
+    def __init__(self, spool: ReadingSpool, session_service, batch_size: int = 500,
+                 interval: float = 2.0, max_backoff: float = 60.0, compact_every: int = 100):
+        self.spool = spool
+        self.session_service = session_service
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.compact_every = compact_every
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="spool-shipper", daemon=True)
+        self._thread.start()
+        print("Spool shipper thread started.")
+
+    def stop(self):
+        self._stop.set()
+
+    def ship_once(self) -> int:
+        """Ship one batch and return how many readings left the spool, shipped or dead-lettered."""
+        self.spool.flush()
+        batch = self.spool.pending(self.batch_size)
+        if not batch:
+            return 0
+        self._ship(batch)
+        self.spool.mark_shipped(batch[-1][0])
+        return len(batch)
+
+    def _ship(self, batch: List[Tuple[int, Dict[str, Any]]]) -> int:
+        """Ship a batch, returning how many of its readings were dead-lettered."""
+        try:
+            asyncio.run(self.session_service.record_emotions_bulk([record for _, record in batch]))
+            return 0
+        except Exception as e:
+            if not is_permanent_error(e):
+                raise
+            if len(batch) == 1:
+                seq, record = batch[0]
+                self.spool.dead_letter(seq, str(e))
+                logger.warning(f"Dead-lettered reading {record['id']} for session {record['session_id']}: {str(e)}")
+                return 1
+        # Halves that were shipped before a later transient failure are
+        # replayed on the next attempt; the upsert makes that harmless
+        middle = len(batch) // 2
+        return self._ship(batch[:middle]) + self._ship(batch[middle:])
+
+    def _run(self):
+        backoff = self.interval
+        batches = 0
+        while not self._stop.is_set():
+            try:
+                shipped = self.ship_once()
+                backoff = self.interval
+                if shipped:
+                    batches += 1
+                    if batches % self.compact_every == 0:
+                        self.spool.compact()
+                    # Keep draining while there is a backlog
+                    if shipped == self.batch_size:
+                        continue
+            except Exception as e:
+                backoff = min(backoff * 2, self.max_backoff)
+                logger.error(f"Error shipping spooled readings, retrying in {backoff:.0f}s: {str(e)}")
+            self._stop.wait(backoff)
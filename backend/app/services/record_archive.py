@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "archive"
+)
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("session_id", pa.string()),
+    ("user_id", pa.string()),
+    ("emotion", pa.dictionary(pa.int8(), pa.string())),
+    ("stress_score", pa.float32()),
+    ("confidence", pa.float32()),
+    ("face_detected", pa.bool_()),
+    ("recorded_at", pa.timestamp("us", tz="UTC")),
+])
+
+_FILE_TIME_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+class RecordArchiveExporter:
+    """Streams emotion_records out of Supabase into Arrow IPC files.
+
+    Files live under <archive_dir>/user=<user_id>/ and are named after the
+    first and last recorded_at they contain. Each user has a watermark of
+    the last exported (inserted_at, id), so reruns only fetch new rows.
+    It is keyed on when rows reached the database rather than recorded_at,
+    because readings the spool ships after an outage arrive with an old
+    recorded_at. Rows inserted in the last settle_seconds are left for the
+    next run, so a batch still being committed is not skipped. Rows are
+    paged with keyset pagination on (inserted_at, id) rather than OFFSET,
+    so every page is an index range scan.
+    """
+
+    def __init__(self, supabase, archive_dir: str = DEFAULT_ARCHIVE_DIR, page_size: int = 1000,
+                 rows_per_file: int = 50000, compression: Optional[str] = "zstd",
+                 settle_seconds: float = 300):
+        self.supabase = supabase
+        self.archive_dir = archive_dir
+        self.page_size = page_size
+        self.rows_per_file = rows_per_file
+        self.compression = compression
+        self.settle_seconds = settle_seconds
+        self.watermark_path = os.path.join(archive_dir, "_watermarks.json")
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def _load_watermarks(self) -> Dict[str, Dict[str, str]]:
+        if not os.path.exists(self.watermark_path):
+            return {}
+        with open(self.watermark_path) as f:
+            watermarks = json.load(f)
+        # Watermarks from before inserted_at: the migration backfilled it from recorded_at
+        return {
+            user_id: {"inserted_at": mark.get("inserted_at", mark.get("recorded_at")), "id": mark["id"]}
+            for user_id, mark in watermarks.items()
+        }
+
+    def _save_watermark(self, user_id: str, inserted_at: str, record_id: str):
+        watermarks = self._load_watermarks()
+        watermarks[user_id] = {"inserted_at": inserted_at, "id": record_id}
+        tmp_path = f"{self.watermark_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(watermarks, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.watermark_path)
+
+    def _user_ids(self) -> List[str]:
+        user_ids = set()
+        start = 0
+        while True:
+            result = self.supabase.table("sessions").select("user_id").order("user_id").range(
+                start, start + self.page_size - 1
+            ).execute()
+            rows = result.data or []
+            user_ids.update(row["user_id"] for row in rows)
+            if len(rows) < self.page_size:
+                return sorted(user_ids)
+            start += self.page_size
+
+    def _pages(self, user_id: str, watermark: Optional[Dict[str, str]],
+               until: str) -> Iterator[List[Dict[str, Any]]]:
+        last = watermark
+        while True:
+            # The inner join keeps the user's rows in one (inserted_at, id) order
+            query = self.supabase.table("emotion_records").select(
+                "id, session_id, emotion, stress_score, confidence, face_detected, recorded_at, inserted_at, "
+                "sessions!inner(user_id)"
+            ).eq("sessions.user_id", user_id).lte("inserted_at", until)
+            if last:
+                # The plain lower bound is a range condition on the index;
+                # the OR alone would be checked row by row
+                query = query.gte("inserted_at", last["inserted_at"]).or_(
+                    f'inserted_at.gt."{last["inserted_at"]}",'
+                    f'and(inserted_at.eq."{last["inserted_at"]}",id.gt.{last["id"]})'
+                )
+            rows = query.order("inserted_at").order("id").limit(self.page_size).execute().data or []
+            if not rows:
+                return
+            yield rows
+            last = {"inserted_at": rows[-1]["inserted_at"], "id": rows[-1]["id"]}
+            if len(rows) < self.page_size:
+                return
+
+    def _write_file(self, user_id: str, rows: List[Dict[str, Any]]) -> str:
+        table = pa.Table.from_pydict({
+            "id": [r["id"] for r in rows],
+            "session_id": [r["session_id"] for r in rows],
+            "user_id": [user_id] * len(rows),
+            "emotion": pa.array([r["emotion"] for r in rows]).dictionary_encode().cast(
+                ARCHIVE_SCHEMA.field("emotion").type
+            ),
+            "stress_score": [r["stress_score"] for r in rows],
+            # Stored as a 0-100 smallint; archived as the app's 0-1 fraction
+            "confidence": [r["confidence"] / 100 for r in rows],
+            "face_detected": [r["face_detected"] for r in rows],
+            "recorded_at": [_parse_timestamp(r["recorded_at"]) for r in rows],
+        }, schema=ARCHIVE_SCHEMA)
+
+        # Late readings mean a file's rows are not in recorded_at order
+        recorded = [_parse_timestamp(r["recorded_at"]) for r in rows]
+        first = min(recorded).strftime(_FILE_TIME_FORMAT)
+        last = max(recorded).strftime(_FILE_TIME_FORMAT)
+        # The last inserted_at tells apart files covering the same recorded_at range
+        inserted = _parse_timestamp(rows[-1]["inserted_at"]).strftime(_FILE_TIME_FORMAT)
+        user_dir = os.path.join(self.archive_dir, f"user={user_id}")
+        os.makedirs(user_dir, exist_ok=True)
+        path = os.path.join(user_dir, f"{first}_{last}_{inserted}.arrow")
+
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, ARCHIVE_SCHEMA, options=options) as writer:
+            writer.write_table(table, max_chunksize=self.page_size * 10)
+        os.replace(tmp_path, path)
+        return path
+
+    def export_user(self, user_id: UUID) -> int:
+        """Export one user's new rows and return how many were written."""
+        user_id = str(user_id)
+        watermark = self._load_watermarks().get(user_id)
+        until = (datetime.now(timezone.utc) - timedelta(seconds=self.settle_seconds)).isoformat()
+
+        exported = 0
+        batch: List[Dict[str, Any]] = []
+        for page in self._pages(user_id, watermark, until):
+            batch.extend(page)
+            if len(batch) >= self.rows_per_file:
+                exported += self._flush(user_id, batch)
+                batch = []
+        if batch:
+            exported += self._flush(user_id, batch)
+
+        logger.info(f"Exported {exported} emotion records for user {user_id}")
+        return exported
+
+    def _flush(self, user_id: str, rows: List[Dict[str, Any]]) -> int:
+        path = self._write_file(user_id, rows)
+        self._save_watermark(user_id, rows[-1]["inserted_at"], rows[-1]["id"])
+        logger.debug(f"Wrote {len(rows)} rows to {path}")
+        return len(rows)
+
+    def export_all(self) -> Dict[str, int]:
+        """Export new rows for every user that has sessions."""
+        return {user_id: self.export_user(user_id) for user_id in self._user_ids()}
+
+
+class RecordArchive:
+    """Reads exported emotion_records back through memory-mapped Arrow IPC files."""
+
+    def __init__(self, archive_dir: str = DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+
+    def _files(self, user_id: str, since: Optional[datetime], until: Optional[datetime]) -> List[str]:
+        user_dir = os.path.join(self.archive_dir, f"user={user_id}")
+        if not os.path.isdir(user_dir):
+            return []
+        paths = []
+        for name in sorted(os.listdir(user_dir)):
+            if not name.endswith(".arrow"):
+                continue
+            first, last = name[:-len(".arrow")].split("_")[:2]
+            first_at = datetime.strptime(first, _FILE_TIME_FORMAT).replace(tzinfo=timezone.utc)
+            last_at = datetime.strptime(last, _FILE_TIME_FORMAT).replace(tzinfo=timezone.utc)
+            # Skip files wholly outside the requested range without opening them
+            if (since and last_at < since) or (until and first_at > until):
+                continue
+            paths.append(os.path.join(user_dir, name))
+        return paths
+
+    def read_user(self, user_id: UUID, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None) -> pa.Table:
+        """All archived rows for a user with since <= recorded_at <= until."""
+        tables = []
+        for path in self._files(str(user_id), since, until):
+            with pa.memory_map(path, "r") as source:
+                tables.append(pa.ipc.open_file(source).read_all())
+        if not tables:
+            return ARCHIVE_SCHEMA.empty_table()
+
+        table = pa.concat_tables(tables)
+        timestamp_type = ARCHIVE_SCHEMA.field("recorded_at").type
+        if since:
+            table = table.filter(pc.greater_equal(table["recorded_at"], pa.scalar(since, timestamp_type)))
+        if until:
+            table = table.filter(pc.less_equal(table["recorded_at"], pa.scalar(until, timestamp_type)))
+        return table
+
+    def latest_recorded_at(self, user_id: UUID) -> Optional[datetime]:
+        """End of the archived range for a user, from file names alone."""
+        paths = self._files(str(user_id), None, None)
+        if not paths:
+            return None
+        # Files sort by their first reading, and late readings can widen an earlier one
+        last = max(os.path.basename(path)[:-len(".arrow")].split("_")[1] for path in paths)
+        return datetime.strptime(last, _FILE_TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+    def daily_summary(self, user_id: UUID, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Per-day reading counts, stress and emotion counts for a user."""
+        table = self.read_user(user_id, since, until)
+        if table.num_rows == 0:
+            return []
+
+        table = table.append_column("day", pc.strftime(table["recorded_at"], format="%Y-%m-%d"))
+        table = table.append_column("emotion_name", table["emotion"].cast(pa.string()))
+        totals = table.group_by("day").aggregate([
+            ("id", "count"),
+            ("stress_score", "mean"),
+            ("stress_score", "max"),
+            ("confidence", "mean"),
+        ]).to_pylist()
+        counts = table.group_by(["day", "emotion_name"]).aggregate([("id", "count")]).to_pylist()
+
+        emotion_counts: Dict[str, Dict[str, int]] = {}
+        for row in counts:
+            emotion_counts.setdefault(row["day"], {})[row["emotion_name"]] = row["id_count"]
+
+        return sorted(
+            (
+                {
+                    "date": row["day"],
+                    "total_readings": row["id_count"],
+                    "avg_stress_score": row["stress_score_mean"],
+                    "max_stress_score": row["stress_score_max"],
+                    "avg_confidence": row["confidence_mean"],
+                    "emotion_counts": emotion_counts.get(row["day"], {})
+                }
+                for row in totals
+            ),
+            key=lambda row: row["date"]
+        )
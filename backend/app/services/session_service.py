@@ -8,6 +8,24 @@ from app.database import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
+# Emotions with their own *_readings column in user_daily_stats
+DAILY_STATS_EMOTIONS = ["happy", "sad", "angry", "fear", "surprise", "neutral", "disgust", "calm"]
+
+
+def confidence_to_percent(confidence: float) -> int:
+    """emotion_records stores confidence as a 0-100 smallint; the app works in 0-1."""
+    return int(round(float(confidence) * 100))
+
+
+def _stress_to_int(stress_score: Optional[float]) -> Optional[int]:
+    return None if stress_score is None else int(round(stress_score))
+
+
+def reading_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored emotion_records row back to the app's 0-1 confidence."""
+    return {**row, "confidence": row["confidence"] / 100}
+
+
 class SessionService:
     def __init__(self):
         self.supabase = get_supabase_client()
@@ -97,8 +115,8 @@ class SessionService:
             emotion_record = {
                 "session_id": str(session_id),
                 "emotion": emotion_data["emotion"].lower(),
-                "stress_score": emotion_data.get("stress_score"),
-                "confidence": emotion_data["confidence"],
+                "stress_score": _stress_to_int(emotion_data.get("stress_score")),
+                "confidence": confidence_to_percent(emotion_data["confidence"]),
                 "face_detected": emotion_data.get("face_detected", True),
                 "recorded_at": datetime.now(timezone.utc).isoformat()
             }
@@ -112,7 +130,7 @@ class SessionService:
                 
                 if record:
                     logger.info(f"Successfully recorded emotion for session {session_id}: {record}")
-                    return record
+                    return reading_from_row(record)
                 else:
                     error_msg = "Failed to record emotion - no data returned from insert"
                     logger.error(error_msg)
@@ -124,6 +142,35 @@ class SessionService:
             logger.error(f"Error recording emotion for session {session_id}: {str(e)}")
             raise
 
+    async def record_emotions_bulk(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert spooled emotion readings in one request.
+
+        Records carry client-generated ids, so readings that were already
+        shipped are skipped and replays are idempotent.
+        """
+        rows = [
+            {
+                "id": record["id"],
+                "session_id": record["session_id"],
+                "emotion": record["emotion"],
+                "stress_score": _stress_to_int(record.get("stress_score")),
+                "confidence": confidence_to_percent(record["confidence"]),
+                "face_detected": record.get("face_detected", True),
+                "recorded_at": record["recorded_at"]
+            }
+            for record in records
+        ]
+        try:
+            result = self.supabase.table("emotion_records").upsert(
+                rows, on_conflict="id,recorded_at", ignore_duplicates=True
+            ).execute()
+            inserted = result.data if result.data else []
+            logger.info(f"Shipped {len(rows)} spooled emotion records ({len(inserted)} new)")
+            return inserted
+        except Exception as e:
+            logger.error(f"Error shipping {len(rows)} emotion records: {str(e)}")
+            raise
+
     async def get_active_session_by_id(self, session_id: UUID) -> Optional[Dict[str, Any]]:
         """Get an active session by its ID."""
         try:
@@ -176,6 +223,16 @@ class SessionService:
             # Calculate the date threshold
             threshold_date = datetime.now(timezone.utc) - timedelta(days=days)
 
+            # Every session belongs to the same profile, so fetch it once
+            # instead of joining it onto each row
+            profile_result = self.supabase.table("profiles").select(
+                "email, full_name, settings"
+            ).eq("id", str(user_id)).execute()
+            profile = profile_result.data[0] if profile_result.data else None
+            if not profile:
+                logger.info(f"No profile found for user {user_id}")
+                return []
+
             # Query sessions directly
             result = self.supabase.table("sessions").select("""
                 id,
@@ -190,7 +247,7 @@ class SessionService:
                 calm_readings,
                 happy_readings,
                 stressed_readings,
-                profiles!inner(email, full_name, settings)
+                updated_at
             """).eq("user_id", str(user_id)).gte("started_at", threshold_date.isoformat()).order("started_at", desc=True).execute()
 
             sessions = result.data if result.data else []
@@ -211,9 +268,10 @@ class SessionService:
                     "calm_readings": session.get("calm_readings", 0),
                     "happy_readings": session.get("happy_readings", 0),
                     "stressed_readings": session.get("stressed_readings", 0),
-                    "email": session["profiles"]["email"],
-                    "full_name": session["profiles"]["full_name"],
-                    "settings": session["profiles"]["settings"]
+                    "updated_at": session.get("updated_at"),
+                    "email": profile["email"],
+                    "full_name": profile["full_name"],
+                    "settings": profile["settings"]
                 })
 
             if not transformed_sessions:
@@ -226,23 +284,96 @@ class SessionService:
             logger.error(f"Error getting sessions for user {user_id}: {str(e)}")
             raise
 
-    async def get_session_emotions(self, session_id: UUID) -> List[Dict[str, Any]]:
-        """Get all emotion records for a session."""
+    async def get_user_daily_summary(self, user_id: UUID, days: int = 7) -> Dict[str, Any]:
+        """Summarise the last `days` UTC days (at most 30) from user_daily_stats."""
+        if not 1 <= days <= 30:
+            raise ValueError("days must be between 1 and 30")
+        try:
+            first_day = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date()
+            result = self.supabase.table("user_daily_stats").select("*").eq(
+                "user_id", str(user_id)
+            ).gte("day", first_day.isoformat()).order("day").execute()
+            rows = result.data if result.data else []
+
+            def stress_stats(stress_readings: int, stress_sum: int, stress_sq_sum: int):
+                if not stress_readings:
+                    return None, None
+                mean = stress_sum / stress_readings
+                variance = max(stress_sq_sum / stress_readings - mean * mean, 0.0)
+                return round(mean, 2), round(variance ** 0.5, 2)
+
+            def dominant(counts: Dict[str, int]) -> Optional[str]:
+                emotion, count = max(counts.items(), key=lambda item: item[1])
+                return emotion if count else None
+
+            daily = []
+            for row in rows:
+                counts = {emotion: row[f"{emotion}_readings"] for emotion in DAILY_STATS_EMOTIONS}
+                avg_stress, _ = stress_stats(row["stress_readings"], row["stress_sum"], row["stress_sq_sum"])
+                daily.append({
+                    "day": row["day"],
+                    "readings": row["readings"],
+                    "avg_stress_score": avg_stress,
+                    "dominant_emotion": dominant(counts),
+                    "sessions": row["sessions"],
+                    "session_minutes": round(row["session_seconds"] / 60, 1)
+                })
+
+            emotion_counts = {
+                emotion: sum(row[f"{emotion}_readings"] for row in rows) for emotion in DAILY_STATS_EMOTIONS
+            }
+            avg_stress, stress_stddev = stress_stats(
+                sum(row["stress_readings"] for row in rows),
+                sum(row["stress_sum"] for row in rows),
+                sum(row["stress_sq_sum"] for row in rows)
+            )
+            return {
+                "user_id": str(user_id),
+                "days": days,
+                "from": first_day.isoformat(),
+                "readings": sum(row["readings"] for row in rows),
+                "avg_stress_score": avg_stress,
+                "stress_stddev": stress_stddev,
+                "emotion_counts": emotion_counts,
+                "dominant_emotion": dominant(emotion_counts),
+                "sessions": sum(row["sessions"] for row in rows),
+                "session_minutes": round(sum(row["session_seconds"] for row in rows) / 60, 1),
+                "daily": daily
+            }
+        except Exception as e:
+            logger.error(f"Error getting daily summary for user {user_id}: {str(e)}")
+            raise
+
+    async def get_session(self, session_id: UUID) -> Dict[str, Any]:
+        """Get a session row by its ID."""
+        session_result = self.supabase.table("sessions").select("*").eq("id", str(session_id)).execute()
+        session = session_result.data[0] if session_result.data else None
+
+        if not session:
+            logger.error(f"Session {session_id} not found")
+            raise ValueError(f"Session {session_id} not found")
+        return session
+
+    async def get_session_emotions(self, session_id: UUID,
+                                   session: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Get all emotion records for a session, reusing its row if the caller already has it."""
         try:
             # First verify session exists
-            session_result = self.supabase.table("sessions").select("*").eq("id", str(session_id)).execute()
-            session = session_result.data[0] if session_result.data else None
-            
-            if not session:
-                logger.error(f"Session {session_id} not found")
-                raise ValueError(f"Session {session_id} not found")
+            if session is None:
+                session = await self.get_session(session_id)
 
-            # Get emotion records
-            result = self.supabase.table("emotion_records").select("*").eq(
-                "session_id", str(session_id)
-            ).order("recorded_at").execute()
+            # Get emotion records; the column list matches the covering index
+            # on (session_id, recorded_at, id) so the scan never visits the heap,
+            # and the lower bound on recorded_at skips monthly partitions from
+            # before the session started
+            started_at = datetime.fromisoformat(session["started_at"].replace("Z", "+00:00"))
+            result = self.supabase.table("emotion_records").select(
+                "id, session_id, emotion, stress_score, confidence, face_detected, recorded_at"
+            ).eq("session_id", str(session_id)).gte(
+                "recorded_at", (started_at - timedelta(days=1)).isoformat()
+            ).order("recorded_at").order("id").execute()
             
-            emotions = result.data if result.data else []
+            emotions = [reading_from_row(row) for row in result.data or []]
             
             logger.info(f"Retrieved {len(emotions)} emotion records for session {session_id}")
             return emotions
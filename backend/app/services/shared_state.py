@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SHM_NAME = os.getenv("MOODVUE_SHM_NAME", "moodvue_state")
+IPC_SOCKET = os.getenv("MOODVUE_IPC_SOCKET", "/tmp/moodvue-analysis.sock")
+
+# seq (odd while a write is in progress), analysis length, frame length
+_HEADER = struct.Struct("<QII")
+_ANALYSIS_CAPACITY = 256 * 1024
+_FRAME_CAPACITY = 4 * 1024 * 1024
+_SEGMENT_SIZE = _HEADER.size + _ANALYSIS_CAPACITY + _FRAME_CAPACITY
+
+# The writer publishes at least once a second, so a sequence number that
+# has not moved for this long means it may have been restarted with a new
+# segment under the same name
+STALE_SECONDS = 3.0
+
+
+def _authkey() -> bytes:
+    key = os.getenv("MOODVUE_IPC_AUTHKEY")
+    if not key:
+        raise RuntimeError("MOODVUE_IPC_AUTHKEY must be set for multi-worker mode")
+    return key.encode()
+
+
+class SharedStateWriter:
+    """Publishes the latest analysis and JPEG frame to a shared-memory segment.
+
+    Only the analysis process writes. Readers use the sequence number as a
+    seqlock: it is odd while a write is in progress, and a read is retried
+    if the number changed underneath it.
+    """
+
+    def __init__(self, name: str = SHM_NAME):
+        try:
+            # Left behind by a previous run that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=_SEGMENT_SIZE)
+        self._seq = 0
+        _HEADER.pack_into(self._shm.buf, 0, 0, 0, 0)
+
+    def publish(self, analysis: Dict[str, Any], frame_jpeg: Optional[bytes]):
+        payload = json.dumps(analysis).encode()
+        if len(payload) > _ANALYSIS_CAPACITY:
+            logger.warning(f"Analysis payload of {len(payload)} bytes does not fit shared memory")
+            return
+        frame_jpeg = frame_jpeg or b""
+        if len(frame_jpeg) > _FRAME_CAPACITY:
+            frame_jpeg = b""
+
+        buf = self._shm.buf
+        self._seq += 1
+        struct.pack_into("<Q", buf, 0, self._seq)
+        offset = _HEADER.size
+        buf[offset:offset + len(payload)] = payload
+        offset += _ANALYSIS_CAPACITY
+        buf[offset:offset + len(frame_jpeg)] = frame_jpeg
+        self._seq += 1
+        _HEADER.pack_into(buf, 0, self._seq, len(payload), len(frame_jpeg))
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+class SharedStateReader:
+    """Reads what SharedStateWriter published, from any HTTP worker.
+
+    A restarted writer unlinks the old segment and creates a new one, so
+    the reader reattaches by name once the sequence number has been still
+    for STALE_SECONDS.
+    """
+
+    def __init__(self, name: str = SHM_NAME):
+        self.name = name
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._cached: Tuple[int, Dict[str, Any], bytes] = (-1, {}, b"")
+        self._lock = threading.Lock()
+        self._last_seq: Optional[int] = None
+        self._seq_changed_at = 0.0
+
+    def _attach(self) -> bool:
+        if self._shm is None:
+            try:
+                self._shm = shared_memory.SharedMemory(name=self.name)
+            except FileNotFoundError:
+                return False
+            # Readers must not unlink the writer's segment when they exit
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+            self._last_seq = None
+        return True
+
+    def _stale(self) -> bool:
+        seq = struct.unpack_from("<Q", self._shm.buf, 0)[0]
+        now = time.monotonic()
+        if seq != self._last_seq:
+            self._last_seq = seq
+            self._seq_changed_at = now
+            return False
+        return now - self._seq_changed_at > STALE_SECONDS
+
+    def _detach(self):
+        self._shm.close()
+        self._shm = None
+        # A new writer counts from zero again, so the cached number means nothing
+        self._cached = (-1, self._cached[1], self._cached[2])
+
+    def read(self, retries: int = 100) -> Tuple[int, Dict[str, Any], bytes]:
+        """Return (seq, analysis, jpeg bytes); seq is -1 until the writer is up."""
+        with self._lock:
+            if not self._attach():
+                return self._cached
+            if self._stale():
+                self._detach()
+                if not self._attach():
+                    return self._cached
+            buf = self._shm.buf
+            for _ in range(retries):
+                seq, analysis_len, frame_len = _HEADER.unpack_from(buf, 0)
+                if seq % 2:
+                    time.sleep(0)
+                    continue
+                if seq == self._cached[0]:
+                    return self._cached
+                offset = _HEADER.size
+                payload = bytes(buf[offset:offset + analysis_len])
+                offset += _ANALYSIS_CAPACITY
+                frame = bytes(buf[offset:offset + frame_len])
+                if struct.unpack_from("<Q", buf, 0)[0] != seq:
+                    continue
+                self._cached = (seq, json.loads(payload) if payload else {}, frame)
+                return self._cached
+            return self._cached
+
+
+class ControlServer:
+    """Serves method calls from HTTP workers on a local socket.
+
+    handlers maps a command name to a callable taking keyword arguments.
+    Each connection gets its own thread; replies are ("ok", value) or
+    ("error", (exception class name, message)).
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[..., Any]], address: str = IPC_SOCKET):
+        self.handlers = handlers
+        self.address = address
+        if os.path.exists(address):
+            os.unlink(address)
+        self._listener = Listener(address, family="AF_UNIX", authkey=_authkey())
+
+    def serve_forever(self):
+        print(f"Analysis control channel listening on {self.address}")
+        while True:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                logger.error(f"Error accepting control connection: {str(e)}")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), name="control", daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    command, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                handler = self.handlers.get(command)
+                try:
+                    if handler is None:
+                        raise ValueError(f"Unknown command: {command}")
+                    conn.send(("ok", handler(**kwargs)))
+                except Exception as e:
+                    conn.send(("error", (type(e).__name__, str(e))))
+
+
+# Errors callers handle by type are re-raised as such; anything else is a RuntimeError
+_REMOTE_ERRORS = {"ValueError": ValueError, "PermissionError": PermissionError}
+
+
+class ControlClient:
+    """Calls ControlServer commands, one connection per worker thread."""
+
+    def __init__(self, address: str = IPC_SOCKET):
+        self.address = address
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=_authkey())
+            self._local.conn = conn
+        return conn
+
+    def call(self, command: str, **kwargs) -> Any:
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send((command, kwargs))
+                status, value = conn.recv()
+                break
+            except (EOFError, OSError, ConnectionError):
+                # The analysis process restarted; reconnect once
+                self._local.conn = None
+                if attempt:
+                    raise
+        if status == "error":
+            name, message = value
+            raise _REMOTE_ERRORS.get(name, RuntimeError)(message)
+        return value
@@ -0,0 +1,98 @@
+import time
+from typing import Any, Dict, Optional
+
+
+class EmotionSmoother:
+    """Streaming EMA over the emotion distribution with a sticky dominant emotion.
+
+    alpha is the weight of the newest frame. A new dominant emotion only takes
+    over once it has led the current one by switch_margin percentage points
+    for min_dwell consecutive updates, which stops the label flickering between
+    two close emotions.
+    """
+
+    def __init__(self, alpha: float = 0.4, switch_margin: float = 10.0, min_dwell: int = 2):
+        self.alpha = alpha
+        self.switch_margin = switch_margin
+        self.min_dwell = min_dwell
+        self.reset()
+
+    def reset(self):
+        """Forget all state, e.g. when the face is lost."""
+        self.distribution: Optional[Dict[str, float]] = None
+        self.dominant: Optional[str] = None
+        self._candidate: Optional[str] = None
+        self._candidate_count = 0
+
+    def update(self, all_emotions: Dict[str, float]) -> Dict[str, float]:
+        """Fold one frame's distribution into the running average and return it."""
+        if self.distribution is None:
+            self.distribution = {k: float(v) for k, v in all_emotions.items()}
+        else:
+            a = self.alpha
+            self.distribution = {
+                k: a * float(v) + (1 - a) * self.distribution.get(k, 0.0)
+                for k, v in all_emotions.items()
+            }
+        return self.distribution
+
+    def settle(self, candidate: str) -> str:
+        """Apply hysteresis to the candidate dominant emotion."""
+        if self.dominant is None or candidate == self.dominant:
+            self.dominant = candidate
+            self._candidate = None
+            self._candidate_count = 0
+            return self.dominant
+
+        lead = self.distribution.get(candidate, 0.0) - self.distribution.get(self.dominant, 0.0)
+        if lead < self.switch_margin:
+            self._candidate = None
+            self._candidate_count = 0
+            return self.dominant
+
+        if candidate == self._candidate:
+            self._candidate_count += 1
+        else:
+            self._candidate = candidate
+            self._candidate_count = 1
+
+        if self._candidate_count >= self.min_dwell:
+            self.dominant = candidate
+            self._candidate = None
+            self._candidate_count = 0
+        return self.dominant
+
+
+class EmissionPolicy:
+    """Decides when a reading is worth persisting and showing to clients.
+
+    A reading is emitted when the dominant emotion or face detection changes,
+    when stress moves by at least stress_delta, or when heartbeat seconds have
+    passed since the last emission.
+    """
+
+    def __init__(self, stress_delta: int = 5, heartbeat: float = 30.0):
+        self.stress_delta = stress_delta
+        self.heartbeat = heartbeat
+        self.last_emitted: Optional[Dict[str, Any]] = None
+        self.last_emitted_at = 0.0
+
+    def should_emit(self, result: Dict[str, Any], now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        last = self.last_emitted
+
+        emit = (
+            last is None
+            or result["emotion"] != last["emotion"]
+            or result.get("face_detected") != last.get("face_detected")
+            or abs(result["stress_score"] - last["stress_score"]) >= self.stress_delta
+            or now - self.last_emitted_at >= self.heartbeat
+        )
+        if emit:
+            self.last_emitted = result
+            self.last_emitted_at = now
+        return emit
+
+    def reset(self):
+        self.last_emitted = None
+        self.last_emitted_at = 0.0
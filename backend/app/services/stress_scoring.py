@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.emotion_classifier import EMOTION_LABELS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCORING_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "models",
+    "scoring.json"
+)
+
+_CODES = {label: code for code, label in enumerate(EMOTION_LABELS)}
+
+# Stress (0-100) of each emotion and the neutral override readings have
+# always been scored with
+DEFAULT_MODEL = {
+    "name": "default",
+    "stress": {
+        "happy": 15,
+        "neutral": 25,
+        "surprise": 40,
+        "sad": 70,
+        "fear": 80,
+        "angry": 95,
+        "disgust": 75
+    },
+    "overrides": [
+        {"when": "neutral", "below": 80, "promote": ["sad", "angry", "fear", "disgust"], "min_share": 20}
+    ]
+}
+
+
+def _code(label: str) -> int:
+    if label not in _CODES:
+        raise ValueError(f"Unknown emotion '{label}'; expected one of {', '.join(EMOTION_LABELS)}")
+    return _CODES[label]
+
+
+def _percent(name: str, value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+        raise ValueError(f"{name} must be a number from 0 to 100, got {value!r}")
+    return float(value)
+
+
+def to_vectors(distributions: Iterable[Dict[str, float]]) -> np.ndarray:
+    """Stack all_emotions dicts into an (N, len(EMOTION_LABELS)) float array."""
+    return np.array([[d.get(label, 0.0) for label in EMOTION_LABELS] for d in distributions],
+                    dtype=np.float64).reshape(-1, len(EMOTION_LABELS))
+
+
+class OverrideRule:
+    """Replace a weak dominant emotion with a strong enough runner-up.
+
+    Applies when the dominant emotion is `when` with a share under `below`
+    percent, the next highest emotion is one of `promote`, and its share
+    exceeds `min_share` percent.
+    """
+
+    def __init__(self, when: str, below: float, promote: List[str], min_share: float):
+        self.when = when
+        self.below = _percent("Override 'below'", below)
+        self.promote = list(promote)
+        self.min_share = _percent("Override 'min_share'", min_share)
+        self._when = _code(when)
+        self._promote = np.array([_code(label) for label in promote], dtype=np.intp)
+
+    def apply(self, distributions: np.ndarray, dominant: np.ndarray) -> np.ndarray:
+        rows = np.arange(len(distributions))
+        applies = (dominant == self._when) & (distributions[:, self._when] < self.below)
+        others = distributions.copy()
+        others[:, self._when] = -np.inf
+        runner_up = others.argmax(axis=1)
+        promoted = (applies & np.isin(runner_up, self._promote)
+                    & (others[rows, runner_up] > self.min_share))
+        return np.where(promoted, runner_up, dominant)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"when": self.when, "below": self.below, "promote": self.promote, "min_share": self.min_share}
+
+
+class ScoringModel:
+    """Turns emotion distributions into a dominant emotion and a stress score.
+
+    Distributions are rows of percentages in EMOTION_LABELS order. Stress
+    is the share-weighted mean of the per-emotion stress values, computed
+    for a whole batch as one matrix-vector product; override rules run in
+    order over the batch's argmax.
+    """
+
+    def __init__(self, stress: Dict[str, float], overrides: Optional[List[OverrideRule]] = None,
+                 name: str = "custom"):
+        self.name = name
+        self.stress = {label: _percent(f"Stress for '{label}'", value) for label, value in stress.items()}
+        self.overrides = overrides or []
+        self.weights = np.zeros(len(EMOTION_LABELS), dtype=np.float64)
+        for label, value in self.stress.items():
+            self.weights[_code(label)] = value / 100
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "ScoringModel":
+        if not isinstance(config, dict):
+            raise ValueError("A scoring model must be a JSON object")
+        if not isinstance(config.get("stress"), dict):
+            raise ValueError("A scoring model needs a 'stress' map of emotion to score")
+        try:
+            overrides = [OverrideRule(**rule) for rule in config.get("overrides", [])]
+        except TypeError as e:
+            raise ValueError(f"Invalid override rule: {str(e)}")
+        return cls(config["stress"], overrides, config.get("name", "custom"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "stress": self.stress,
+            "overrides": [rule.to_dict() for rule in self.overrides]
+        }
+
+    def score(self, distributions: np.ndarray) -> np.ndarray:
+        """Unrounded stress for each row."""
+        return distributions @ self.weights
+
+    def dominant(self, distributions: np.ndarray) -> np.ndarray:
+        """Emotion code of each row after the override rules."""
+        dominant = distributions.argmax(axis=1)
+        for rule in self.overrides:
+            dominant = rule.apply(distributions, dominant)
+        return dominant
+
+    def evaluate(self, distributions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(dominant codes, stress rounded to int) for each row."""
+        return self.dominant(distributions), np.rint(self.score(distributions)).astype(np.int64)
+
+
+def load_scoring_model(path: Optional[str] = None) -> ScoringModel:
+    """The model in SCORING_MODEL_PATH, or DEFAULT_MODEL when there is none.
+
+    A file that exists but is invalid is an error rather than a silent
+    fallback, so a typo cannot quietly change every stress score.
+    """
+    path = path or os.getenv("SCORING_MODEL_PATH", DEFAULT_SCORING_PATH)
+    if not os.path.exists(path):
+        return ScoringModel.from_dict(DEFAULT_MODEL)
+    with open(path) as f:
+        model = ScoringModel.from_dict(json.load(f))
+    logger.info(f"Loaded scoring model '{model.name}' from {path}")
+    return model
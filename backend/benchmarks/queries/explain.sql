@@ -0,0 +1,44 @@
+-- The hot queries as PostgREST issues them, for one random user.
+\set ON_ERROR_STOP on
+\pset pager off
+
+SELECT setseed(0.7);
+SELECT id AS user_id FROM profiles ORDER BY random() LIMIT 1 \gset
+SELECT id AS session_id FROM sessions WHERE user_id = :'user_id' AND ended_at IS NOT NULL
+ORDER BY started_at DESC LIMIT 1 \gset
+
+\echo '== get_user_sessions, old form with the per-row profiles!inner join'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT s.id, s.user_id, s.started_at, s.ended_at, s.total_duration, s.total_readings,
+       s.avg_stress_score, s.dominant_emotion, s.avg_confidence, s.calm_readings,
+       s.happy_readings, s.stressed_readings, p.email, p.full_name, p.settings
+FROM sessions s
+JOIN profiles p ON p.id = s.user_id
+WHERE s.user_id = :'user_id' AND s.started_at >= now() - interval '7 days'
+ORDER BY s.started_at DESC;
+
+\echo '== get_user_sessions, sessions only (profile fetched once by id)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT id, user_id, started_at, ended_at, total_duration, total_readings,
+       avg_stress_score, dominant_emotion, avg_confidence, calm_readings,
+       happy_readings, stressed_readings
+FROM sessions
+WHERE user_id = :'user_id' AND started_at >= now() - interval '7 days'
+ORDER BY started_at DESC;
+
+\echo '== get_active_session'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM sessions WHERE user_id = :'user_id' AND ended_at IS NULL;
+
+\echo '== get_session_emotions'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT id, session_id, emotion, stress_score, confidence, face_detected, recorded_at
+FROM emotion_records
+WHERE session_id = :'session_id'
+ORDER BY recorded_at, id;
+
+\echo '== update_session_stats trigger aggregate'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT COUNT(*), AVG(stress_score), MODE() WITHIN GROUP (ORDER BY emotion), AVG(confidence)
+FROM emotion_records
+WHERE session_id = :'session_id';
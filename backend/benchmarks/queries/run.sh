@@ -0,0 +1,48 @@
+#!/usr/bin/env bash
+# Seeds a scratch Postgres database and records EXPLAIN ANALYZE output for the
+# hot queries before and after app/db/query_indexes.sql.
+#
+# Usage (from the backend directory, with a local server reachable by psql):
+#   benchmarks/queries/run.sh [database]
+# USERS, SESSIONS_PER_USER and READINGS_PER_SESSION size the seed data.
+set -euo pipefail
+
+HERE="$(cd "$(dirname "$0")" && pwd)"
+DB="${1:-moodvue_bench}"
+OUT="$HERE/results"
+mkdir -p "$OUT"
+
+dropdb --if-exists "$DB"
+createdb "$DB"
+
+echo "Seeding $DB..."
+psql -q -d "$DB" \
+    -v users="${USERS:-500}" \
+    -v sessions_per_user="${SESSIONS_PER_USER:-40}" \
+    -v readings_per_session="${READINGS_PER_SESSION:-200}" \
+    -f "$HERE/seed.sql"
+
+# Each set is run once to warm the cache so both sides are timed warm
+psql -q -d "$DB" -f "$HERE/explain.sql" > /dev/null
+psql -q -d "$DB" -f "$HERE/explain.sql" > "$OUT/before.txt"
+psql -q -d "$DB" -v ON_ERROR_STOP=1 -f "$HERE/../../app/db/query_indexes.sql"
+psql -q -d "$DB" -c "VACUUM ANALYZE"
+psql -q -d "$DB" -f "$HERE/explain.sql" > /dev/null
+psql -q -d "$DB" -f "$HERE/explain.sql" > "$OUT/after.txt"
+
+summary() {
+    grep -E '^== |Execution Time|Buffers: shared' "$1" | awk '
+        /^== / { if (name) print name ": " ms " ms, " buf; name = substr($0, 4); buf = ""; next }
+        /Buffers/ && buf == "" { buf = $0; sub(/^ */, "", buf) }
+        /Execution Time/ { ms = $3 }
+        END { if (name) print name ": " ms " ms, " buf }'
+}
+
+echo
+echo "Before:"
+summary "$OUT/before.txt"
+echo
+echo "After:"
+summary "$OUT/after.txt"
+echo
+echo "Full plans in $OUT"
@@ -0,0 +1,85 @@
+-- Minimal copy of the Supabase schema with the original single-column
+-- indexes, filled with synthetic data. Sizes come from psql variables:
+--   psql -v users=500 -v sessions_per_user=40 -v readings_per_session=200 -f seed.sql
+\set ON_ERROR_STOP on
+
+DROP TABLE IF EXISTS emotion_records, sessions, profiles CASCADE;
+DROP TYPE IF EXISTS emotion_type;
+
+CREATE TYPE emotion_type AS ENUM (
+    'happy', 'sad', 'neutral', 'angry', 'fear', 'disgust', 'calm', 'surprise', 'stressed'
+);
+
+CREATE TABLE profiles (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    email text NOT NULL,
+    full_name text,
+    settings jsonb DEFAULT '{}'::jsonb
+);
+
+CREATE TABLE sessions (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id uuid NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    started_at timestamptz DEFAULT CURRENT_TIMESTAMP,
+    ended_at timestamptz,
+    total_duration integer,
+    total_readings integer DEFAULT 0,
+    avg_stress_score numeric(5,2),
+    dominant_emotion emotion_type,
+    avg_confidence numeric(5,2),
+    calm_readings integer DEFAULT 0,
+    happy_readings integer DEFAULT 0,
+    stressed_readings integer DEFAULT 0,
+    created_at timestamptz DEFAULT CURRENT_TIMESTAMP,
+    updated_at timestamptz DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE emotion_records (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    session_id uuid REFERENCES sessions(id) ON DELETE CASCADE,
+    emotion emotion_type NOT NULL,
+    stress_score numeric(5,2),
+    confidence numeric(5,2) NOT NULL,
+    face_detected boolean DEFAULT true,
+    recorded_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at timestamptz NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Indexes as shipped before app/db/query_indexes.sql
+CREATE INDEX idx_sessions_user_id ON sessions(user_id);
+CREATE INDEX idx_sessions_started_at ON sessions(started_at);
+CREATE INDEX idx_emotion_records_session_id ON emotion_records(session_id);
+CREATE INDEX idx_emotion_records_recorded_at ON emotion_records(recorded_at);
+CREATE INDEX idx_emotion_records_emotion ON emotion_records(emotion);
+
+SELECT setseed(0.42);
+
+INSERT INTO profiles (email, full_name)
+SELECT 'user' || n || '@example.com', 'User ' || n
+FROM generate_series(1, :users) AS n;
+
+-- Sessions are spread over the last 90 days and interleaved across users,
+-- as they would be in production. The newest session per user is left open.
+INSERT INTO sessions (user_id, started_at, ended_at, total_duration)
+SELECT p.id,
+       now() - (s.n * interval '90 days' / :sessions_per_user) - random() * interval '1 hour',
+       CASE WHEN s.n = 1 THEN NULL
+            ELSE now() - (s.n * interval '90 days' / :sessions_per_user) + interval '20 minutes' END,
+       CASE WHEN s.n = 1 THEN NULL ELSE 1200 END
+FROM profiles p
+CROSS JOIN generate_series(1, :sessions_per_user) AS s(n)
+ORDER BY random();
+
+INSERT INTO emotion_records (session_id, emotion, stress_score, confidence, face_detected, recorded_at)
+SELECT s.id,
+       (enum_range(NULL::emotion_type))[1 + floor(random() * 8)::int],
+       round((random() * 100)::numeric, 2),
+       round((50 + random() * 50)::numeric, 2),
+       random() > 0.05,
+       s.started_at + r.n * interval '6 seconds'
+FROM sessions s
+CROSS JOIN generate_series(1, :readings_per_session) AS r(n)
+ORDER BY random();
+
+VACUUM ANALYZE;
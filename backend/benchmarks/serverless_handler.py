@@ -0,0 +1,136 @@
+"""Compare the old test_request_context handler with ServerlessAdapter.
+
+Usage (from the backend directory):
+    python benchmarks/serverless_handler.py [--iterations 5000]
+
+Uses a small stand-in Flask app so it runs without Supabase or a camera.
+Reports per-invocation latency for a JSON, a binary and a streamed
+response, and checks whether each handler returns them intact.
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, Response, jsonify  # noqa: E402
+
+from app.serverless import ServerlessAdapter  # noqa: E402
+
+PNG_BYTES = bytes(range(256)) * 16
+
+
+def build_app() -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/api/sessions")
+    def sessions():
+        return jsonify([{"session_id": str(i), "avg_stress_score": 42.5, "dominant_emotion": "happy"}
+                        for i in range(20)])
+
+    @app.route("/api/image")
+    def image():
+        response = Response(PNG_BYTES, mimetype="image/png")
+        response.headers.add("Set-Cookie", "a=1")
+        response.headers.add("Set-Cookie", "b=2")
+        return response
+
+    @app.route("/api/stream")
+    def stream():
+        return Response((f"chunk {i}\n" for i in range(50)), mimetype="text/plain")
+
+    return app
+
+
+def legacy_handler(app: Flask):
+    """The handler api/index.py used before ServerlessAdapter."""
+    def handler(event, context):
+        with app.test_request_context(
+            path=event['path'],
+            method=event['httpMethod'],
+            headers=event.get('headers', {}),
+            data=event.get('body', ''),
+            query_string=event.get('queryStringParameters', {})
+        ):
+            try:
+                response = app.full_dispatch_request()
+                return {
+                    'statusCode': response.status_code,
+                    'headers': dict(response.headers),
+                    'body': response.get_data(as_text=True)
+                }
+            except Exception as e:
+                return {
+                    'statusCode': 500,
+                    'body': str(e)
+                }
+    return handler
+
+
+def event(path: str) -> dict:
+    return {
+        "path": path,
+        "httpMethod": "GET",
+        "headers": {"Host": "example.com", "Accept": "*/*"},
+        "queryStringParameters": {"days": "7"},
+        "body": "",
+    }
+
+
+def body_bytes(result: dict) -> bytes:
+    if result.get("isBase64Encoded"):
+        return base64.b64decode(result["body"])
+    return result["body"].encode("utf-8", "surrogateescape")
+
+
+def check(name: str, handler) -> None:
+    image = handler(event("/api/image"), None)
+    stream = handler(event("/api/stream"), None)
+    cookies = image.get("multiValueHeaders", {}).get("Set-Cookie") or [image.get("headers", {}).get("Set-Cookie")]
+    print(f"  {name:<8} binary status {image['statusCode']}, intact: {body_bytes(image) == PNG_BYTES}, "
+          f"Set-Cookie values: {len([c for c in cookies if c])}, "
+          f"stream chunks: {body_bytes(stream).count(b'chunk')}")
+
+
+def bench(handler, path: str, iterations: int) -> float:
+    request = event(path)
+    handler(request, None)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        handler(request, None)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = build_app()
+    handlers = {"legacy": legacy_handler(app), "adapter": ServerlessAdapter(app)}
+
+    print("Correctness:")
+    for name, handler in handlers.items():
+        try:
+            check(name, handler)
+        except Exception as e:
+            print(f"  {name:<8} failed: {e!r}")
+
+    print(f"\nLatency per invocation ({args.iterations} iterations):")
+    for path in ("/api/sessions", "/api/image", "/api/stream"):
+        timings = {}
+        for name, handler in handlers.items():
+            try:
+                timings[name] = bench(handler, path, args.iterations)
+            except Exception:
+                timings[name] = float("nan")
+        speedup = timings["legacy"] / timings["adapter"]
+        print(f"  {path:<15} legacy {timings['legacy']:8.1f} us   adapter {timings['adapter']:8.1f} us   "
+              f"x{speedup:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+
+# Production serving mode: one analysis process owns capture and inference,
+# and N stateless HTTP workers serve the API from its shared state.
+#   gunicorn -c gunicorn.conf.py run:app
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+# Video is streamed by the analysis process's MJPEG server; only the
+# MJPEG_PORT=0 fallback streams from worker threads
+timeout = 120
+
+# Shared by the analysis process and every worker
+os.environ.setdefault("MOODVUE_IPC_AUTHKEY", secrets.token_hex(16))
+
+_analysis_process = None
+_analysis_lock = threading.Lock()
+_stopping = threading.Event()
+
+# An analysis process that dies sooner than this after starting counts as
+# crash-looping (e.g. the camera is gone) and is restarted with a growing delay
+_HEALTHY_SECONDS = 30
+_MAX_RESTART_DELAY = 60
+
+
+def _start_analysis(server):
+    global _analysis_process
+    with _analysis_lock:
+        if _stopping.is_set():
+            return None
+        env = dict(os.environ, MOODVUE_ROLE="analysis")
+        _analysis_process = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_analysis.py")],
+            env=env
+        )
+        server.log.info(f"Started analysis process {_analysis_process.pid}")
+        return _analysis_process
+
+
+def _supervise(server):
+    """Restart the analysis process whenever it exits, until gunicorn shuts down.
+
+    The arbiter may reap the child first, in which case wait() reports 0;
+    either way it is gone. Workers reconnect to the new process's control
+    socket and reattach to its shared-memory segment on their own.
+    """
+    delay = 1
+    process = _analysis_process
+    while process is not None:
+        started = time.monotonic()
+        code = process.wait()
+        if _stopping.is_set():
+            return
+        if time.monotonic() - started >= _HEALTHY_SECONDS:
+            delay = 1
+        server.log.error(f"Analysis process {process.pid} exited with {code}; restarting in {delay}s")
+        if _stopping.wait(delay):
+            return
+        delay = min(delay * 2, _MAX_RESTART_DELAY)
+        process = _start_analysis(server)
+
+
+def on_starting(server):
+    _start_analysis(server)
+    threading.Thread(target=_supervise, args=(server,), name="analysis-supervisor", daemon=True).start()
+
+
+def post_fork(server, worker):
+    # Workers import the app after forking, so they only get the proxy
+    os.environ["MOODVUE_ROLE"] = "http"
+
+
+def on_exit(server):
+    with _analysis_lock:
+        _stopping.set()
+        process = _analysis_process
+    if process and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.log.warning(f"Analysis process {process.pid} did not exit; killing it")
+            process.kill()
+            process.wait()
@@ -0,0 +1,8 @@
+from app.analysis_service import analysis_service
+
+# Analysis process for the multi-worker deployment (see gunicorn.conf.py).
+# It owns the camera and the emotion model; HTTP workers read its results
+# from shared memory and send session commands over a local socket.
+if __name__ == '__main__':
+    analysis_service.start_processing()
+    analysis_service.serve_shared_state()
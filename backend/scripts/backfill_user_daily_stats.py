@@ -0,0 +1,37 @@
+"""Rebuild user_daily_stats from raw sessions and emotion records.
+
+Usage (from the backend directory):
+    python scripts/backfill_user_daily_stats.py [--since YYYY-MM-DD]
+
+Calls backfill_user_daily_stats() from app/db/user_daily_stats.sql through
+the Supabase RPC endpoint, so SUPABASE_KEY must be the service key. Without
+--since it rebuilds every day that still has raw readings; days whose
+partitions were already retired keep their existing rows. Triggers keep the
+table current afterwards, so this only needs to run once after the
+migration or to repair drift.
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import get_supabase_client  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=date.fromisoformat, help="first UTC day to rebuild")
+    args = parser.parse_args()
+
+    result = get_supabase_client().rpc("backfill_user_daily_stats", {
+        "since_day": args.since.isoformat() if args.since else None
+    }).execute()
+
+    print(f"Rebuilt {result.data or 0} user_daily_stats rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
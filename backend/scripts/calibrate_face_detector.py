@@ -0,0 +1,80 @@
+"""Benchmark the face detectors on this host and persist the fastest good one.
+
+Usage (from the backend directory):
+    python scripts/calibrate_face_detector.py [--samples calibration/faces]
+                                              [--camera-frames 30] [--min-detection-rate 0.9]
+                                              [--detectors opencv,ssd] [--dry-run]
+
+Runs every detector the configured EMOTION_BACKEND supports (opencv and ssd
+for the lean runtimes, plus mtcnn and retinaface for deepface) over the
+sample images, or over frames from the camera when there are none, and
+picks the fastest one that finds a face in at least --min-detection-rate
+of them. The choice is written to FACE_DETECTOR_CALIBRATION (default
+models/face_detector.json) and used by FACE_DETECTOR=auto. The app does
+not calibrate by itself, so run this once per host and again after
+changing hardware or the sample set.
+"""
+import argparse
+import os
+import sys
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.detector_calibration import (  # noqa: E402
+    DEFAULT_CALIBRATION_PATH, DEFAULT_SAMPLE_DIR, calibrate, capture_frames, load_samples, save_calibration
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=os.getenv("FACE_CALIBRATION_DIR", DEFAULT_SAMPLE_DIR))
+    parser.add_argument("--camera-frames", type=int, default=30, help="frames to capture when there are no samples")
+    parser.add_argument("--min-detection-rate", type=float, default=float(os.getenv("FACE_MIN_DETECTION_RATE", 0.9)))
+    parser.add_argument("--detectors", help="comma-separated subset to benchmark")
+    parser.add_argument("--output", default=os.getenv("FACE_DETECTOR_CALIBRATION", DEFAULT_CALIBRATION_PATH))
+    parser.add_argument("--dry-run", action="store_true", help="print the results without saving them")
+    args = parser.parse_args()
+
+    frames = load_samples(args.samples, limit=1000)
+    source = f"{len(frames)} images from {args.samples}"
+    if not frames:
+        camera = cv2.VideoCapture(int(os.getenv("CAMERA_INDEX", 0)))
+        if not camera.isOpened():
+            print(f"No images in {args.samples} and the camera cannot be opened.", file=sys.stderr)
+            return 1
+        try:
+            frames = capture_frames(camera, args.camera_frames)
+        finally:
+            camera.release()
+        source = f"{len(frames)} camera frames"
+
+    emotion_backend = os.getenv("EMOTION_BACKEND", "deepface")
+    result = calibrate(
+        frames,
+        emotion_backend,
+        args.min_detection_rate,
+        args.detectors.split(",") if args.detectors else None
+    )
+
+    print(f"Calibrated {emotion_backend} face detectors on {source}:")
+    print(f"  {'detector':<12}{'detected':>10}{'median ms':>12}{'p90 ms':>10}")
+    for row in result["results"]:
+        if not row["available"]:
+            print(f"  {row['detector']:<12}unavailable: {row['error']}")
+            continue
+        print(f"  {row['detector']:<12}{row['detection_rate']:>10.0%}{row['median_ms']:>12.1f}{row['p90_ms']:>10.1f}")
+
+    if result["chosen"] is None:
+        print("No detector found a face; make sure the samples or the camera show one.", file=sys.stderr)
+        return 1
+    print(f"Chosen: {result['chosen']}")
+    if not args.dry_run:
+        save_calibration(result, args.output)
+        print(f"Saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
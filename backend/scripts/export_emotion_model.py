@@ -0,0 +1,141 @@
+"""Export DeepFace's emotion model to ONNX and check parity.
+
+Usage (from the backend directory):
+    python scripts/export_emotion_model.py [--output models/emotion.onnx] [--int8]
+                                           [--images path/to/faces] [--max-diff 0.02]
+                                           [--int8-max-diff 0.1] [--min-agreement 0.9]
+
+Needs the full DeepFace/TensorFlow stack plus tf2onnx; the exported file is
+then served by EMOTION_BACKEND=onnxruntime or EMOTION_BACKEND=opencv without
+either of them. The parity check compares the exported model against the
+Keras original on identical inputs, and, when --images is given, compares
+OnnxEmotionClassifier.analyze against DeepFace.analyze end to end. The script
+exits non-zero when parity fails; tests/test_emotion_parity.py runs the same
+checks on fixed inputs under pytest.
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.emotion_classifier import DEFAULT_MODEL_PATH, OnnxEmotionClassifier  # noqa: E402
+
+# Largest per-score difference from the Keras model, for float and int8 exports
+DEFAULT_MAX_DIFF = 0.02
+DEFAULT_INT8_MAX_DIFF = 0.1
+# Share of images whose dominant emotion must match DeepFace.analyze end to end
+DEFAULT_MIN_AGREEMENT = 0.9
+
+
+def export(output_path: str) -> None:
+    import tensorflow as tf
+    import tf2onnx
+    from deepface import DeepFace
+
+    keras_model = DeepFace.build_model("Emotion", task="facial_attribute").model
+    spec = (tf.TensorSpec((None, 48, 48, 1), tf.float32, name="input"),)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tf2onnx.convert.from_keras(keras_model, input_signature=spec, opset=13, output_path=output_path)
+    print(f"Exported emotion model to {output_path}")
+
+
+def quantize(model_path: str) -> str:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    root, ext = os.path.splitext(model_path)
+    int8_path = f"{root}.int8{ext}"
+    quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"Wrote int8 model to {int8_path}")
+    return int8_path
+
+
+def check_model_parity(model_path: str, max_diff: float, samples: int = 256) -> bool:
+    """Compare ONNX and Keras outputs on random 48x48 inputs."""
+    from deepface import DeepFace
+
+    keras_model = DeepFace.build_model("Emotion", task="facial_attribute").model
+    batch = np.random.default_rng(0).random((samples, 48, 48, 1), dtype=np.float32)
+    expected = keras_model.predict(batch, verbose=0)
+
+    ok = True
+    for runtime in ("onnxruntime", "opencv"):
+        try:
+            classifier = OnnxEmotionClassifier(model_path, runtime=runtime, detector_backend="opencv")
+        except ImportError as e:
+            print(f"[{runtime}] skipped: {e}")
+            continue
+        actual = classifier.predict(batch)
+        diff = float(np.max(np.abs(actual - expected)))
+        agreement = float(np.mean(actual.argmax(axis=1) == expected.argmax(axis=1)))
+        passed = diff <= max_diff
+        ok = ok and passed
+        print(f"[{runtime}] max |diff| = {diff:.5f}, argmax agreement = {agreement:.1%} "
+              f"-> {'OK' if passed else 'FAIL'}")
+    return ok
+
+
+def check_analyze_parity(model_path: str, images_dir: str, min_agreement: float) -> bool:
+    """Compare end-to-end analyze() results against DeepFace.analyze on real images."""
+    from deepface import DeepFace
+
+    candidate = OnnxEmotionClassifier(model_path, detector_backend="ssd")
+
+    diffs = []
+    agree = 0
+    for name in sorted(os.listdir(images_dir)):
+        frame = cv2.imread(os.path.join(images_dir, name))
+        if frame is None:
+            continue
+        expected = DeepFace.analyze(
+            frame, actions=['emotion'], enforce_detection=False, silent=True, detector_backend="ssd"
+        )[0]
+        actual = candidate.analyze(frame)[0]
+        diffs.append(max(abs(actual["emotion"][k] - expected["emotion"][k]) for k in expected["emotion"]) / 100)
+        agree += actual["dominant_emotion"] == expected["dominant_emotion"]
+
+    if not diffs:
+        print(f"No readable images in {images_dir}")
+        return False
+
+    # Face crops come from different detector implementations, so only
+    # the dominant emotion is checked here.
+    agreement = agree / len(diffs)
+    print(f"[analyze] {len(diffs)} images, mean max |diff| = {np.mean(diffs):.4f}, "
+          f"dominant agreement = {agreement:.1%}")
+    return agreement >= min_agreement
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--int8", action="store_true", help="also write a dynamically quantised copy")
+    parser.add_argument("--images", help="directory of face images for the end-to-end check")
+    parser.add_argument("--max-diff", type=float, default=DEFAULT_MAX_DIFF,
+                        help="largest allowed score difference from the Keras model")
+    parser.add_argument("--int8-max-diff", type=float, default=DEFAULT_INT8_MAX_DIFF,
+                        help="the same bar for the int8 model")
+    parser.add_argument("--min-agreement", type=float, default=DEFAULT_MIN_AGREEMENT,
+                        help="share of --images whose dominant emotion must match DeepFace")
+    parser.add_argument("--skip-export", action="store_true", help="only run the parity checks")
+    args = parser.parse_args()
+
+    if not args.skip_export:
+        export(args.output)
+
+    ok = check_model_parity(args.output, args.max_diff)
+    if args.int8:
+        int8_path = quantize(args.output)
+        # int8 weights trade a little precision for size and speed
+        ok = check_model_parity(int8_path, args.int8_max_diff) and ok
+    if args.images:
+        ok = check_analyze_parity(args.output, args.images, args.min_agreement) and ok
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Export emotion_records to compressed Arrow IPC files for analytics.
+
+Usage (from the backend directory):
+    python scripts/export_emotion_records.py [--user USER_ID] [--archive-dir archive]
+                                             [--compression zstd|lz4|none] [--settle-seconds 300]
+
+Each run only fetches rows inserted after the per-user watermark stored in
+<archive-dir>/_watermarks.json, so it is safe to run from cron. That
+includes readings the spool delivered late with an old recorded_at; rows
+from the last --settle-seconds wait for the next run. The files
+are read back by GET /api/sessions/user/<user_id>/history.
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import get_supabase_client  # noqa: E402
+from app.services.record_archive import DEFAULT_ARCHIVE_DIR, RecordArchiveExporter  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", help="export a single user instead of everyone")
+    parser.add_argument("--archive-dir", default=os.getenv("ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR))
+    parser.add_argument("--compression", default="zstd", choices=["zstd", "lz4", "none"])
+    parser.add_argument("--rows-per-file", type=int, default=50000)
+    parser.add_argument("--settle-seconds", type=float, default=300)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    exporter = RecordArchiveExporter(
+        get_supabase_client(),
+        archive_dir=args.archive_dir,
+        rows_per_file=args.rows_per_file,
+        settle_seconds=args.settle_seconds,
+        # Uncompressed files are read zero-copy through the memory map
+        compression=None if args.compression == "none" else args.compression
+    )
+
+    if args.user:
+        exported = {args.user: exporter.export_user(args.user)}
+    else:
+        exported = exporter.export_all()
+
+    print(f"Exported {sum(exported.values())} records for {len(exported)} users to {args.archive_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
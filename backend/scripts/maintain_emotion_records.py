@@ -0,0 +1,46 @@
+"""Create upcoming emotion_records partitions and retire old ones.
+
+Usage (from the backend directory):
+    python scripts/maintain_emotion_records.py [--retain-months 12] [--months-ahead 3]
+                                               [--no-rollup]
+
+Calls maintain_emotion_records() from app/db/partition_emotion_records.sql
+through the Supabase RPC endpoint, so SUPABASE_KEY must be the service key.
+Months older than --retain-months are rolled up into hourly rows in
+emotion_record_rollups (skipped with --no-rollup) and their partitions are
+dropped. Run it from cron at least monthly; the default partition catches
+readings if it falls behind.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import get_supabase_client  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retain-months", type=int, default=int(os.getenv("EMOTION_RECORDS_RETAIN_MONTHS", "12")))
+    parser.add_argument("--months-ahead", type=int, default=3)
+    parser.add_argument("--no-rollup", action="store_true", help="drop old partitions without rolling them up")
+    args = parser.parse_args()
+
+    if args.retain_months < 1:
+        parser.error("--retain-months must be at least 1")
+
+    result = get_supabase_client().rpc("maintain_emotion_records", {
+        "retain_months": args.retain_months,
+        "months_ahead": args.months_ahead,
+        "rollup": not args.no_rollup
+    }).execute()
+
+    for row in result.data or []:
+        detail = f" ({row['rollup_rows']} rollup rows)" if row.get("rollup_rows") is not None else ""
+        print(f"{row['action']:>10} {row['partition_name']}{detail}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Run several analysis nodes on this machine sharing one node registry.
+
+Usage (from the backend directory):
+    python scripts/run_local_cluster.py [--nodes 3] [--base-port 5101]
+                                        [--registry spool/registry.db]
+
+Starts one run.py per node on consecutive ports with its own spool,
+MOODVUE_NODE_ID and MJPEG server port (the node's port + 100). Sessions
+started on any node are placed on the least loaded one and requests for
+them are routed to their owner; kill a node (its pid is printed) to watch
+its sessions move to the others within NODE_TTL_SECONDS. GET /api/nodes on
+any node shows the registry. Ctrl+C stops every node.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=5101)
+    parser.add_argument("--registry", default=os.path.join(BACKEND_DIR, "spool", "registry.db"))
+    args = parser.parse_args()
+
+    processes = []
+    for index in range(args.nodes):
+        port = args.base_port + index
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            MOODVUE_NODE_ID=f"node-{index + 1}",
+            MOODVUE_NODE_URL=f"http://127.0.0.1:{port}",
+            MOODVUE_REGISTRY_PATH=args.registry,
+            MJPEG_PORT=str(port + 100),
+            SPOOL_PATH=os.path.join(BACKEND_DIR, "spool", f"readings-node-{index + 1}.db"),
+        )
+        process = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, "run.py")], cwd=BACKEND_DIR, env=env)
+        processes.append(process)
+        print(f"node-{index + 1}: http://127.0.0.1:{port} (pid {process.pid})")
+
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+        print("A node exited; its sessions are reassigned once its heartbeat lapses.")
+        while any(process.poll() is None for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
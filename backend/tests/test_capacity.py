@@ -0,0 +1,78 @@
+import pytest
+
+from app.services.capacity import DEGRADE_LEVELS, CapacityModel
+
+
+def test_one_recording_session_per_camera():
+    capacity = CapacityModel(cores=1)
+    assert capacity.admit("user-a")["admission"] == "admitted"
+    assert capacity.admit("user-b") == {"admission": "queued", "position": 1, "retry_after": 5}
+    assert not capacity.status()["accepting"]
+
+    capacity.release("user-a")
+    assert capacity.admit("user-b")["admission"] == "admitted"
+
+
+def test_admission_costs_the_pipeline_only_when_it_is_not_running():
+    capacity = CapacityModel(cores=1, admit_threshold=0.85, initial_pipeline_cost=0.5)
+    capacity.utilisation = 0.5
+    assert capacity.admit("user-a")["admission"] == "queued"
+
+    # Viewers already keep capture running, so a session adds no inference
+    capacity.set_pipeline_running(True)
+    assert capacity.admission_cost() == 0.0
+    assert capacity.admit("user-a")["admission"] == "admitted"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def overload(capacity: CapacityModel, clock: FakeClock, seconds: int):
+    """Report a fully busy core once a second for seconds."""
+    for _ in range(seconds):
+        clock.now += 1
+        capacity.record_work(1.0)
+
+
+def test_load_spike_decays_with_time_not_with_calls():
+    clock = FakeClock()
+    capacity = CapacityModel(cores=1, cooldown=10, clock=clock)
+    overload(capacity, clock, 60)
+    assert capacity.level == len(DEGRADE_LEVELS) - 1
+    assert not capacity.status()["accepting"]
+
+    # Nothing reports work or polls for two minutes; one look is enough
+    clock.now += 120
+    status = capacity.status()
+    assert status["utilisation"] < 0.01
+    assert status["level"] == 0
+    assert status["accepting"]
+
+
+def test_ewma_does_not_depend_on_how_often_it_is_ticked():
+    results = []
+    for step in (1, 5):
+        clock = FakeClock()
+        capacity = CapacityModel(cores=1, clock=clock)
+        for _ in range(30 // step):
+            clock.now += step
+            capacity.record_work(0.4 * step)
+        results.append(capacity.utilisation)
+    assert results[0] == pytest.approx(results[1], rel=0.01)
+
+
+def test_stopping_the_pipeline_resets_degradation():
+    clock = FakeClock()
+    capacity = CapacityModel(cores=1, cooldown=10, clock=clock)
+    capacity.set_pipeline_running(True)
+    overload(capacity, clock, 30)
+    assert capacity.level > 0
+
+    capacity.set_pipeline_running(False)
+    assert capacity.level == 0
+    assert capacity.settings == DEGRADE_LEVELS[0]
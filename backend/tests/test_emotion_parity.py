@@ -0,0 +1,73 @@
+"""Parity of the exported ONNX emotion model with the DeepFace backend.
+
+Both backends run on the same fixed inputs. Skipped unless deepface,
+onnxruntime and the model written by scripts/export_emotion_model.py are
+available.
+"""
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("deepface")
+pytest.importorskip("onnxruntime")
+
+from app.services.detector_calibration import DEFAULT_SAMPLE_DIR, load_samples  # noqa: E402
+from app.services.emotion_classifier import (  # noqa: E402
+    DEFAULT_MODEL_PATH, DeepFaceClassifier, OnnxEmotionClassifier, preprocess_faces
+)
+
+MODEL_PATH = os.getenv("EMOTION_MODEL_PATH", DEFAULT_MODEL_PATH)
+
+# The defaults of scripts/export_emotion_model.py
+MAX_DIFF = 0.02
+MIN_AGREEMENT = 0.9
+
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason=f"no exported model at {MODEL_PATH}")
+
+
+def fixed_crops(count: int = 32):
+    """Seeded BGR crops of varying sizes, so letterboxing is exercised too."""
+    rng = np.random.default_rng(0)
+    crops = []
+    for i in range(count):
+        height, width = 48 + 8 * (i % 7), 48 + 12 * (i % 5)
+        crop = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        crops.append(cv2.GaussianBlur(crop, (5, 5), 0))
+    return crops
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return DeepFaceClassifier(detector_backend="opencv")
+
+
+@pytest.mark.parametrize("runtime", ["onnxruntime", "opencv"])
+def test_predict_matches_deepface(reference, runtime):
+    batch = preprocess_faces(fixed_crops())
+    expected = reference.predict(batch)
+    actual = OnnxEmotionClassifier(MODEL_PATH, runtime=runtime, detector_backend="opencv").predict(batch)
+
+    assert actual.shape == expected.shape
+    assert np.max(np.abs(actual - expected)) <= MAX_DIFF
+    assert np.mean(actual.argmax(axis=1) == expected.argmax(axis=1)) >= MIN_AGREEMENT
+
+
+def test_analyze_matches_deepface():
+    from deepface import DeepFace
+
+    frames = load_samples(os.getenv("FACE_CALIBRATION_DIR", DEFAULT_SAMPLE_DIR))
+    if not frames:
+        pytest.skip("no sample face images")
+
+    candidate = OnnxEmotionClassifier(MODEL_PATH, detector_backend="ssd")
+    agree = 0
+    for frame in frames:
+        expected = DeepFace.analyze(
+            frame, actions=['emotion'], enforce_detection=False, silent=True, detector_backend="ssd"
+        )[0]
+        actual = candidate.analyze(frame)[0]
+        assert set(actual["emotion"]) == set(expected["emotion"])
+        agree += actual["dominant_emotion"] == expected["dominant_emotion"]
+    assert agree / len(frames) >= MIN_AGREEMENT
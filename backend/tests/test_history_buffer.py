@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from app.services.history_buffer import HistoryBuffer
+
+
+def test_rolling_mean_stress_skips_error_readings():
+    history = HistoryBuffer(8)
+    for stress in (10, 20, -1, 30):
+        history.append({"emotion": "sad" if stress >= 0 else "error", "stress_score": stress})
+    np.testing.assert_allclose(history.rolling_mean_stress(2), [10, 15, 20, 30])
+
+
+@pytest.mark.parametrize("window", [0, -3])
+def test_rolling_mean_stress_rejects_empty_window(window):
+    history = HistoryBuffer(8)
+    history.append({"emotion": "sad", "stress_score": 10})
+    with pytest.raises(ValueError):
+        history.rolling_mean_stress(window)
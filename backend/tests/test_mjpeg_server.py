@@ -0,0 +1,30 @@
+import socket
+import threading
+
+from app.services.mjpeg_server import MJPEGServer
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_stats_are_read_on_the_event_loop():
+    server = MJPEGServer(lambda: (0, None), acquire=lambda holder: None, release=lambda holder: None,
+                         host="127.0.0.1", port=free_port())
+    assert server.start()
+    try:
+        seen = []
+        original = server._snapshot
+        server._snapshot = lambda: seen.append(threading.current_thread().name) or original()
+        assert server.stats()["viewers"] == 0
+        assert seen == ["mjpeg-server"]
+    finally:
+        server.stop()
+
+
+def test_stats_of_a_stopped_server_are_read_directly():
+    server = MJPEGServer(lambda: (0, None), acquire=lambda holder: None, release=lambda holder: None)
+    assert server.stats() == {"running": False, "port": 5002, "viewers": 0, "max_viewers": 200,
+                              "viewers_per_session": {}, "frames_sent": 0, "dropped": {}}
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from app.services.profiler import SamplingProfiler, SharedProfiler
+from app.services.shared_state import ControlClient, ControlServer
+
+
+@pytest.fixture
+def control_address(tmp_path, monkeypatch):
+    """A control channel served by a stand-in analysis process's profiler."""
+    monkeypatch.setenv("MOODVUE_IPC_AUTHKEY", "test")
+    analysis = SamplingProfiler()
+    address = str(tmp_path / "control.sock")
+    server = ControlServer({"store_profile": analysis.store, "get_profile": analysis.get}, address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return address
+
+
+def worker(address: str) -> SharedProfiler:
+    # Each gunicorn worker has its own profiler and control connection
+    return SharedProfiler(ControlClient(address), SamplingProfiler())
+
+
+def wait_until_done(profiles: SharedProfiler, profile_id: str) -> dict:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        profile = profiles.get(profile_id)
+        if profile["status"] != "running":
+            return profile
+        time.sleep(0.01)
+    raise AssertionError(f"Profile {profile_id} did not finish")
+
+
+def test_request_profile_started_on_one_worker_is_served_by_another(control_address):
+    first, second = worker(control_address), worker(control_address)
+
+    started = first.start("requests", 0.05, 0.01)
+    assert second.get(started["id"])["status"] == "running"
+
+    profile = wait_until_done(second, started["id"])
+    assert profile["status"] == "done"
+    assert profile["samples"] > 0
+    assert "folded" in profile
+    assert second.local.get(started["id"]) is None
+
+
+def test_unknown_profile_is_none(control_address):
+    assert worker(control_address).get("requests-1-1") is None
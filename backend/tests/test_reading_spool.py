@@ -0,0 +1,61 @@
+from uuid import uuid4
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services.reading_spool import ReadingSpool, SpoolShipper
+
+
+class FakeSessionService:
+    """Rejects the whole batch, as PostgREST does, if any row breaks the CHECK."""
+
+    def __init__(self, transient_failures: int = 0):
+        self.stored = {}
+        self.transient_failures = transient_failures
+
+    async def record_emotions_bulk(self, records):
+        if self.transient_failures:
+            self.transient_failures -= 1
+            raise ConnectionError("Supabase unreachable")
+        if any(record["stress_score"] > 100 for record in records):
+            raise APIError({"message": "violates check constraint", "code": "23514", "hint": None, "details": None})
+        self.stored.update((record["id"], record) for record in records)
+        return records
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = ReadingSpool(str(tmp_path / "readings.db"), batch_size=1)
+    yield spool
+    spool.close()
+
+
+def reading(stress_score):
+    return {"emotion": "sad", "confidence": 0.5, "stress_score": stress_score}
+
+
+def test_poison_readings_are_dead_lettered_and_the_rest_shipped(spool):
+    session_id = uuid4()
+    ids = [spool.append(session_id, None, reading(500 if i in (3, 7) else 40)) for i in range(10)]
+    service = FakeSessionService()
+    shipper = SpoolShipper(spool, service, batch_size=10)
+
+    assert shipper.ship_once() == 10
+    assert set(service.stored) == set(ids) - {ids[3], ids[7]}
+    stats = spool.stats()
+    assert stats["pending"] == 0
+    assert stats["dead_letters"] == 2
+    assert shipper.ship_once() == 0
+
+
+def test_transient_failures_keep_the_batch(spool):
+    record_id = spool.append(uuid4(), None, reading(40))
+    service = FakeSessionService(transient_failures=1)
+    shipper = SpoolShipper(spool, service)
+
+    with pytest.raises(ConnectionError):
+        shipper.ship_once()
+    assert spool.stats()["pending"] == 1
+    assert shipper.ship_once() == 1
+    assert list(service.stored) == [record_id]
+    assert spool.stats()["dead_letters"] == 0
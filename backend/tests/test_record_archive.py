@@ -0,0 +1,126 @@
+import re
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.services.record_archive import RecordArchive, RecordArchiveExporter
+
+NOW = datetime.now(timezone.utc)
+
+
+def at(minutes_ago: float) -> str:
+    return (NOW - timedelta(minutes=minutes_ago)).isoformat()
+
+
+def _time(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+class FakeQuery:
+    """The subset of the PostgREST builder the exporter uses, over a list of rows."""
+
+    KEYSET = re.compile(r'inserted_at\.gt\."([^"]+)",and\(inserted_at\.eq\."([^"]+)",id\.gt\.([^)]+)\)')
+
+    def __init__(self, rows, sessions):
+        self.rows = rows
+        self.sessions = sessions
+        self.filters = []
+        self.count = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        assert column == "sessions.user_id"
+        self.filters.append(lambda row: self.sessions[row["session_id"]] == value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: _time(row[column]) <= _time(value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: _time(row[column]) >= _time(value))
+        return self
+
+    def or_(self, expression):
+        after, same, record_id = self.KEYSET.fullmatch(expression).groups()
+        self.filters.append(lambda row: _time(row["inserted_at"]) > _time(after)
+                            or (_time(row["inserted_at"]) == _time(same) and row["id"] > record_id))
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        rows = sorted((row for row in self.rows if all(f(row) for f in self.filters)),
+                      key=lambda row: (_time(row["inserted_at"]), row["id"]))
+        return SimpleNamespace(data=rows[:self.count])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.rows = []
+        self.sessions = {}
+
+    def table(self, name):
+        assert name == "emotion_records"
+        return FakeQuery(self.rows, self.sessions)
+
+    def insert(self, session_id, recorded_at, inserted_at):
+        self.rows.append({
+            "id": str(uuid4()), "session_id": session_id, "emotion": "sad", "stress_score": 70,
+            "confidence": 80, "face_detected": True, "recorded_at": recorded_at, "inserted_at": inserted_at
+        })
+
+
+@pytest.fixture
+def supabase():
+    return FakeSupabase()
+
+
+def test_late_readings_of_an_ended_session_are_still_exported(supabase, tmp_path):
+    user_id, session_id = str(uuid4()), str(uuid4())
+    supabase.sessions[session_id] = user_id
+    for minute in range(10):
+        supabase.insert(session_id, at(120 - minute), at(120 - minute))
+    exporter = RecordArchiveExporter(supabase, str(tmp_path), page_size=3)
+    assert exporter.export_user(user_id) == 10
+
+    # The spool ships readings captured before the outage long after it
+    for minute in range(5):
+        supabase.insert(session_id, at(100 - minute), at(30))
+    assert exporter.export_user(user_id) == 5
+    assert exporter.export_user(user_id) == 0
+
+    table = RecordArchive(str(tmp_path)).read_user(user_id)
+    assert sorted(table["id"].to_pylist()) == sorted(row["id"] for row in supabase.rows)
+
+
+def test_rows_inside_the_settle_window_wait_for_the_next_run(supabase, tmp_path):
+    user_id, session_id = str(uuid4()), str(uuid4())
+    supabase.sessions[session_id] = user_id
+    supabase.insert(session_id, at(20), at(20))
+    supabase.insert(session_id, at(1), at(1))
+
+    assert RecordArchiveExporter(supabase, str(tmp_path), settle_seconds=300).export_user(user_id) == 1
+    assert RecordArchiveExporter(supabase, str(tmp_path), settle_seconds=0).export_user(user_id) == 1
+
+
+def test_watermarks_from_before_inserted_at_are_read_as_inserted_at(supabase, tmp_path):
+    user_id, session_id = str(uuid4()), str(uuid4())
+    supabase.sessions[session_id] = user_id
+    supabase.insert(session_id, at(60), at(60))
+    supabase.insert(session_id, at(50), at(50))
+    first = min(supabase.rows, key=lambda row: row["inserted_at"])
+    (tmp_path / "_watermarks.json").write_text(
+        f'{{"{user_id}": {{"recorded_at": "{first["recorded_at"]}", "id": "{first["id"]}"}}}}'
+    )
+
+    assert RecordArchiveExporter(supabase, str(tmp_path)).export_user(user_id) == 1
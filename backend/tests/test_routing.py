@@ -0,0 +1,77 @@
+import gzip
+import json
+import sys
+import types
+
+import httpx
+import pytest
+from flask import Flask
+
+PAYLOAD = json.dumps([{"session_id": str(i), "dominant_emotion": "happy", "avg_stress_score": 42.5}
+                      for i in range(50)]).encode()
+NODE = {"node_id": "node-b", "url": "http://node-b:5000"}
+
+
+class Chunks(httpx.SyncByteStream):
+    """A body that arrives in pieces, as one from a real node does."""
+
+    def __init__(self, body: bytes, size: int = 256):
+        self.body = body
+        self.size = size
+
+    def __iter__(self):
+        for start in range(0, len(self.body), self.size):
+            yield self.body[start:start + self.size]
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    # app.routing only needs the cluster's node id from the analysis service
+    fake = types.ModuleType("app.analysis_service")
+    fake.analysis_service = types.SimpleNamespace(cluster=types.SimpleNamespace(node_id="node-a"))
+    monkeypatch.setitem(sys.modules, "app.analysis_service", fake)
+    monkeypatch.delitem(sys.modules, "app.routing", raising=False)
+    import app.routing as routing
+    yield routing
+    sys.modules.pop("app.routing", None)
+
+
+@pytest.fixture
+def upstream_requests(routing, monkeypatch):
+    seen = []
+
+    def handler(upstream_request):
+        seen.append(upstream_request)
+        if "gzip" in upstream_request.headers.get("Accept-Encoding", ""):
+            return httpx.Response(200, stream=Chunks(gzip.compress(PAYLOAD)),
+                                  headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        return httpx.Response(200, stream=Chunks(PAYLOAD), headers={"Content-Type": "application/json"})
+
+    monkeypatch.setattr(routing, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    return seen
+
+
+@pytest.fixture
+def client(routing):
+    app = Flask(__name__)
+    app.add_url_rule("/api/sessions", "sessions", lambda: routing._route_to(NODE))
+    return app.test_client()
+
+
+def test_compressed_response_is_relayed_with_its_encoding(client, upstream_requests):
+    response = client.get("/api/sessions", headers={"Accept-Encoding": "gzip"})
+
+    assert len(PAYLOAD) >= 1024
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["X-MoodVue-Node"] == "node-b"
+    assert gzip.decompress(response.data) == PAYLOAD
+    assert upstream_requests[0].headers["X-MoodVue-Forwarded-By"] == "node-a"
+
+
+def test_client_without_accept_encoding_gets_an_identity_body(client, upstream_requests):
+    response = client.get("/api/sessions")
+
+    assert upstream_requests[0].headers["Accept-Encoding"] == "identity"
+    assert "Content-Encoding" not in response.headers
+    assert response.data == PAYLOAD
@@ -0,0 +1,47 @@
+import time
+from uuid import uuid4
+
+import pytest
+
+from app.services import shared_state
+from app.services.shared_state import SharedStateReader, SharedStateWriter
+
+
+@pytest.fixture
+def name():
+    return f"moodvue_test_{uuid4().hex[:8]}"
+
+
+def test_reader_follows_a_restarted_writer(name, monkeypatch):
+    monkeypatch.setattr(shared_state, "STALE_SECONDS", 0.05)
+    writer = SharedStateWriter(name)
+    writer.publish({"emotion": "happy"}, b"first")
+    reader = SharedStateReader(name)
+    assert reader.read()[1:] == ({"emotion": "happy"}, b"first")
+
+    # The analysis process crashed and its replacement made a new segment
+    writer.close()
+    restarted = SharedStateWriter(name)
+    try:
+        restarted.publish({"emotion": "sad"}, b"second")
+        time.sleep(0.1)
+        assert reader.read()[1:] == ({"emotion": "sad"}, b"second")
+    finally:
+        restarted.close()
+
+
+def test_reader_keeps_its_segment_while_the_writer_publishes(name, monkeypatch):
+    monkeypatch.setattr(shared_state, "STALE_SECONDS", 0.05)
+    writer = SharedStateWriter(name)
+    try:
+        reader = SharedStateReader(name)
+        for i in range(5):
+            writer.publish({"frame": i}, b"")
+            assert reader.read()[1] == {"frame": i}
+            time.sleep(0.03)
+        segment = reader._shm
+        writer.publish({"frame": 5}, b"")
+        reader.read()
+        assert reader._shm is segment
+    finally:
+        writer.close()
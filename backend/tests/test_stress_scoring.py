@@ -0,0 +1,125 @@
+import copy
+
+import numpy as np
+import pytest
+
+from app.services.emotion_classifier import EMOTION_LABELS
+from app.services.stress_scoring import DEFAULT_MODEL, OverrideRule, ScoringModel, to_vectors
+
+# The per-frame scoring the default model replaced, kept as the reference
+LEGACY_STRESS_MAP = {"happy": 15, "neutral": 25, "surprise": 40, "sad": 70, "fear": 80, "angry": 95, "disgust": 75}
+
+
+def legacy_score(all_emotions):
+    dominant_emotion = max(all_emotions, key=all_emotions.get)
+    if dominant_emotion == 'neutral' and all_emotions['neutral'] < 80:
+        secondary_emotions = {k: v for k, v in all_emotions.items() if k != 'neutral'}
+        next_highest_emotion = max(secondary_emotions, key=secondary_emotions.get)
+        if next_highest_emotion in ['sad', 'angry', 'fear', 'disgust'] and secondary_emotions[next_highest_emotion] > 20:
+            dominant_emotion = next_highest_emotion
+    weighted_stress_score = 0
+    for emotion, percentage in all_emotions.items():
+        weighted_stress_score += (percentage / 100) * LEGACY_STRESS_MAP.get(emotion, 0)
+    return dominant_emotion, int(round(weighted_stress_score))
+
+
+def distribution(**shares):
+    """All seven emotions in DeepFace's order, the rest of 100% spread evenly."""
+    rest = (100 - sum(shares.values())) / (len(EMOTION_LABELS) - len(shares))
+    return {label: float(shares.get(label, rest)) for label in EMOTION_LABELS}
+
+
+FIXED = [
+    distribution(happy=90),
+    distribution(angry=70, disgust=20),
+    # Neutral override edges: neutral must be under 80 and the runner-up over 20
+    distribution(neutral=79.99, sad=20.01),
+    distribution(neutral=80, sad=20),
+    distribution(neutral=79, sad=20, angry=1),
+    distribution(neutral=79, sad=20.5, angry=0.5),
+    distribution(neutral=60, happy=30, sad=10),
+    distribution(neutral=60, surprise=25, fear=15),
+    distribution(neutral=50, angry=25, fear=25),
+    distribution(neutral=40, disgust=35, surprise=25),
+    distribution(neutral=35, fear=34, happy=31),
+    distribution(neutral=100),
+    distribution(),
+]
+
+
+def model_with(**changes):
+    config = copy.deepcopy(DEFAULT_MODEL)
+    config.update(changes)
+    return config
+
+
+def test_default_model_loads():
+    assert ScoringModel.from_dict(DEFAULT_MODEL).to_dict()["stress"]["angry"] == 95
+
+
+def assert_matches_legacy(distributions):
+    dominant, stress = ScoringModel.from_dict(DEFAULT_MODEL).evaluate(to_vectors(distributions))
+    expected = [legacy_score(d) for d in distributions]
+    assert [EMOTION_LABELS[code] for code in dominant] == [emotion for emotion, _ in expected]
+    assert stress.tolist() == [score for _, score in expected]
+
+
+def test_default_model_matches_the_per_frame_scoring_it_replaced():
+    assert_matches_legacy(FIXED)
+    assert [legacy_score(d)[0] for d in FIXED[2:6]] == ["sad", "neutral", "neutral", "sad"]
+
+
+def test_default_model_matches_legacy_on_neutral_heavy_batches():
+    rng = np.random.default_rng(0)
+    shares = rng.dirichlet(np.ones(len(EMOTION_LABELS)), size=2000) * 100
+    # Push half the rows towards a weak neutral so the override is exercised
+    shares[::2, EMOTION_LABELS.index("neutral")] += 60
+    shares = shares / shares.sum(axis=1, keepdims=True) * 100
+    assert_matches_legacy([dict(zip(EMOTION_LABELS, row.tolist())) for row in shares])
+
+
+def test_score_is_the_share_weighted_mean_of_stress_values():
+    model = ScoringModel({"happy": 10, "angry": 90})
+    distributions = to_vectors([distribution(happy=50, angry=50), distribution(happy=100)])
+    assert model.score(distributions).tolist() == pytest.approx([50.0, 10.0])
+
+
+def test_override_rule_only_promotes_a_listed_runner_up_above_min_share():
+    rule = OverrideRule(when="happy", below=60, promote=["surprise"], min_share=30)
+    distributions = to_vectors([
+        distribution(happy=55, surprise=35),
+        distribution(happy=55, surprise=30),
+        distribution(happy=65, surprise=35),
+        distribution(happy=55, sad=35),
+    ])
+    happy = EMOTION_LABELS.index("happy")
+    promoted = rule.apply(distributions, np.full(len(distributions), happy))
+    assert [EMOTION_LABELS[code] for code in promoted] == ["surprise", "happy", "happy", "happy"]
+
+
+@pytest.mark.parametrize("config", [[1], "default", None, 3])
+def test_model_that_is_not_an_object_is_rejected(config):
+    with pytest.raises(ValueError):
+        ScoringModel.from_dict(config)
+
+
+@pytest.mark.parametrize("value", [-1, 101, 1e9, "high", None, True, float("nan")])
+def test_stress_outside_0_to_100_is_rejected(value):
+    config = copy.deepcopy(DEFAULT_MODEL)
+    config["stress"]["angry"] = value
+    with pytest.raises(ValueError):
+        ScoringModel.from_dict(config)
+
+
+@pytest.mark.parametrize("field", ["below", "min_share"])
+@pytest.mark.parametrize("value", [-5, 150, "20"])
+def test_override_threshold_outside_0_to_100_is_rejected(field, value):
+    rule = dict(DEFAULT_MODEL["overrides"][0], **{field: value})
+    with pytest.raises(ValueError):
+        ScoringModel.from_dict(model_with(overrides=[rule]))
+
+
+@pytest.mark.parametrize("overrides", [[1], [{"when": "neutral"}], 5])
+def test_malformed_overrides_are_rejected(overrides):
+    with pytest.raises(ValueError):
+        ScoringModel.from_dict(model_with(overrides=overrides))
@@ -0,0 +1,73 @@
+import importlib
+import sys
+import types
+
+import pytest
+from flask import Flask
+
+
+class FakeAnalysisService:
+    """Records what the history routes pass on; there is no cluster, so nothing is forwarded."""
+
+    cluster = None
+
+    def __init__(self):
+        self.calls = []
+
+    def get_history(self, last=100):
+        self.calls.append(("get_history", last))
+        return []
+
+    def get_history_stats(self, seconds=300):
+        self.calls.append(("get_history_stats", seconds))
+        return {}
+
+    def rescore_history(self, model=None, last=None, limit=100):
+        self.calls.append(("rescore_history", last, limit))
+        return {}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = types.ModuleType("app.analysis_service")
+    fake.analysis_service = FakeAnalysisService()
+    monkeypatch.setitem(sys.modules, "app.analysis_service", fake)
+    for name in ("app.routing", "app.routes", "app.routes.video"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    yield fake.analysis_service
+    for name in list(sys.modules):
+        if name == "app.routing" or name.startswith("app.routes"):
+            sys.modules.pop(name)
+
+
+@pytest.fixture
+def client(service):
+    video = importlib.import_module("app.routes.video")
+    app = Flask(__name__)
+    app.register_blueprint(video.video_bp, url_prefix="/api")
+    return app.test_client()
+
+
+@pytest.mark.parametrize("limit", ["0", "-5", "nan", "inf", "ten"])
+def test_history_rejects_a_non_positive_limit(client, service, limit):
+    assert client.get(f"/api/history?limit={limit}").status_code == 400
+    assert service.calls == []
+
+
+@pytest.mark.parametrize("window", ["0", "-60", "nan", "inf", "-inf"])
+def test_history_stats_rejects_a_non_positive_or_non_finite_window(client, service, window):
+    assert client.get(f"/api/history/stats?window={window}").status_code == 400
+    assert service.calls == []
+
+
+@pytest.mark.parametrize("body", [{"limit": -1}, {"limit": 0}, {"last": -10}, {"limit": 1e400}, {"last": "x"}])
+def test_rescore_rejects_a_non_positive_last_or_limit(client, service, body):
+    assert client.post("/api/history/rescore", json=body).status_code == 400
+    assert service.calls == []
+
+
+def test_valid_values_are_passed_on(client, service):
+    assert client.get("/api/history?limit=20").status_code == 200
+    assert client.get("/api/history/stats?window=30.5").status_code == 200
+    assert client.post("/api/history/rescore", json={"last": 50, "limit": 10}).status_code == 200
+    assert service.calls == [("get_history", 20), ("get_history_stats", 30.5), ("rescore_history", 50, 10)]
@@ -1,4 +1,5 @@
 import { useEffect, useRef, useState } from 'react';
+import { api } from '@/lib/api';
 
 interface LiveSessionCameraProps {
   isActive?: boolean;
@@ -9,7 +10,7 @@ export default function LiveSessionCamera({
   isActive = false,
   faceDetected = false
 }: LiveSessionCameraProps) {
-  const videoUrl = "http://localhost:5001/api/video_feed";
+  const videoUrl = api.sessions.getVideoFeedUrl();
   const imgRef = useRef<HTMLImageElement>(null);
   const [isLoading, setIsLoading] = useState(true);
 
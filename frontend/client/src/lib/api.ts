@@ -6,7 +6,7 @@ export const api = {
   // Session endpoints
   sessions: {
     // Get video feed URL
-    getVideoFeedUrl: () => `${API_BASE_URL}/sessions/video_feed`,
+    getVideoFeedUrl: () => `${API_BASE_URL}/video_feed`,
     
     // Start a new session
     async start(userId: string) {
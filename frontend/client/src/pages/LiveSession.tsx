@@ -43,6 +43,7 @@ export default function LiveSession() {
   const [trendData, setTrendData] = useState<TrendDataPoint[]>([]);
 
   const startTimeRef = useRef<number>(0);
+  const sessionIdRef = useRef<string | null>(null);
   const pollInterval = useRef<NodeJS.Timeout>();
 
   // Effect for polling emotion data
@@ -130,6 +131,13 @@ export default function LiveSession() {
         throw new Error('Failed to start session');
       }
 
+      const session = await response.json();
+      // 202: the camera is recording another session; try again later
+      if (session.admission) {
+        throw new Error(`Session not started: ${session.admission}`);
+      }
+      sessionIdRef.current = session.id;
+
       setSessionStatus("active");
       startTimeRef.current = Date.now();
     } catch (error) {
@@ -154,12 +162,17 @@ export default function LiveSession() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
-        }
+        },
+        body: JSON.stringify({
+          session_id: sessionIdRef.current,
+          user_id: user?.id
+        })
       });
 
       if (!response.ok) {
         throw new Error('Failed to end session');
       }
+      sessionIdRef.current = null;
 
       setSessionStatus("idle");
       setFaceDetected(false);